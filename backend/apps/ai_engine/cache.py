@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .client import PROMPT_VERSION, _ensure_list_of_strings
+from .models import AnalysisCacheEntry
+from .routing import get_model_tiers
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = (
+    "ats_score",
+    "score_breakdown",
+    "missing_keywords",
+    "strengths",
+    "suggestions",
+)
+# Which model produced a cached result, replayed onto the analysis row on a hit.
+ROUTE_FIELDS = ("model", "routing")
+
+
+def _normalize_text(value) -> str:
+    return " ".join(str(value or "").split())
+
+
+def _normalize_stack(value) -> list:
+    return sorted({item.strip().lower() for item in _ensure_list_of_strings(value) if item.strip()})
+
+
+def build_cache_key(
+    resume_text: str,
+    job_description: str,
+    candidate_level: str,
+    target_stack=None,
+    job_title: str = "",
+) -> str:
+    payload = {
+        # Every tier's model: routing picks among them, so a tier change is a different analysis.
+        "models": [tier["model"] for tier in get_model_tiers()],
+        "prompt_version": PROMPT_VERSION,
+        "resume": _normalize_text(resume_text),
+        "job_description": _normalize_text(job_description),
+        "candidate_level": _normalize_text(candidate_level).lower(),
+        "target_stack": _normalize_stack(target_stack),
+        "job_title": _normalize_text(job_title),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _entry_result(entry) -> dict:
+    return {field: entry.result.get(field) for field in RESULT_FIELDS + ROUTE_FIELDS}
+
+
+def cached_analysis_fields(cached: dict) -> dict:
+    """``AIAnalysis`` field values for an analysis answered from the cache."""
+    return {
+        **{field: cached.get(field) for field in RESULT_FIELDS},
+        "model_name": cached.get("model") or "",
+        "routing_decision": cached.get("routing") or {},
+    }
+
+
+def is_preferred_route(result: dict) -> bool:
+    """
+    Whether ``result`` came from the model routing prefers for these inputs. Failover
+    and hedge answers come from other models and must not be replayed as the usual one.
+    """
+    preferred_model = (result.get("routing") or {}).get("preferred_model")
+    return not preferred_model or result.get("model") == preferred_model
+
+
+def get_cached_result(key: str) -> dict | None:
+    now = timezone.now()
+    entry = AnalysisCacheEntry.objects.filter(key=key, expires_at__gt=now).first()
+    if not entry:
+        return None
+
+    AnalysisCacheEntry.objects.filter(pk=entry.pk).update(
+        hit_count=F("hit_count") + 1,
+        last_used_at=now,
+    )
+    logger.debug("Analysis cache hit key=%s", key)
+    return _entry_result(entry)
+
+
+def get_cached_results(keys) -> dict:
+    now = timezone.now()
+    entries = list(AnalysisCacheEntry.objects.filter(key__in=set(keys), expires_at__gt=now))
+    if not entries:
+        return {}
+
+    AnalysisCacheEntry.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+        hit_count=F("hit_count") + 1,
+        last_used_at=now,
+    )
+    return {entry.key: _entry_result(entry) for entry in entries}
+
+
+def store_cached_result(key: str, result: dict) -> None:
+    now = timezone.now()
+    ttl = getattr(settings, "AI_ANALYSIS_CACHE_TTL", 0)
+    if ttl <= 0:
+        return
+    if not is_preferred_route(result):
+        logger.debug("Not caching analysis served by %s instead of the preferred model", result.get("model"))
+        return
+
+    AnalysisCacheEntry.objects.update_or_create(
+        key=key,
+        defaults={
+            "result": {field: result.get(field) for field in RESULT_FIELDS + ROUTE_FIELDS},
+            "last_used_at": now,
+            "expires_at": now + timedelta(seconds=ttl),
+        },
+    )
+    _evict(now)
+
+
+def _evict(now) -> None:
+    AnalysisCacheEntry.objects.filter(expires_at__lte=now).delete()
+
+    max_entries = getattr(settings, "AI_ANALYSIS_CACHE_MAX_ENTRIES", 0)
+    if max_entries <= 0:
+        return
+
+    stale_ids = list(
+        AnalysisCacheEntry.objects.order_by("-last_used_at")
+        .values_list("id", flat=True)[max_entries:]
+    )
+    if stale_ids:
+        AnalysisCacheEntry.objects.filter(id__in=stale_ids).delete()
+        logger.info("Evicted %s analysis cache entries", len(stale_ids))
@@ -1,16 +1,50 @@
-import os
 import json
 import logging
-from groq import Groq
+import asyncio
+import time
+from django.conf import settings
+
+from .hedging import complete_hedged, complete_hedged_async, hedging_enabled
+from .prompt_budget import estimate_tokens, fit_inputs_to_budget, fit_packed_inputs, get_token_budget
+from .providers import get_provider
+from .rate_limit import RateLimited, acquire
+from .routing import plan_route, record_outcome
 
 logger = logging.getLogger(__name__)
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+MODEL_NAME = "llama-3.3-70b-versatile"
+# Bump whenever the prompt text or output contract changes so cached results are invalidated.
+PROMPT_VERSION = "2"
 BREAKDOWN_KEYS = (
     "skills_match",
     "project_impact",
     "tools_frameworks",
     "role_fit",
 )
+SYSTEM_MESSAGE = (
+    "You are a strict ATS and technical recruiter evaluator for software jobs.\n"
+    "You evaluate candidates for tech roles only and return VALID JSON ONLY."
+)
+RESULT_FORMAT = (
+    "{\n"
+    "  \"ats_score\": number between 0 and 100,\n"
+    "  \"score_breakdown\": {\n"
+    "    \"skills_match\": integer from 0 to 25,\n"
+    "    \"project_impact\": integer from 0 to 25,\n"
+    "    \"tools_frameworks\": integer from 0 to 25,\n"
+    "    \"role_fit\": integer from 0 to 25\n"
+    "  },\n"
+    "  \"missing_keywords\": [string],\n"
+    "  \"strengths\": [string],\n"
+    "  \"suggestions\": [string]\n"
+    "}"
+)
+SCORING_RULES = (
+    "Rules:\n"
+    "- Treat this as a technology role evaluation.\n"
+    "- For fresher candidates, value projects, internships, fundamentals, and learning velocity.\n"
+    "- For experienced candidates, value production impact, ownership, scale, and architecture depth.\n"
+    "- Keep suggestions specific and actionable for resume improvement.\n"
+)
 
 
 def _safe_load_json_from_text(text: str) -> dict:
@@ -57,57 +91,45 @@ def _ensure_list_of_strings(value):
     return [str(value)]
 
 
-def analyze_resume(
+def _build_messages(
     resume_text: str,
     job_description: str,
     candidate_level: str = "experienced",
     target_stack=None,
     job_title: str = "",
-) -> dict:
+    model: str = MODEL_NAME,
+) -> tuple:
     tech_stack = _ensure_list_of_strings(target_stack)
     stack_text = ", ".join(tech_stack) if tech_stack else "Not provided"
 
-    system_msg = (
-        "You are a strict ATS and technical recruiter evaluator for software jobs.\n"
-        "You evaluate candidates for tech roles only and return VALID JSON ONLY."
-    )
-
+    system_msg = SYSTEM_MESSAGE
     user_msg = (
         "Return JSON in this exact format:\n"
-        "{\n"
-        "  \"ats_score\": number between 0 and 100,\n"
-        "  \"score_breakdown\": {\n"
-        "    \"skills_match\": integer from 0 to 25,\n"
-        "    \"project_impact\": integer from 0 to 25,\n"
-        "    \"tools_frameworks\": integer from 0 to 25,\n"
-        "    \"role_fit\": integer from 0 to 25\n"
-        "  },\n"
-        "  \"missing_keywords\": [string],\n"
-        "  \"strengths\": [string],\n"
-        "  \"suggestions\": [string]\n"
-        "}\n"
-        "Rules:\n"
-        "- Treat this as a technology role evaluation.\n"
-        "- For fresher candidates, value projects, internships, fundamentals, and learning velocity.\n"
-        "- For experienced candidates, value production impact, ownership, scale, and architecture depth.\n"
-        "- Keep suggestions specific and actionable for resume improvement.\n\n"
+        f"{RESULT_FORMAT}\n"
+        f"{SCORING_RULES}\n"
         f"CANDIDATE_LEVEL: {candidate_level}\n"
         f"TARGET_STACK: {stack_text}\n"
         f"JOB_TITLE: {job_title or 'Not provided'}\n\n"
-        "RESUME:\n" + (resume_text or "") + "\n\n"
-        "JOB DESCRIPTION:\n" + (job_description or "")
     )
 
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_msg},
-        ],
-        temperature=0.25,
+    budget = get_token_budget(model) - estimate_tokens(system_msg + user_msg)
+    resume_part, job_part, prompt_stats = fit_inputs_to_budget(
+        resume_text or "",
+        job_description or "",
+        budget,
     )
+    user_msg += "RESUME:\n" + resume_part + "\n\n" + "JOB DESCRIPTION:\n" + job_part
+    prompt_stats["prompt_tokens"] = estimate_tokens(system_msg) + estimate_tokens(user_msg)
+
+    messages = [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg},
+    ]
+    return messages, prompt_stats
+
 
-    content = response.choices[0].message.content.strip()
+def _parse_response(content: str) -> dict:
+    content = (content or "").strip()
     logger.debug("Groq raw response: %s", content)
 
     try:
@@ -116,6 +138,10 @@ def analyze_resume(
         logger.error("Invalid JSON returned by Groq: %s", content)
         raise ValueError(f"Invalid JSON returned by Groq:\n{content}")
 
+    return _normalize_payload(data)
+
+
+def _normalize_payload(data: dict) -> dict:
     breakdown = _normalize_breakdown(data.get("score_breakdown"))
     breakdown_total = sum(breakdown.values())
 
@@ -131,3 +157,318 @@ def analyze_resume(
         "strengths": _ensure_list_of_strings(data.get("strengths")),
         "suggestions": _ensure_list_of_strings(data.get("suggestions")),
     }
+
+
+def _estimated_request_tokens(prompt_stats: dict, completions: int = 1) -> int:
+    completion_tokens = getattr(settings, "AI_RATE_LIMIT_COMPLETION_TOKENS", 1000)
+    return prompt_stats.get("prompt_tokens", 0) + completion_tokens * completions
+
+
+def _reserve_capacity(model: str, prompt_stats: dict, completions: int = 1) -> None:
+    wait = acquire(model, _estimated_request_tokens(prompt_stats, completions))
+    if wait > 0:
+        raise RateLimited(f"Local Groq rate limit reached, retry in {wait:.1f}s", retry_after=wait)
+
+
+async def _reserve_capacity_async(model: str, prompt_stats: dict) -> None:
+    # Inside one event loop it is cheaper to wait for the bucket than to reschedule.
+    max_wait = getattr(settings, "AI_RATE_LIMIT_MAX_INLINE_WAIT", 30)
+    waited = 0.0
+    while True:
+        wait = await asyncio.to_thread(acquire, model, _estimated_request_tokens(prompt_stats))
+        if wait <= 0:
+            return
+        if waited + wait > max_wait:
+            raise RateLimited(f"Local Groq rate limit reached, retry in {wait:.1f}s", retry_after=wait)
+        await asyncio.sleep(wait)
+        waited += wait
+
+
+def _input_tokens(resume_text: str, job_description: str) -> int:
+    return estimate_tokens(resume_text or "") + estimate_tokens(job_description or "")
+
+
+def _complete(model: str, messages: list, prompt_stats: dict, on_chunk=None) -> tuple:
+    provider = get_provider()
+    # Streaming calls are not hedged: two interleaved chunk streams would reach the client.
+    if on_chunk is None and hedging_enabled():
+        return complete_hedged(
+            provider,
+            model=model,
+            messages=messages,
+            temperature=0.25,
+            validate=_parse_response,
+            estimated_tokens=_estimated_request_tokens(prompt_stats),
+        )
+    content = provider.complete(model=model, messages=messages, temperature=0.25, on_chunk=on_chunk)
+    return _parse_response(content), model, None
+
+
+async def _complete_async(model: str, messages: list, prompt_stats: dict, async_session=None) -> tuple:
+    provider = get_provider()
+    if hedging_enabled():
+        return await complete_hedged_async(
+            provider,
+            model=model,
+            messages=messages,
+            temperature=0.25,
+            validate=_parse_response,
+            estimated_tokens=_estimated_request_tokens(prompt_stats),
+            session=async_session,
+        )
+    content = await provider.complete_async(
+        model=model,
+        messages=messages,
+        temperature=0.25,
+        session=async_session,
+    )
+    return _parse_response(content), model, None
+
+
+def _finish_result(result: dict, model: str, hedge, tier: dict, prompt_stats: dict, decision: dict) -> dict:
+    result["prompt_stats"] = prompt_stats
+    result["model"] = model
+    result["routing"] = {**decision, "tier": tier["name"]}
+    if hedge:
+        result["routing"]["hedge"] = hedge
+    return result
+
+
+def _note_failover(decision: dict, tier: dict, exc: Exception) -> None:
+    logger.warning("Model tier %s failed, failing over: %s", tier["name"], exc)
+    decision["failovers"].append({"tier": tier["name"], "error": str(exc)[:200]})
+
+
+def analyze_resume(
+    resume_text: str,
+    job_description: str,
+    candidate_level: str = "experienced",
+    target_stack=None,
+    job_title: str = "",
+    on_chunk=None,
+) -> dict:
+    tiers, decision = plan_route(_input_tokens(resume_text, job_description))
+
+    last_error = None
+    for tier in tiers:
+        messages, prompt_stats = _build_messages(
+            resume_text,
+            job_description,
+            candidate_level=candidate_level,
+            target_stack=target_stack,
+            job_title=job_title,
+            model=tier["model"],
+        )
+        _reserve_capacity(tier["model"], prompt_stats)
+
+        started = time.monotonic()
+        try:
+            result, model, hedge = _complete(tier["model"], messages, prompt_stats, on_chunk=on_chunk)
+        except RateLimited:
+            raise
+        except Exception as exc:
+            record_outcome(tier["model"], error=exc)
+            _note_failover(decision, tier, exc)
+            last_error = exc
+            continue
+
+        record_outcome(tier["model"], latency=time.monotonic() - started)
+        return _finish_result(result, model, hedge, tier, prompt_stats, decision)
+
+    raise last_error
+
+
+def open_async_session():
+    """Per-event-loop provider session to share across ``analyze_resume_async`` calls."""
+    return get_provider().open_async_session()
+
+
+async def analyze_resume_async(
+    resume_text: str,
+    job_description: str,
+    candidate_level: str = "experienced",
+    target_stack=None,
+    job_title: str = "",
+    async_session=None,
+) -> dict:
+    tiers, decision = await asyncio.to_thread(plan_route, _input_tokens(resume_text, job_description))
+
+    last_error = None
+    for tier in tiers:
+        messages, prompt_stats = _build_messages(
+            resume_text,
+            job_description,
+            candidate_level=candidate_level,
+            target_stack=target_stack,
+            job_title=job_title,
+            model=tier["model"],
+        )
+        await _reserve_capacity_async(tier["model"], prompt_stats)
+
+        started = time.monotonic()
+        try:
+            result, model, hedge = await _complete_async(
+                tier["model"],
+                messages,
+                prompt_stats,
+                async_session=async_session,
+            )
+        except RateLimited:
+            raise
+        except Exception as exc:
+            await asyncio.to_thread(record_outcome, tier["model"], None, exc)
+            _note_failover(decision, tier, exc)
+            last_error = exc
+            continue
+
+        await asyncio.to_thread(record_outcome, tier["model"], time.monotonic() - started)
+        return _finish_result(result, model, hedge, tier, prompt_stats, decision)
+
+    raise last_error
+
+
+def _build_packed_messages(
+    resume_text: str,
+    jobs: list,
+    candidate_level: str = "experienced",
+    target_stack=None,
+    model: str = MODEL_NAME,
+) -> tuple:
+    tech_stack = _ensure_list_of_strings(target_stack)
+    stack_text = ", ".join(tech_stack) if tech_stack else "Not provided"
+
+    system_msg = SYSTEM_MESSAGE
+    user_msg = (
+        "Evaluate the same resume against each job below, independently.\n"
+        "Return JSON in this exact format, with one entry per job:\n"
+        "{\n"
+        "  \"results\": [\n"
+        "    {\"job_id\": string (the JOB_ID given below), ...every field of:}\n"
+        "  ]\n"
+        "}\n"
+        f"{RESULT_FORMAT}\n"
+        f"{SCORING_RULES}\n"
+        f"CANDIDATE_LEVEL: {candidate_level}\n"
+        f"TARGET_STACK: {stack_text}\n\n"
+    )
+
+    headers = [
+        f"JOB_ID: {index + 1}\nJOB_TITLE: {job.get('job_title') or 'Not provided'}\n"
+        for index, job in enumerate(jobs)
+    ]
+    fixed = estimate_tokens(system_msg + user_msg + "".join(headers))
+    budget = getattr(settings, "AI_PACKED_PROMPT_TOKEN_BUDGET", 8000) - fixed
+    resume_part, job_parts, prompt_stats = fit_packed_inputs(
+        resume_text or "",
+        [job.get("job_description") or "" for job in jobs],
+        budget,
+    )
+
+    user_msg += "RESUME:\n" + resume_part + "\n\n"
+    for header, job_part in zip(headers, job_parts):
+        user_msg += header + "JOB DESCRIPTION:\n" + job_part + "\n\n"
+    prompt_stats["prompt_tokens"] = estimate_tokens(system_msg) + estimate_tokens(user_msg)
+    prompt_stats["packed_jobs"] = len(jobs)
+
+    messages = [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg.rstrip()},
+    ]
+    return messages, prompt_stats
+
+
+def _parse_packed_response(content: str, count: int) -> dict:
+    """Map 1-based job positions to normalized results; malformed entries are left out."""
+    content = (content or "").strip()
+    try:
+        data = _safe_load_json_from_text(content)
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON returned by Groq for packed prompt: %s", content)
+        return {}
+
+    entries = data.get("results") if isinstance(data, dict) else data
+    results = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict) or not isinstance(entry.get("score_breakdown"), dict):
+            continue
+        try:
+            position = int(str(entry.get("job_id", "")).strip())
+        except ValueError:
+            continue
+        if 1 <= position <= count and position not in results:
+            results[position] = _normalize_payload(entry)
+    return results
+
+
+def pack_jobs(resume_text: str, jobs: list) -> list:
+    """Group jobs into packs that fit ``AI_PACKED_MAX_JOBS`` and the packed prompt budget."""
+    max_jobs = max(1, getattr(settings, "AI_PACKED_MAX_JOBS", 4))
+    budget = getattr(settings, "AI_PACKED_PROMPT_TOKEN_BUDGET", 8000)
+    resume_tokens = estimate_tokens(resume_text or "")
+
+    packs, current, used = [], [], resume_tokens
+    for job in jobs:
+        tokens = estimate_tokens(job.get("job_description") or "")
+        if current and (len(current) >= max_jobs or used + tokens > budget):
+            packs.append(current)
+            current, used = [], resume_tokens
+        current.append(job)
+        used += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def analyze_resume_packed(
+    resume_text: str,
+    jobs: list,
+    candidate_level: str = "experienced",
+    target_stack=None,
+) -> dict:
+    """
+    Score one resume against several jobs in a single request.
+
+    ``jobs`` is a list of dicts with ``key``, ``job_description`` and ``job_title``.
+    Returns ``{key: result}`` for the jobs the model answered validly; callers
+    should analyze any missing key with ``analyze_resume``.
+    """
+    if not jobs:
+        return {}
+
+    input_tokens = estimate_tokens(resume_text or "") + sum(
+        estimate_tokens(job.get("job_description") or "") for job in jobs
+    )
+    tiers, decision = plan_route(input_tokens)
+    # Packed prompts are large, so only the first available tier is tried; on failure
+    # the jobs go through the single-job path, which does its own failover.
+    tier = tiers[0]
+
+    messages, prompt_stats = _build_packed_messages(
+        resume_text,
+        jobs,
+        candidate_level=candidate_level,
+        target_stack=target_stack,
+        model=tier["model"],
+    )
+    # One answer per job.
+    _reserve_capacity(tier["model"], prompt_stats, completions=len(jobs))
+
+    started = time.monotonic()
+    try:
+        content = get_provider().complete(model=tier["model"], messages=messages, temperature=0.25)
+    except RateLimited:
+        raise
+    except Exception as exc:
+        record_outcome(tier["model"], error=exc)
+        raise
+    record_outcome(tier["model"], latency=time.monotonic() - started)
+
+    parsed = _parse_packed_response(content, len(jobs))
+    routing = {**decision, "tier": tier["name"], "packed_jobs": len(jobs)}
+    results = {}
+    for position, result in parsed.items():
+        result["prompt_stats"] = prompt_stats
+        result["model"] = tier["model"]
+        result["routing"] = routing
+        results[jobs[position - 1]["key"]] = result
+    return results
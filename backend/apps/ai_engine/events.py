@@ -0,0 +1,130 @@
+import json
+import logging
+import threading
+import time
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"completed", "failed"}
+
+_redis_client = None
+_open_streams = 0
+_open_streams_lock = threading.Lock()
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None:
+        url = getattr(settings, "AI_EVENTS_REDIS_URL", None) or settings.CELERY_BROKER_URL
+        _redis_client = redis.Redis.from_url(url)
+    return _redis_client
+
+
+def _channel(job_id) -> str:
+    return f"ai-analysis:{job_id}"
+
+
+def publish_analysis_event(job_id, event: str, data: dict) -> None:
+    # Progress events are best effort: a missing subscriber or Redis hiccup must
+    # never fail the analysis itself.
+    try:
+        _get_redis().publish(_channel(job_id), json.dumps({"event": event, "data": data}))
+    except Exception as exc:
+        logger.warning("Could not publish %s event for job_id=%s: %s", event, job_id, exc)
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _reserve_stream() -> bool:
+    global _open_streams
+    with _open_streams_lock:
+        if _open_streams >= getattr(settings, "AI_STREAM_MAX_OPEN", 8):
+            return False
+        _open_streams += 1
+        return True
+
+
+def _release_stream() -> None:
+    global _open_streams
+    with _open_streams_lock:
+        _open_streams -= 1
+
+
+def _final_status(snapshot, detail: str):
+    """The current status (and result, if finished) for a client that should go back to polling."""
+    current_status, payload = snapshot()
+    yield format_sse("status", {"status": current_status, "detail": detail})
+    if current_status in TERMINAL_STATUSES:
+        yield format_sse("result", payload)
+
+
+def stream_analysis_events(job_id, snapshot, include_chunks=False, timeout=None, keepalive=15):
+    """
+    Yield SSE frames for one job's analysis until it reaches a terminal status.
+
+    ``snapshot`` is called after subscribing and returns ``(status, payload)`` for the
+    current row, so no event published in between can be missed.
+
+    Each open stream holds a server thread, so at most ``AI_STREAM_MAX_OPEN`` run per
+    process. Past that, or when Redis is unreachable, the client gets the current status
+    with a ``detail`` telling it to poll instead.
+    """
+    if not _reserve_stream():
+        yield from _final_status(snapshot, "Too many open streams; poll the result endpoint.")
+        return
+    try:
+        yield from _relay_events(job_id, snapshot, include_chunks, timeout, keepalive)
+    finally:
+        _release_stream()
+
+
+def _relay_events(job_id, snapshot, include_chunks, timeout, keepalive):
+    timeout = timeout or getattr(settings, "AI_STREAM_TIMEOUT", 120)
+    pubsub = _get_redis().pubsub(ignore_subscribe_messages=True)
+    try:
+        pubsub.subscribe(_channel(job_id))
+    except redis.exceptions.RedisError as exc:
+        logger.warning("Analysis events unavailable for job_id=%s: %s", job_id, exc)
+        pubsub.close()
+        yield from _final_status(snapshot, "Live updates are unavailable; poll the result endpoint.")
+        return
+
+    try:
+        current_status, payload = snapshot()
+        yield format_sse("status", {"status": current_status})
+        if current_status in TERMINAL_STATUSES:
+            yield format_sse("result", payload)
+            return
+
+        deadline = time.monotonic() + timeout
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            try:
+                message = pubsub.get_message(timeout=1.0)
+            except redis.exceptions.RedisError as exc:
+                logger.warning("Analysis events lost for job_id=%s: %s", job_id, exc)
+                yield from _final_status(snapshot, "Live updates were interrupted; poll the result endpoint.")
+                return
+            if not message:
+                if time.monotonic() - last_sent >= keepalive:
+                    last_sent = time.monotonic()
+                    yield ": keepalive\n\n"
+                continue
+
+            event = json.loads(message["data"])
+            if event["event"] == "chunk" and not include_chunks:
+                continue
+
+            last_sent = time.monotonic()
+            yield format_sse(event["event"], event["data"])
+            if event["event"] == "result":
+                return
+
+        yield format_sse("timeout", {"detail": "Stream timed out; poll the result endpoint."})
+    finally:
+        pubsub.close()
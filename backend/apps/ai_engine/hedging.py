@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+
+from . import metrics
+from .rate_limit import acquire
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200
+
+
+class LatencyTracker:
+    """Recent completion latencies per model, used to pick the hedge deadline."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+
+    def observe(self, model: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[model].append(seconds)
+
+    def percentile(self, model: str, percentile: float, min_samples: int = 1):
+        with self._lock:
+            samples = sorted(self._samples[model])
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class HedgeBudget:
+    """
+    Caps hedges to a fraction of requests: every request earns ``ratio`` credit
+    (up to ``burst``) and every hedge spends one.
+    """
+
+    def __init__(self, ratio: float, burst: float):
+        self._lock = threading.Lock()
+        self.ratio = ratio
+        self.burst = burst
+        self._credits = 0.0
+
+    def earn(self) -> None:
+        with self._lock:
+            self._credits = min(self.burst, self._credits + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._credits < 1:
+                return False
+            self._credits -= 1
+            return True
+
+
+_tracker = LatencyTracker()
+_budget = None
+_executor = None
+_state_lock = threading.Lock()
+
+
+def hedging_enabled() -> bool:
+    return getattr(settings, "AI_HEDGING_ENABLED", False)
+
+
+def get_budget() -> HedgeBudget:
+    global _budget
+    if _budget is None:
+        with _state_lock:
+            if _budget is None:
+                _budget = HedgeBudget(
+                    ratio=getattr(settings, "AI_HEDGE_BUDGET_RATIO", 0.05),
+                    burst=getattr(settings, "AI_HEDGE_BUDGET_BURST", 5),
+                )
+    return _budget
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _state_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "AI_HEDGE_MAX_THREADS", 8),
+                    thread_name_prefix="ai-hedge",
+                )
+    return _executor
+
+
+def _forget_executor_after_fork() -> None:
+    # Worker threads do not survive fork; the child builds its own pool on first use.
+    global _executor, _state_lock
+    _executor = None
+    _state_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_executor_after_fork)
+
+
+def hedge_delay(model: str) -> float:
+    delay = _tracker.percentile(
+        model,
+        getattr(settings, "AI_HEDGE_PERCENTILE", 95),
+        min_samples=getattr(settings, "AI_HEDGE_MIN_SAMPLES", 20),
+    )
+    if delay is None:
+        delay = getattr(settings, "AI_HEDGE_DEFAULT_DELAY", 8.0)
+    return max(getattr(settings, "AI_HEDGE_MIN_DELAY", 1.0), delay)
+
+
+def _hedge_model(model: str) -> str:
+    return getattr(settings, "AI_HEDGE_MODEL", "") or model
+
+
+def _may_hedge(model: str, estimated_tokens: int) -> bool:
+    if not get_budget().try_spend():
+        metrics.record("hedge_skipped_budget")
+        return False
+    # The hedge is a real request, so it has to fit in the shared limiter too.
+    if acquire(model, estimated_tokens) > 0:
+        metrics.record("hedge_skipped_rate_limit")
+        return False
+    return True
+
+
+def _record_win(primary_model: str, winner_is_hedge: bool, elapsed: float) -> None:
+    if not winner_is_hedge:
+        return
+    metrics.record("hedges_won")
+    # The cancelled primary never reports its latency, so the saving is measured
+    # against the recent tail latency of that model.
+    tail = _tracker.percentile(primary_model, 99)
+    if tail is not None and tail > elapsed:
+        metrics.record("hedge_saved_seconds", tail - elapsed)
+
+
+def _timed(call, model):
+    started = time.monotonic()
+    result = call()
+    _tracker.observe(model, time.monotonic() - started)
+    return result
+
+
+def complete_hedged(provider, *, model, messages, temperature, validate, estimated_tokens) -> tuple:
+    """
+    Run ``provider.complete`` and, if it misses the hedge deadline, race a second
+    request against it. ``validate`` turns raw content into a result and raises on
+    bad output, so an invalid first response does not win the race.
+
+    Returns ``(result, model_used, hedge_info)``.
+    """
+    get_budget().earn()
+    delay = hedge_delay(model)
+    started = time.monotonic()
+
+    def call(target_model):
+        return _timed(
+            lambda: validate(provider.complete(model=target_model, messages=messages, temperature=temperature)),
+            target_model,
+        )
+
+    executor = _get_executor()
+    primary = executor.submit(call, model)
+    try:
+        return primary.result(timeout=delay), model, {"fired": False}
+    except FutureTimeout:
+        if primary.done():
+            raise
+
+    hedge_model = _hedge_model(model)
+    if not _may_hedge(hedge_model, estimated_tokens):
+        return primary.result(), model, {"fired": False, "delay": round(delay, 3)}
+
+    metrics.record("hedges_fired")
+    pending = {primary: model, executor.submit(call, hedge_model): hedge_model}
+    last_error = None
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            future_model = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as exc:
+                last_error = exc
+                continue
+
+            # A running thread cannot be interrupted; the loser finishes in the
+            # background and its response is discarded.
+            for loser in pending:
+                loser.cancel()
+            elapsed = time.monotonic() - started
+            winner_is_hedge = future is not primary
+            _record_win(model, winner_is_hedge, elapsed)
+            return result, future_model, {
+                "fired": True,
+                "delay": round(delay, 3),
+                "winner": "hedge" if winner_is_hedge else "primary",
+            }
+    raise last_error
+
+
+async def complete_hedged_async(
+    provider,
+    *,
+    model,
+    messages,
+    temperature,
+    validate,
+    estimated_tokens,
+    session=None,
+) -> tuple:
+    """Async counterpart of ``complete_hedged``; the losing request is cancelled."""
+    get_budget().earn()
+    delay = hedge_delay(model)
+    started = time.monotonic()
+
+    async def call(target_model):
+        call_started = time.monotonic()
+        content = await provider.complete_async(
+            model=target_model,
+            messages=messages,
+            temperature=temperature,
+            session=session,
+        )
+        result = validate(content)
+        _tracker.observe(target_model, time.monotonic() - call_started)
+        return result
+
+    primary = asyncio.ensure_future(call(model))
+    pending = {primary: model}
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result(), model, {"fired": False}
+
+        hedge_model = _hedge_model(model)
+        if not await asyncio.to_thread(_may_hedge, hedge_model, estimated_tokens):
+            return await primary, model, {"fired": False, "delay": round(delay, 3)}
+
+        metrics.record("hedges_fired")
+        hedge = asyncio.ensure_future(call(hedge_model))
+        pending[hedge] = hedge_model
+        last_error = None
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task_model = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as exc:
+                    last_error = exc
+                    continue
+
+                elapsed = time.monotonic() - started
+                winner_is_hedge = task is not primary
+                _record_win(model, winner_is_hedge, elapsed)
+                return result, task_model, {
+                    "fired": True,
+                    "delay": round(delay, 3),
+                    "winner": "hedge" if winner_is_hedge else "primary",
+                }
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
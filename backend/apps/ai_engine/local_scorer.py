@@ -0,0 +1,152 @@
+import math
+import re
+from collections import Counter
+
+from .client import BREAKDOWN_KEYS, _ensure_list_of_strings
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+METRIC_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\s*(?:%|x\b|k\b|m\b|ms\b|users|requests|customers)", re.IGNORECASE)
+
+STOPWORDS = frozenset("""
+a about above across after all also an and any are as at be been being both but by can could do does
+for from had has have how if in into is it its may more most must not of on or our out over per should
+so such than that the their them then there these they this those through to under up us using via was
+we were what when where which while who will with within would you your yours able across etc
+work working team teams role roles job candidate candidates company ability strong good great new
+years year plus including include includes well related knowledge understanding experience experienced
+requirements requirement responsibilities qualifications preferred senior junior build building
+""".split())
+
+TECH_TERMS = frozenset("""
+python java javascript typescript go golang rust ruby php kotlin swift scala c c++ c# sql nosql bash
+django flask fastapi spring rails express nestjs node node.js react react.js angular vue vue.js next.js
+nuxt svelte redux graphql rest grpc html css tailwind sass webpack vite
+postgresql postgres mysql sqlite mongodb redis cassandra dynamodb elasticsearch kafka rabbitmq celery
+aws gcp azure docker kubernetes k8s terraform ansible jenkins ci cd github gitlab linux nginx
+pandas numpy pytorch tensorflow scikit-learn spark hadoop airflow llm nlp ml
+microservices serverless oauth jwt websocket git jira agile scrum tdd pytest jest cypress selenium
+""".split())
+
+ACTION_VERBS = frozenset("""
+built designed developed implemented led launched shipped scaled optimized improved reduced increased
+migrated automated architected owned delivered created deployed maintained mentored refactored
+""".split())
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for token in TOKEN_PATTERN.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) < 2 and token not in TECH_TERMS:
+            continue
+        if not any(char.isalpha() for char in token):
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def _tfidf_vectors(resume_text: str, job_description: str) -> tuple:
+    # Lines act as the document collection for IDF so that terms concentrated in a
+    # few lines (specific requirements) outweigh ones spread everywhere.
+    lines = [line for line in (resume_text or "").splitlines() + (job_description or "").splitlines() if line.strip()]
+    document_frequency = Counter()
+    for line in lines:
+        document_frequency.update(set(tokenize(line)))
+    total = len(lines) or 1
+
+    def vectorize(text):
+        counts = Counter(tokenize(text))
+        return {
+            term: (1 + math.log(count)) * (math.log((1 + total) / (1 + document_frequency[term])) + 1)
+            for term, count in counts.items()
+        }
+
+    return vectorize(resume_text), vectorize(job_description)
+
+
+def _cosine(left: dict, right: dict) -> float:
+    if not left or not right:
+        return 0.0
+    dot = sum(weight * right.get(term, 0.0) for term, weight in left.items())
+    left_norm = math.sqrt(sum(weight * weight for weight in left.values()))
+    right_norm = math.sqrt(sum(weight * weight for weight in right.values()))
+    return dot / (left_norm * right_norm) if left_norm and right_norm else 0.0
+
+
+def _coverage(job_vector: dict, resume_terms: set, terms=None) -> float:
+    weights = {term: weight for term, weight in job_vector.items() if terms is None or term in terms}
+    total = sum(weights.values())
+    if not total:
+        return 0.0
+    return sum(weight for term, weight in weights.items() if term in resume_terms) / total
+
+
+def _bucket(fraction: float) -> int:
+    return max(0, min(25, int(round(fraction * 25))))
+
+
+def score_locally(
+    resume_text: str,
+    job_description: str,
+    candidate_level: str = "experienced",
+    target_stack=None,
+    job_title: str = "",
+) -> dict:
+    """
+    Instant, LLM-free estimate in the same shape as ``analyze_resume``.
+
+    Scores are term-overlap heuristics over TF-IDF weighted vectors and are only
+    meant to be shown until the model result arrives (or if it never does).
+    """
+    resume_vector, job_vector = _tfidf_vectors(resume_text, job_description)
+    resume_terms = set(resume_vector)
+
+    stack_terms = {term for item in _ensure_list_of_strings(target_stack) for term in tokenize(item)}
+    tech_terms = (TECH_TERMS & set(job_vector)) | stack_terms
+    for term in stack_terms:
+        job_vector.setdefault(term, 1.0)
+
+    skills_fraction = _coverage(job_vector, resume_terms)
+    tools_fraction = _coverage(job_vector, resume_terms, tech_terms) if tech_terms else skills_fraction
+
+    resume_tokens = tokenize(resume_text)
+    metrics = len(METRIC_PATTERN.findall(resume_text or ""))
+    verbs = sum(1 for token in resume_tokens if token in ACTION_VERBS)
+    projects = sum(1 for token in resume_tokens if token.startswith("project"))
+    if candidate_level == "fresher":
+        impact_fraction = min(1.0, 0.15 * projects + 0.05 * verbs + 0.05 * metrics)
+    else:
+        impact_fraction = min(1.0, 0.1 * metrics + 0.05 * verbs)
+
+    title_terms = set(tokenize(job_title))
+    title_fraction = len(title_terms & resume_terms) / len(title_terms) if title_terms else 0.0
+    role_fraction = min(1.0, 0.7 * min(1.0, 2 * _cosine(resume_vector, job_vector)) + 0.3 * title_fraction)
+
+    breakdown = dict(zip(BREAKDOWN_KEYS, (
+        _bucket(skills_fraction),
+        _bucket(impact_fraction),
+        _bucket(tools_fraction),
+        _bucket(role_fraction),
+    )))
+
+    ranked_job_terms = sorted(
+        job_vector.items(),
+        key=lambda item: (item[0] not in tech_terms, -item[1], item[0]),
+    )
+    missing = [term for term, _ in ranked_job_terms if term not in resume_terms][:10]
+    matched = [term for term, _ in ranked_job_terms if term in resume_terms][:5]
+
+    suggestions = []
+    if missing:
+        suggestions.append("Mention relevant experience with: " + ", ".join(missing[:5]) + ".")
+    if metrics < 3:
+        suggestions.append("Quantify outcomes (latency, users, revenue, percentages) in project and work bullets.")
+
+    return {
+        "ats_score": sum(breakdown.values()),
+        "score_breakdown": breakdown,
+        "missing_keywords": missing,
+        "strengths": ["Matches job keywords: " + ", ".join(matched)] if matched else [],
+        "suggestions": suggestions,
+    }
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from apps.ai_engine.metrics import get_metrics
+
+
+class Command(BaseCommand):
+    help = "Show AI analysis pipeline counters (limiter, retries, queue wait)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Clear all counters after printing.")
+
+    def handle(self, *args, **options):
+        store = get_metrics()
+        values = store.snapshot()
+
+        if not values:
+            self.stdout.write("No AI metrics recorded yet.")
+        for name in sorted(values):
+            self.stdout.write(f"{name}: {values[name]:g}")
+
+        derived = (
+            ("avg_queue_wait_seconds", "queue_wait_seconds", "queue_wait_count"),
+            ("avg_limiter_wait_seconds", "limiter_wait_seconds", "limiter_throttled"),
+        )
+        for label, total_key, count_key in derived:
+            if values.get(count_key):
+                self.stdout.write(f"{label}: {values.get(total_key, 0) / values[count_key]:.3f}")
+
+        if options["reset"]:
+            store.reset()
+            self.stdout.write(self.style.SUCCESS("AI metrics reset."))
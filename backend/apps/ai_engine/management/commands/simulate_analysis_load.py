@@ -0,0 +1,70 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.ai_engine.client import analyze_resume_async, open_async_session
+from apps.ai_engine.providers import get_provider
+
+SAMPLE_RESUME = (
+    "SKILLS\nPython, Django, PostgreSQL, Redis, Celery, Docker, AWS\n"
+    "EXPERIENCE\nBuilt REST APIs serving 2M users; reduced p95 latency by 40%.\n"
+)
+SAMPLE_JOB_DESCRIPTION = (
+    "Requirements:\n3+ years of Python and Django.\nExperience with PostgreSQL, Redis and Celery.\n"
+    "Kubernetes and Terraform are a plus.\n"
+)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Drive the analysis client with concurrent requests against the configured AI_PROVIDER."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=10)
+
+    def handle(self, *args, **options):
+        total = options["requests"]
+        concurrency = max(1, options["concurrency"])
+        latencies, errors = [], []
+
+        async def one(semaphore, session):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    await analyze_resume_async(SAMPLE_RESUME, SAMPLE_JOB_DESCRIPTION, async_session=session)
+                    latencies.append(time.perf_counter() - started)
+                except Exception as exc:
+                    errors.append(type(exc).__name__)
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+            async with open_async_session() as session:
+                await asyncio.gather(*(one(semaphore, session) for _ in range(total)))
+
+        self.stdout.write(f"Provider: {get_provider().name}, requests={total}, concurrency={concurrency}")
+        started = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"throughput: {total / elapsed:.2f} req/s over {elapsed:.2f}s")
+        if latencies:
+            self.stdout.write(
+                "latency s: p50={:.3f} p95={:.3f} p99={:.3f} max={:.3f} mean={:.3f}".format(
+                    _percentile(latencies, 0.50),
+                    _percentile(latencies, 0.95),
+                    _percentile(latencies, 0.99),
+                    max(latencies),
+                    statistics.mean(latencies),
+                )
+            )
+        if errors:
+            counts = {name: errors.count(name) for name in sorted(set(errors))}
+            self.stdout.write(f"errors: {counts}")
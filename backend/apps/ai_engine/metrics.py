@@ -0,0 +1,66 @@
+import logging
+import threading
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "ai-metrics"
+
+
+class InMemoryMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[name] += amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class RedisMetrics:
+    def __init__(self, url: str):
+        self._redis = redis.Redis.from_url(url)
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        self._redis.hincrbyfloat(METRICS_KEY, name, amount)
+
+    def snapshot(self) -> dict:
+        return {
+            key.decode(): float(value)
+            for key, value in self._redis.hgetall(METRICS_KEY).items()
+        }
+
+    def reset(self) -> None:
+        self._redis.delete(METRICS_KEY)
+
+
+_metrics = None
+
+
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        if getattr(settings, "AI_RATE_LIMIT_BACKEND", "redis") == "memory":
+            _metrics = InMemoryMetrics()
+        else:
+            _metrics = RedisMetrics(getattr(settings, "AI_EVENTS_REDIS_URL", None) or settings.CELERY_BROKER_URL)
+    return _metrics
+
+
+def record(name: str, amount: float = 1) -> None:
+    # Metrics are best effort and must never fail an analysis.
+    try:
+        get_metrics().incr(name, amount)
+    except Exception as exc:
+        logger.warning("Could not record metric %s: %s", name, exc)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0007_analysisbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aianalysis',
+            name='prompt_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aianalysis',
+            name='prompt_trimmed',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0008_aianalysis_prompt_tokens_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aianalysis',
+            name='is_provisional',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0009_aianalysis_is_provisional'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aianalysis',
+            name='input_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='aianalysis',
+            name='run_id',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
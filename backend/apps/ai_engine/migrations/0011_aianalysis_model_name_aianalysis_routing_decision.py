@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0010_aianalysis_input_hash_aianalysis_run_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aianalysis',
+            name='model_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='aianalysis',
+            name='routing_decision',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0011_aianalysis_model_name_aianalysis_routing_decision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aianalysis',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
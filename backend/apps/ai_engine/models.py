@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from apps.jobs.models import JobApplication
 
@@ -28,6 +29,13 @@ class AIAnalysis(models.Model):
         default=CANDIDATE_LEVEL_EXPERIENCED,
     )
     target_stack = models.JSONField(default=list, blank=True)
+    batch = models.ForeignKey(
+        "ai_engine.AnalysisBatch",
+        on_delete=models.SET_NULL,
+        related_name='analyses',
+        null=True,
+        blank=True
+    )
 
     status = models.CharField(
             max_length=20,
@@ -44,9 +52,57 @@ class AIAnalysis(models.Model):
     strengths = models.JSONField(default=list, blank=True)
     suggestions = models.JSONField(default=list, blank=True)
     score_breakdown = models.JSONField(default=dict, blank=True)
+    is_provisional = models.BooleanField(default=False)
+    input_hash = models.CharField(max_length=64, blank=True, default="")
+    run_id = models.CharField(max_length=32, blank=True, default="")
+    started_at = models.DateTimeField(null=True, blank=True)
     error_message = models.TextField(blank=True, default="")
+    prompt_tokens = models.IntegerField(default=0)
+    prompt_trimmed = models.JSONField(default=dict, blank=True)
+    model_name = models.CharField(max_length=100, blank=True, default="")
+    routing_decision = models.JSONField(default=dict, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"AI Analysis for {self.job_application}"
+
+
+class AnalysisCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    result = models.JSONField(default=dict)
+    hit_count = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Analysis cache {self.key[:12]}"
+
+
+class AnalysisBatch(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='analysis_batches'
+    )
+    resume = models.ForeignKey(
+        "resumes.Resume",
+        on_delete=models.SET_NULL,
+        related_name='analysis_batches',
+        null=True,
+        blank=True
+    )
+    candidate_level = models.CharField(
+        max_length=20,
+        choices=AIAnalysis.CANDIDATE_LEVEL_CHOICES,
+        default=AIAnalysis.CANDIDATE_LEVEL_EXPERIENCED,
+    )
+    target_stack = models.JSONField(default=list, blank=True)
+    skipped_job_ids = models.JSONField(default=list, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"AI Analysis batch {self.id} for {self.user}"
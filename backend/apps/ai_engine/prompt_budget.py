@@ -0,0 +1,236 @@
+import math
+import re
+
+from django.conf import settings
+
+DEFAULT_TOKEN_BUDGET = 6000
+
+PRIORITY_HIGH = 3
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 1
+
+HIGH_PRIORITY_HEADINGS = (
+    "skill",
+    "experience",
+    "employment",
+    "work history",
+    "project",
+    "requirement",
+    "qualification",
+    "responsibilit",
+    "what you'll do",
+    "what you will do",
+    "what we're looking for",
+    "what we are looking for",
+    "must have",
+    "nice to have",
+    "preferred",
+    "tech stack",
+    "technologies",
+    "about the role",
+    "the role",
+)
+
+LOW_PRIORITY_HEADINGS = (
+    "about us",
+    "about the company",
+    "who we are",
+    "benefit",
+    "perk",
+    "compensation",
+    "salary",
+    "equal opportunity",
+    "diversity",
+    "how to apply",
+    "our culture",
+    "culture",
+    "privacy",
+    "interests",
+    "hobbies",
+    "references",
+    "declaration",
+)
+
+BOILERPLATE_PATTERN = re.compile(
+    r"equal opportunity employer"
+    r"|reasonable accommodation"
+    r"|without regard to (race|color|religion)"
+    r"|we use cookies|cookie (policy|settings)"
+    r"|privacy (policy|notice)"
+    r"|all rights reserved"
+    r"|^apply (now|for this job)"
+    r"|^share (this job|on)"
+    r"|^follow us"
+    r"|^sign in|^log in"
+    r"|^back to (jobs|search)"
+    r"|^©",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough local estimate for Llama-style BPE vocabularies: ~4 chars or ~0.75 words per token.
+    if not text:
+        return 0
+    return int(math.ceil(max(len(text) / 4, len(text.split()) * 1.3)))
+
+
+def get_token_budget(model: str) -> int:
+    budgets = getattr(settings, "AI_PROMPT_TOKEN_BUDGETS", {}) or {}
+    default = getattr(settings, "AI_PROMPT_DEFAULT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)
+    return int(budgets.get(model, default))
+
+
+def _heading_priority(heading: str) -> int:
+    lowered = heading.lower()
+    if any(marker in lowered for marker in LOW_PRIORITY_HEADINGS):
+        return PRIORITY_LOW
+    if any(marker in lowered for marker in HIGH_PRIORITY_HEADINGS):
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+def _looks_like_heading(line: str) -> bool:
+    if len(line) > 60 or line.endswith("."):
+        return False
+    if line.endswith(":"):
+        return True
+    letters = [char for char in line if char.isalpha()]
+    if letters and all(char.isupper() for char in letters):
+        return True
+    lowered = line.lower()
+    return any(lowered.startswith(marker) for marker in HIGH_PRIORITY_HEADINGS + LOW_PRIORITY_HEADINGS)
+
+
+def _clean_lines(text: str, stats: dict) -> list:
+    seen = set()
+    lines = []
+    for raw_line in (text or "").splitlines():
+        line = " ".join(raw_line.split())
+        if not line:
+            continue
+
+        key = line.lower()
+        if key in seen:
+            stats["duplicate_lines"] += 1
+            continue
+        seen.add(key)
+
+        if BOILERPLATE_PATTERN.search(line):
+            stats["boilerplate_lines"] += 1
+            continue
+        lines.append(line)
+    return lines
+
+
+def _split_sections(lines: list) -> list:
+    sections = [{"heading": "", "priority": PRIORITY_NORMAL, "lines": []}]
+    for line in lines:
+        if _looks_like_heading(line):
+            heading = line.rstrip(":").strip()
+            sections.append({"heading": heading, "priority": _heading_priority(heading), "lines": [line]})
+        else:
+            sections[-1]["lines"].append(line)
+    return [section for section in sections if section["lines"]]
+
+
+def _fit_text(text: str, budget: int, stats: dict) -> str:
+    sections = _split_sections(_clean_lines(text, stats))
+    for index, section in enumerate(sections):
+        section["index"] = index
+        section["tokens"] = estimate_tokens("\n".join(section["lines"]))
+
+    remaining = budget
+    kept = {}
+    for section in sorted(sections, key=lambda item: (-item["priority"], item["index"])):
+        name = section["heading"] or "(untitled)"
+        if section["tokens"] <= remaining:
+            kept[section["index"]] = section["lines"]
+            remaining -= section["tokens"]
+            continue
+
+        partial = []
+        for line in section["lines"]:
+            cost = estimate_tokens(line) + 1
+            if cost > remaining:
+                break
+            partial.append(line)
+            remaining -= cost
+
+        if partial:
+            kept[section["index"]] = partial
+            stats["truncated_sections"].append(name)
+        else:
+            stats["dropped_sections"].append(name)
+
+    return "\n".join(
+        "\n".join(kept[section["index"]]) for section in sections if section["index"] in kept
+    )
+
+
+def fit_inputs_to_budget(resume_text: str, job_description: str, budget: int) -> tuple:
+    """Clean and trim resume/JD text so together they stay within ``budget`` tokens."""
+    stats = {
+        "budget": budget,
+        "resume": {"duplicate_lines": 0, "boilerplate_lines": 0, "dropped_sections": [], "truncated_sections": []},
+        "job_description": {"duplicate_lines": 0, "boilerplate_lines": 0, "dropped_sections": [], "truncated_sections": []},
+    }
+
+    resume_tokens = estimate_tokens(resume_text)
+    job_tokens = estimate_tokens(job_description)
+    stats["resume"]["original_tokens"] = resume_tokens
+    stats["job_description"]["original_tokens"] = job_tokens
+
+    # Split the budget evenly, handing whatever one side does not need to the other.
+    half = max(0, budget) // 2
+    if resume_tokens < half:
+        resume_budget, job_budget = resume_tokens, budget - resume_tokens
+    elif job_tokens < half:
+        resume_budget, job_budget = budget - job_tokens, job_tokens
+    else:
+        resume_budget, job_budget = half, budget - half
+
+    fitted_resume = _fit_text(resume_text, resume_budget, stats["resume"])
+    fitted_job = _fit_text(job_description, job_budget, stats["job_description"])
+
+    stats["resume"]["final_tokens"] = estimate_tokens(fitted_resume)
+    stats["job_description"]["final_tokens"] = estimate_tokens(fitted_job)
+    return fitted_resume, fitted_job, stats
+
+
+def _empty_fit_stats() -> dict:
+    return {"duplicate_lines": 0, "boilerplate_lines": 0, "dropped_sections": [], "truncated_sections": []}
+
+
+def fit_packed_inputs(resume_text: str, job_descriptions: list, budget: int) -> tuple:
+    """
+    Fit one resume and several job descriptions into ``budget`` tokens.
+
+    The resume is sent once, so it is budgeted like in a single-job prompt (up to
+    half, more if the jobs need less); the rest is split evenly between the jobs,
+    with any share a short job does not use passed on to the others.
+    """
+    stats = {"budget": budget, "resume": _empty_fit_stats(), "job_descriptions": []}
+
+    resume_tokens = estimate_tokens(resume_text)
+    job_tokens = [estimate_tokens(text) for text in job_descriptions]
+    stats["resume"]["original_tokens"] = resume_tokens
+
+    half = max(0, budget) // 2
+    resume_budget = min(resume_tokens, max(half, budget - sum(job_tokens)))
+    fitted_resume = _fit_text(resume_text, resume_budget, stats["resume"])
+    stats["resume"]["final_tokens"] = estimate_tokens(fitted_resume)
+
+    remaining = max(0, budget - stats["resume"]["final_tokens"])
+    order = sorted(range(len(job_descriptions)), key=lambda index: job_tokens[index])
+    fitted_jobs = [""] * len(job_descriptions)
+    job_stats = [_empty_fit_stats() for _ in job_descriptions]
+    for position, index in enumerate(order):
+        share = remaining // (len(order) - position)
+        fitted_jobs[index] = _fit_text(job_descriptions[index], share, job_stats[index])
+        job_stats[index]["original_tokens"] = job_tokens[index]
+        job_stats[index]["final_tokens"] = estimate_tokens(fitted_jobs[index])
+        remaining -= job_stats[index]["final_tokens"]
+
+    stats["job_descriptions"] = job_stats
+    return fitted_resume, fitted_jobs, stats
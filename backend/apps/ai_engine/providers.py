@@ -0,0 +1,392 @@
+import asyncio
+import contextlib
+import hashlib
+import importlib.util
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import metrics
+from .rate_limit import RateLimited, retry_after_from_exception
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    pass
+
+
+class LLMProvider:
+    """
+    Minimal chat-completion interface used by ``apps.ai_engine.client``.
+
+    ``session`` is an opaque per-event-loop handle returned by ``open_async_session``.
+    """
+
+    name = "base"
+
+    def complete(self, *, model, messages, temperature, on_chunk=None) -> str:
+        raise NotImplementedError
+
+    async def complete_async(self, *, model, messages, temperature, session=None) -> str:
+        raise NotImplementedError
+
+    def open_async_session(self):
+        return contextlib.nullcontext()
+
+    def close(self) -> None:
+        pass
+
+
+def _http_options() -> dict:
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=getattr(settings, "AI_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=getattr(settings, "AI_HTTP_MAX_KEEPALIVE", 10),
+            keepalive_expiry=getattr(settings, "AI_HTTP_KEEPALIVE_EXPIRY", 30),
+        ),
+        "timeout": httpx.Timeout(
+            getattr(settings, "AI_HTTP_READ_TIMEOUT", 60),
+            connect=getattr(settings, "AI_HTTP_CONNECT_TIMEOUT", 5),
+            pool=getattr(settings, "AI_HTTP_POOL_TIMEOUT", 10),
+        ),
+        # HTTP/2 needs the optional ``h2`` package; fall back to HTTP/1.1 keep-alive.
+        "http2": getattr(settings, "AI_HTTP2_ENABLED", True) and importlib.util.find_spec("h2") is not None,
+    }
+
+
+class GroqProvider(LLMProvider):
+    """
+    Groq SDK behind one pooled ``httpx`` client per process.
+
+    The SDK is imported on first construction, so web processes and management
+    commands that never call the model do not pay for it.
+    """
+
+    name = "groq"
+
+    def __init__(self):
+        import groq
+        import httpx
+
+        self._groq = groq
+        self._http_options = _http_options()
+        self._client = groq.Groq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            http_client=httpx.Client(**self._http_options),
+            # Retries are left to the callers, which honour retry-after and the rate
+            # limiter; the SDK's own would multiply the requests behind each of them.
+            max_retries=0,
+        )
+
+    def complete(self, *, model, messages, temperature, on_chunk=None) -> str:
+        try:
+            if on_chunk is None:
+                response = self._client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                )
+                return response.choices[0].message.content
+
+            stream = self._client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=True,
+            )
+            parts = []
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    on_chunk(delta)
+            return "".join(parts)
+        except self._groq.RateLimitError as exc:
+            _raise_rate_limited(exc)
+
+    def open_async_session(self):
+        # AsyncGroq's connection pool is bound to the event loop it was first used on,
+        # so each loop opens its own client instead of sharing one.
+        import httpx
+
+        return self._groq.AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            http_client=httpx.AsyncClient(**self._http_options),
+            max_retries=0,
+        )
+
+    def close(self) -> None:
+        self._client.close()
+
+    async def complete_async(self, *, model, messages, temperature, session=None) -> str:
+        try:
+            if session is None:
+                async with self.open_async_session() as own_session:
+                    response = await own_session.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                    )
+            else:
+                response = await session.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                )
+            return response.choices[0].message.content
+        except self._groq.RateLimitError as exc:
+            _raise_rate_limited(exc)
+
+
+def _raise_rate_limited(exc) -> None:
+    metrics.record("provider_429")
+    retry_after = retry_after_from_exception(exc)
+    raise RateLimited(f"Groq rate limit exceeded: {exc}", retry_after=retry_after) from exc
+
+
+DEFAULT_SIMULATED_RESPONSE = {
+    "ats_score": 68,
+    "score_breakdown": {
+        "skills_match": 18,
+        "project_impact": 16,
+        "tools_frameworks": 17,
+        "role_fit": 17,
+    },
+    "missing_keywords": ["kubernetes", "terraform"],
+    "strengths": ["Relevant backend experience", "Clear project descriptions"],
+    "suggestions": ["Quantify the impact of your main projects."],
+}
+
+
+class SimulatedProvider(LLMProvider):
+    """
+    Offline stand-in for load tests and CI.
+
+    Latency is drawn from a configurable distribution, failures and 429s are injected
+    at configurable rates, and responses come from canned JSON (optionally a file).
+    """
+
+    name = "simulated"
+
+    def __init__(self, config=None):
+        config = dict(config or getattr(settings, "AI_SIMULATED_PROVIDER", {}) or {})
+        self.latency = config.get("latency", {"distribution": "lognormal", "median": 1.5, "sigma": 0.4})
+        self.failure_rate = float(config.get("failure_rate", 0))
+        self.rate_limit_rate = float(config.get("rate_limit_rate", 0))
+        self.retry_after = float(config.get("retry_after", 5))
+        self.chunk_size = int(config.get("chunk_size", 24))
+        self._random = random.Random(config.get("seed"))
+        self._lock = threading.Lock()
+        self._responses = self._load_responses(config.get("responses_path"))
+
+    @staticmethod
+    def _load_responses(path):
+        if not path:
+            return [json.dumps(DEFAULT_SIMULATED_RESPONSE)]
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        items = data if isinstance(data, list) else [data]
+        return [item if isinstance(item, str) else json.dumps(item) for item in items]
+
+    def _sample_latency(self) -> float:
+        spec = self.latency
+        distribution = spec.get("distribution", "fixed")
+        with self._lock:
+            if distribution == "uniform":
+                return self._random.uniform(spec.get("low", 0.5), spec.get("high", 2.0))
+            if distribution == "lognormal":
+                return self._random.lognormvariate(math.log(spec.get("median", 1.5)), spec.get("sigma", 0.4))
+            if distribution == "exponential":
+                return self._random.expovariate(1 / spec.get("mean", 1.5))
+            return float(spec.get("seconds", 1.0))
+
+    def _outcome(self) -> str:
+        with self._lock:
+            roll = self._random.random()
+            response = self._random.choice(self._responses)
+        if roll < self.rate_limit_rate:
+            raise RateLimited("Simulated rate limit", retry_after=self.retry_after)
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise ProviderError("Simulated provider failure")
+        return response
+
+    def complete(self, *, model, messages, temperature, on_chunk=None) -> str:
+        latency = self._sample_latency()
+        content = self._outcome()
+        if on_chunk is None:
+            time.sleep(latency)
+            return content
+
+        pieces = [content[index:index + self.chunk_size] for index in range(0, len(content), self.chunk_size)]
+        for piece in pieces:
+            time.sleep(latency / len(pieces))
+            on_chunk(piece)
+        return content
+
+    async def complete_async(self, *, model, messages, temperature, session=None) -> str:
+        latency = self._sample_latency()
+        content = self._outcome()
+        await asyncio.sleep(latency)
+        return content
+
+
+def _recording_key(model, messages) -> str:
+    encoded = json.dumps({"model": model, "messages": messages}, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class RecordingProvider(LLMProvider):
+    """Wraps another provider and appends every response to a JSONL file for later replay."""
+
+    def __init__(self, inner: LLMProvider, path: str):
+        self.inner = inner
+        self.name = f"{inner.name}+record"
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _record(self, model, messages, content):
+        line = json.dumps({"key": _recording_key(model, messages), "model": model, "content": content})
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+    def complete(self, *, model, messages, temperature, on_chunk=None) -> str:
+        content = self.inner.complete(model=model, messages=messages, temperature=temperature, on_chunk=on_chunk)
+        self._record(model, messages, content)
+        return content
+
+    async def complete_async(self, *, model, messages, temperature, session=None) -> str:
+        content = await self.inner.complete_async(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            session=session,
+        )
+        await asyncio.to_thread(self._record, model, messages, content)
+        return content
+
+    def open_async_session(self):
+        return self.inner.open_async_session()
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class ReplayProvider(SimulatedProvider):
+    """
+    Serves recorded responses for identical requests, with simulated latency.
+
+    Requests that were never recorded fall back to the canned simulated responses
+    unless ``strict`` is set.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, strict: bool = False, config=None):
+        super().__init__(config)
+        self.strict = strict
+        self._recordings = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._recordings[entry["key"]] = entry["content"]
+
+    def _lookup(self, model, messages):
+        content = self._recordings.get(_recording_key(model, messages))
+        if content is None and self.strict:
+            raise ProviderError("No recorded response for this request")
+        return content
+
+    def complete(self, *, model, messages, temperature, on_chunk=None) -> str:
+        content = self._lookup(model, messages)
+        if content is None:
+            return super().complete(model=model, messages=messages, temperature=temperature, on_chunk=on_chunk)
+        time.sleep(self._sample_latency())
+        if on_chunk is not None:
+            on_chunk(content)
+        return content
+
+    async def complete_async(self, *, model, messages, temperature, session=None) -> str:
+        content = self._lookup(model, messages)
+        if content is None:
+            return await super().complete_async(model=model, messages=messages, temperature=temperature)
+        await asyncio.sleep(self._sample_latency())
+        return content
+
+
+PROVIDER_BACKENDS = {
+    "groq": GroqProvider,
+    "simulated": SimulatedProvider,
+}
+
+_provider = None
+_provider_pid = None
+_provider_lock = threading.Lock()
+
+
+def build_provider() -> LLMProvider:
+    backend = getattr(settings, "AI_PROVIDER", "groq")
+    record_path = getattr(settings, "AI_PROVIDER_RECORDINGS_PATH", "")
+
+    if backend == "replay":
+        provider = ReplayProvider(record_path, strict=getattr(settings, "AI_PROVIDER_REPLAY_STRICT", False))
+    elif backend in PROVIDER_BACKENDS:
+        provider = PROVIDER_BACKENDS[backend]()
+    else:
+        provider = import_string(backend)()
+
+    if record_path and getattr(settings, "AI_PROVIDER_RECORD", False) and backend != "replay":
+        provider = RecordingProvider(provider, record_path)
+    logger.info("Using LLM provider %s", provider.name)
+    return provider
+
+
+def get_provider() -> LLMProvider:
+    """
+    Return this process's provider, building it on first use.
+
+    A provider inherited across ``fork`` (Celery prefork children) is rebuilt, since
+    its pooled connections are shared with the parent.
+    """
+    global _provider, _provider_pid
+    if _provider is None or _provider_pid != os.getpid():
+        with _provider_lock:
+            if _provider is None or _provider_pid != os.getpid():
+                _provider = build_provider()
+                _provider_pid = os.getpid()
+    return _provider
+
+
+def reset_provider() -> None:
+    global _provider, _provider_pid
+    with _provider_lock:
+        if _provider is not None and _provider_pid == os.getpid():
+            try:
+                _provider.close()
+            except Exception as exc:
+                logger.warning("Could not close LLM provider: %s", exc)
+        _provider = None
+        _provider_pid = None
+
+
+def _forget_provider_after_fork() -> None:
+    # Never close the inherited client here: its sockets still belong to the parent.
+    global _provider, _provider_lock, _provider_pid
+    _provider = None
+    _provider_pid = None
+    _provider_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_provider_after_fork)
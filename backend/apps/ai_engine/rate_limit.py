@@ -0,0 +1,157 @@
+import logging
+import random
+import threading
+import time
+
+import redis
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+BUCKET_KEY_PREFIX = "ai-rate-limit"
+
+# Both buckets are checked and debited atomically: either the request and its
+# tokens are granted together, or nothing is consumed and the wait is returned.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local wait = 0
+local levels = {}
+for index = 1, #KEYS do
+    local base = 1 + (index - 1) * 3
+    local capacity = tonumber(ARGV[base + 1])
+    local rate = tonumber(ARGV[base + 2])
+    local cost = tonumber(ARGV[base + 3])
+    local state = redis.call('HMGET', KEYS[index], 'level', 'updated')
+    local level = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    level = math.min(capacity, level + math.max(0, now - updated) * rate)
+    levels[index] = level
+    if level < cost and rate > 0 then
+        wait = math.max(wait, (cost - level) / rate)
+    end
+end
+for index = 1, #KEYS do
+    local base = 1 + (index - 1) * 3
+    local capacity = tonumber(ARGV[base + 1])
+    local rate = tonumber(ARGV[base + 2])
+    local cost = tonumber(ARGV[base + 3])
+    local level = levels[index]
+    if wait == 0 then
+        level = level - cost
+    end
+    redis.call('HSET', KEYS[index], 'level', level, 'updated', now)
+    redis.call('EXPIRE', KEYS[index], math.ceil(capacity / math.max(rate, 0.001)) + 60)
+end
+return tostring(wait)
+"""
+
+
+class RateLimited(Exception):
+    def __init__(self, message: str, retry_after: float = 0):
+        super().__init__(message)
+        self.retry_after = max(0.0, float(retry_after or 0))
+
+
+class InMemoryTokenBucket:
+    """Process-local stand-in for the Redis limiter, used in tests and single-process setups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def acquire(self, buckets) -> float:
+        now = time.time()
+        with self._lock:
+            wait = 0.0
+            levels = []
+            for name, capacity, rate, cost in buckets:
+                level, updated = self._state.get(name, (capacity, now))
+                level = min(capacity, level + max(0.0, now - updated) * rate)
+                levels.append(level)
+                if level < cost and rate > 0:
+                    wait = max(wait, (cost - level) / rate)
+
+            for (name, capacity, rate, cost), level in zip(buckets, levels):
+                self._state[name] = (level - cost if wait == 0 else level, now)
+            return wait
+
+
+class RedisTokenBucket:
+    def __init__(self, url: str, key_prefix: str = BUCKET_KEY_PREFIX):
+        self._redis = redis.Redis.from_url(url)
+        self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self._key_prefix = key_prefix
+
+    def acquire(self, buckets) -> float:
+        keys = [f"{self._key_prefix}:{name}" for name, _, _, _ in buckets]
+        args = [time.time()]
+        for _, capacity, rate, cost in buckets:
+            args.extend([capacity, rate, cost])
+        return float(self._script(keys=keys, args=args))
+
+
+_limiter = None
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        if getattr(settings, "AI_RATE_LIMIT_BACKEND", "redis") == "memory":
+            _limiter = InMemoryTokenBucket()
+        else:
+            _limiter = RedisTokenBucket(getattr(settings, "AI_EVENTS_REDIS_URL", None) or settings.CELERY_BROKER_URL)
+    return _limiter
+
+
+def acquire(model: str, estimated_tokens: int) -> float:
+    """
+    Try to reserve one request and ``estimated_tokens`` for ``model``.
+
+    Returns 0 when granted, otherwise the number of seconds to wait before retrying.
+    """
+    rpm = getattr(settings, "AI_RATE_LIMIT_RPM", 0)
+    tpm = getattr(settings, "AI_RATE_LIMIT_TPM", 0)
+    buckets = []
+    if rpm > 0:
+        buckets.append((f"{model}:requests", rpm, rpm / 60.0, 1))
+    if tpm > 0:
+        buckets.append((f"{model}:tokens", tpm, tpm / 60.0, min(estimated_tokens, tpm)))
+    if not buckets:
+        return 0.0
+
+    try:
+        wait = get_limiter().acquire(buckets)
+    except redis.exceptions.RedisError as exc:
+        # Fail open: Groq's own 429s still bound us, and an outage of the limiter store
+        # must not fail every analysis.
+        logger.warning("Rate limiter unavailable, calling %s unthrottled: %s", model, exc)
+        metrics.record("limiter_errors")
+        return 0.0
+    if wait > 0:
+        metrics.record("limiter_throttled")
+        metrics.record("limiter_wait_seconds", wait)
+    else:
+        metrics.record("limiter_granted")
+    return wait
+
+
+def retry_after_from_exception(exc) -> float:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        value = headers.get(header)
+        if not value:
+            continue
+        try:
+            return float(str(value).rstrip("s"))
+        except ValueError:
+            continue
+    return 0.0
+
+
+def backoff_delay(attempt: int, retry_after: float = 0) -> float:
+    base = getattr(settings, "AI_RETRY_BACKOFF_BASE", 2)
+    cap = getattr(settings, "AI_RETRY_BACKOFF_MAX", 120)
+    delay = min(cap, base * (2 ** attempt))
+    return max(retry_after, delay) + random.uniform(0, base)
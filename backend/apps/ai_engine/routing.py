@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+
+import redis
+from django.conf import settings
+
+from . import metrics
+from .rate_limit import RateLimited
+
+logger = logging.getLogger(__name__)
+
+BREAKER_KEY_PREFIX = "ai-breaker"
+
+
+class CircuitOpen(RateLimited):
+    """Every model tier is tripped; handled like a rate limit so the task is retried later."""
+
+
+class InMemoryCircuitBreaker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._open_until = {}
+        self._half_open_until = {}
+
+    def is_open(self, model: str) -> float:
+        with self._lock:
+            return max(0.0, self._open_until.get(model, 0) - time.time())
+
+    def record_success(self, model: str) -> None:
+        with self._lock:
+            self._failures.pop(model, None)
+            self._half_open_until.pop(model, None)
+
+    def record_failure(self, model: str, threshold: int, window: int, cooldown: int) -> bool:
+        now = time.time()
+        with self._lock:
+            failures = [stamp for stamp in self._failures.get(model, []) if stamp > now - window]
+            failures.append(now)
+            self._failures[model] = failures
+
+            probing = self._half_open_until.get(model, 0) > now
+            if len(failures) < threshold and not probing:
+                return False
+
+            self._open_until[model] = now + cooldown
+            self._half_open_until[model] = now + cooldown + window
+            self._failures[model] = []
+            return True
+
+
+class RedisCircuitBreaker:
+    def __init__(self, url: str):
+        self._redis = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _key(model: str, suffix: str) -> str:
+        return f"{BREAKER_KEY_PREFIX}:{model}:{suffix}"
+
+    def is_open(self, model: str) -> float:
+        ttl = self._redis.pttl(self._key(model, "open"))
+        return max(0.0, ttl / 1000.0) if ttl and ttl > 0 else 0.0
+
+    def record_success(self, model: str) -> None:
+        self._redis.delete(self._key(model, "failures"), self._key(model, "half-open"))
+
+    def record_failure(self, model: str, threshold: int, window: int, cooldown: int) -> bool:
+        failures_key = self._key(model, "failures")
+        pipe = self._redis.pipeline()
+        pipe.incr(failures_key)
+        pipe.expire(failures_key, window, nx=True)
+        pipe.exists(self._key(model, "half-open"))
+        failures, _, probing = pipe.execute()
+        if failures < threshold and not probing:
+            return False
+
+        pipe = self._redis.pipeline()
+        pipe.set(self._key(model, "open"), 1, ex=cooldown)
+        pipe.set(self._key(model, "half-open"), 1, ex=cooldown + window)
+        pipe.delete(failures_key)
+        pipe.execute()
+        return True
+
+
+_breaker = None
+
+
+def get_breaker():
+    global _breaker
+    if _breaker is None:
+        if getattr(settings, "AI_RATE_LIMIT_BACKEND", "redis") == "memory":
+            _breaker = InMemoryCircuitBreaker()
+        else:
+            _breaker = RedisCircuitBreaker(getattr(settings, "AI_EVENTS_REDIS_URL", None) or settings.CELERY_BROKER_URL)
+    return _breaker
+
+
+def get_model_tiers() -> list:
+    from .client import MODEL_NAME
+
+    tiers = getattr(settings, "AI_MODEL_TIERS", None) or []
+    if not getattr(settings, "AI_MODEL_TIERING_ENABLED", False) or not tiers:
+        return [{"name": "default", "model": MODEL_NAME, "max_input_tokens": None}]
+    return tiers
+
+
+def plan_route(input_tokens: int) -> tuple:
+    """
+    Order model tiers for one request.
+
+    The preferred tier is the first whose ``max_input_tokens`` fits the inputs; the
+    others follow as failover targets. Tiers with an open circuit are skipped.
+    Returns ``(tiers, decision)``; raises ``CircuitOpen`` if nothing is available.
+    """
+    tiers = get_model_tiers()
+    preferred_index = next(
+        (
+            index for index, tier in enumerate(tiers)
+            if tier.get("max_input_tokens") is None or input_tokens <= tier["max_input_tokens"]
+        ),
+        len(tiers) - 1,
+    )
+    ordered = [tiers[preferred_index]] + tiers[preferred_index + 1:] + list(reversed(tiers[:preferred_index]))
+
+    breaker = get_breaker()
+    available, skipped, soonest = [], [], None
+    for tier in ordered:
+        try:
+            remaining = breaker.is_open(tier["model"])
+        except Exception as exc:
+            logger.warning("Could not read circuit breaker for %s: %s", tier["model"], exc)
+            remaining = 0
+        if remaining > 0:
+            skipped.append(tier["name"])
+            soonest = remaining if soonest is None else min(soonest, remaining)
+        else:
+            available.append(tier)
+
+    decision = {
+        "input_tokens": input_tokens,
+        "preferred_tier": tiers[preferred_index]["name"],
+        "preferred_model": tiers[preferred_index]["model"],
+        "skipped_open_tiers": skipped,
+        "failovers": [],
+    }
+    if not available:
+        metrics.record("breaker_all_open")
+        raise CircuitOpen("All model tiers are temporarily unavailable", retry_after=soonest or 0)
+    return available, decision
+
+
+def record_outcome(model: str, latency: float | None = None, error: Exception | None = None) -> None:
+    breaker = get_breaker()
+    slow_threshold = getattr(settings, "AI_BREAKER_LATENCY_THRESHOLD", 0)
+    is_slow = latency is not None and slow_threshold and latency > slow_threshold
+
+    try:
+        if error is None and not is_slow:
+            breaker.record_success(model)
+            return
+
+        metrics.record("breaker_slow_calls" if error is None else "breaker_failures")
+        tripped = breaker.record_failure(
+            model,
+            threshold=getattr(settings, "AI_BREAKER_FAILURE_THRESHOLD", 5),
+            window=getattr(settings, "AI_BREAKER_WINDOW", 60),
+            cooldown=getattr(settings, "AI_BREAKER_COOLDOWN", 30),
+        )
+        if tripped:
+            metrics.record("breaker_trips")
+            logger.warning("Circuit opened for model %s", model)
+    except Exception as exc:
+        logger.warning("Could not update circuit breaker for %s: %s", model, exc)
@@ -1,12 +1,37 @@
 import logging
 
+from asgiref.sync import sync_to_async
+
 from .models import AIAnalysis
-from .client import analyze_resume
+from . import metrics
+from .cache import build_cache_key, get_cached_result, get_cached_results, store_cached_result
+from .client import analyze_resume, analyze_resume_async, analyze_resume_packed, pack_jobs
+from .local_scorer import score_locally
 
 logger = logging.getLogger(__name__)
 
 
-def run_ai_analysis(job_application, resume, candidate_level="experienced", target_stack=None):
+def get_analysis_cache_key(job_application, resume, candidate_level="experienced", target_stack=None):
+    return build_cache_key(
+        resume_text=resume.parsed_text,
+        job_description=job_application.job_description,
+        candidate_level=candidate_level,
+        target_stack=target_stack,
+        job_title=job_application.job_title,
+    )
+
+
+def get_provisional_analysis(job_application, resume, candidate_level="experienced", target_stack=None):
+    return score_locally(
+        resume_text=resume.parsed_text,
+        job_description=job_application.job_description,
+        candidate_level=candidate_level,
+        target_stack=target_stack,
+        job_title=job_application.job_title,
+    )
+
+
+def _validate_analysis_inputs(job_application, resume, candidate_level):
     if not job_application:
         raise ValueError("JobApplication does not exist")
 
@@ -33,6 +58,30 @@ def run_ai_analysis(job_application, resume, candidate_level="experienced", targ
         candidate_level,
         len(resume.parsed_text) if resume.parsed_text is not None else 0,
     )
+    return candidate_level
+
+
+def _normalize_result(result: dict) -> dict:
+    return {
+        "ats_score": result.get("ats_score", 0),
+        "score_breakdown": result.get("score_breakdown", {}),
+        "missing_keywords": result.get("missing_keywords", []),
+        "strengths": result.get("strengths", []),
+        "suggestions": result.get("suggestions", []),
+        "prompt_stats": result.get("prompt_stats", {}),
+        "model": result.get("model", ""),
+        "routing": result.get("routing", {}),
+    }
+
+
+def run_ai_analysis(job_application, resume, candidate_level="experienced", target_stack=None, on_chunk=None):
+    candidate_level = _validate_analysis_inputs(job_application, resume, candidate_level)
+
+    cache_key = get_analysis_cache_key(job_application, resume, candidate_level, target_stack)
+    cached = get_cached_result(cache_key)
+    if cached is not None:
+        logger.info("Using cached AI analysis for job_id=%s", job_application.id)
+        return cached
 
     try:
         result = analyze_resume(
@@ -41,6 +90,7 @@ def run_ai_analysis(job_application, resume, candidate_level="experienced", targ
             candidate_level=candidate_level,
             target_stack=target_stack,
             job_title=job_application.job_title,
+            on_chunk=on_chunk,
         )
     except Exception as exc:
         logger.exception("AI client failed for job_id=%s: %s", job_application.id, exc)
@@ -48,11 +98,96 @@ def run_ai_analysis(job_application, resume, candidate_level="experienced", targ
 
     logger.debug("AI result for job_id=%s: %s", job_application.id, result)
 
-    return {
-        "ats_score": result.get("ats_score", 0),
-        "score_breakdown": result.get("score_breakdown", {}),
-        "missing_keywords": result.get("missing_keywords", []),
-        "strengths": result.get("strengths", []),
-        "suggestions": result.get("suggestions", []),
-    }
+    normalized = _normalize_result(result)
+    store_cached_result(cache_key, normalized)
+    return normalized
+
+
+async def run_ai_analysis_async(
+    job_application,
+    resume,
+    candidate_level="experienced",
+    target_stack=None,
+    async_session=None,
+):
+    candidate_level = _validate_analysis_inputs(job_application, resume, candidate_level)
+
+    cache_key = get_analysis_cache_key(job_application, resume, candidate_level, target_stack)
+    cached = await sync_to_async(get_cached_result)(cache_key)
+    if cached is not None:
+        logger.info("Using cached AI analysis for job_id=%s", job_application.id)
+        return cached
+
+    try:
+        result = await analyze_resume_async(
+            resume_text=resume.parsed_text,
+            job_description=job_application.job_description,
+            candidate_level=candidate_level,
+            target_stack=target_stack,
+            job_title=job_application.job_title,
+            async_session=async_session,
+        )
+    except Exception as exc:
+        logger.exception("AI client failed for job_id=%s: %s", job_application.id, exc)
+        raise
+
+    logger.debug("AI result for job_id=%s: %s", job_application.id, result)
+
+    normalized = _normalize_result(result)
+    await sync_to_async(store_cached_result)(cache_key, normalized)
+    return normalized
+
+
+def run_packed_ai_analysis(job_applications, resume, candidate_level="experienced", target_stack=None):
+    """
+    Analyze several jobs against one resume with packed prompts.
+
+    Returns ``{job_id: result}`` for the jobs that were answered (from cache or a
+    packed call). Jobs missing from the result should be run with ``run_ai_analysis``.
+    Packed answers are read from the cache but never written to it.
+    """
+    results = {}
+    pending = []
+    for job_application in job_applications:
+        try:
+            candidate_level = _validate_analysis_inputs(job_application, resume, candidate_level)
+        except ValueError:
+            # Left to the single-job path, which reports the error on the row.
+            continue
+        cache_key = get_analysis_cache_key(job_application, resume, candidate_level, target_stack)
+        pending.append((job_application, cache_key))
+
+    cached = get_cached_results([key for _, key in pending])
+    jobs = []
+    keys = {}
+    for job_application, cache_key in pending:
+        if cache_key in cached:
+            results[job_application.id] = cached[cache_key]
+            continue
+        keys[job_application.id] = cache_key
+        jobs.append({
+            "key": job_application.id,
+            "job_description": job_application.job_description,
+            "job_title": job_application.job_title,
+        })
+
+    for pack in pack_jobs(resume.parsed_text, jobs):
+        try:
+            packed = analyze_resume_packed(
+                resume_text=resume.parsed_text,
+                jobs=pack,
+                candidate_level=candidate_level,
+                target_stack=target_stack,
+            )
+        except Exception as exc:
+            logger.warning("Packed analysis of %s jobs failed, falling back to single calls: %s", len(pack), exc)
+            metrics.record("packed_prompt_failures")
+            continue
 
+        metrics.record("packed_prompts")
+        metrics.record("packed_jobs_answered", len(packed))
+        for job_id, result in packed.items():
+            # Not cached: the single-job keys stand for the single-job prompt on the model
+            # routed for one job, and a packed answer comes from neither.
+            results[job_id] = _normalize_result(result)
+    return results
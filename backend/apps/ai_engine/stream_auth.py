@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+
+SALT = "ai-analysis-stream"
+
+
+def stream_token_ttl() -> int:
+    return getattr(settings, "AI_STREAM_AUTH_TOKEN_TTL", 60)
+
+
+def issue_stream_token(user, job_id) -> str:
+    """A signed token that lets ``user`` open the event stream of one job, briefly."""
+    return signing.dumps({"user": user.pk, "job": int(job_id)}, salt=SALT)
+
+
+class StreamTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates ``?token=`` on the stream endpoint. Browsers' ``EventSource`` cannot
+    send an Authorization header, so the client first trades its JWT for one of these.
+    ``request.auth`` is the token payload, so the view can check which job it is for.
+    """
+
+    def authenticate(self, request):
+        token = request.query_params.get("token")
+        if not token:
+            return None
+        try:
+            payload = signing.loads(token, salt=SALT, max_age=stream_token_ttl())
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed("Stream token has expired.")
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed("Invalid stream token.")
+
+        user = get_user_model().objects.filter(pk=payload.get("user"), is_active=True).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed("Invalid stream token.")
+        return user, payload
+
+    def authenticate_header(self, request):
+        return "Bearer"
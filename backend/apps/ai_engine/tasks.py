@@ -1,19 +1,44 @@
-from celery import shared_task
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from celery import group, shared_task
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from apps.jobs.models import JobApplication
 from apps.resumes.models import Resume
 from apps.ai_engine.models import AIAnalysis
-from .services import run_ai_analysis
+from . import metrics
+from .client import open_async_session
+from .events import publish_analysis_event
+from .serializers import AIAnalysisSerializer
+from .rate_limit import RateLimited, backoff_delay
+from .services import (
+    get_provisional_analysis,
+    run_ai_analysis,
+    run_ai_analysis_async,
+    run_packed_ai_analysis,
+)
 
+logger = logging.getLogger(__name__)
 
-@shared_task
-def run_ai_analysis_task(job_id, resume_id, candidate_level, target_stack=None):
-    analysis = None
 
-    try:
-        job = JobApplication.objects.get(id=job_id)
-        resume = Resume.objects.get(id=resume_id, user=job.user)
-        target_stack = target_stack or []
+class AnalysisSuperseded(Exception):
+    pass
 
+
+def _start_analysis(job_id, resume_id, candidate_level, target_stack, run_id=None):
+    job = JobApplication.objects.get(id=job_id)
+    resume = Resume.objects.get(id=resume_id, user=job.user)
+
+    if run_id:
+        # A newer request with different inputs replaced this run; skip the Groq call.
+        analysis = AIAnalysis.objects.filter(job_application=job).first()
+        if not analysis or analysis.run_id != run_id:
+            raise AnalysisSuperseded(f"Analysis run {run_id} for job_id={job_id} was superseded")
+    else:
         analysis, _ = AIAnalysis.objects.update_or_create(
             job_application=job,
             defaults={
@@ -21,45 +46,327 @@ def run_ai_analysis_task(job_id, resume_id, candidate_level, target_stack=None):
                 "candidate_level": candidate_level,
                 "target_stack": target_stack,
                 "status": "processing",
+                "started_at": timezone.now(),
                 "error_message": "",
             },
         )
+    publish_analysis_event(job.id, "status", {"status": "processing"})
+    return job, resume, analysis
+
+
+def _publish_result(analysis):
+    job_id = analysis.job_application_id
+    publish_analysis_event(job_id, "status", {"status": analysis.status})
+    publish_analysis_event(job_id, "result", AIAnalysisSerializer(analysis).data)
+
+
+def _lock_if_current(analysis):
+    """Lock the row and report whether ``analysis`` still owns it (call inside atomic)."""
+    current_run_id = (
+        AIAnalysis.objects.select_for_update()
+        .filter(pk=analysis.pk)
+        .values_list("run_id", flat=True)
+        .first()
+    )
+    if current_run_id is None or current_run_id != analysis.run_id:
+        metrics.record("superseded_writes_skipped")
+        logger.info("Skipping write for superseded analysis job_id=%s", analysis.job_application_id)
+        return False
+    return True
+
+
+@transaction.atomic
+def _complete_analysis(analysis, resume, candidate_level, target_stack, result):
+    if not _lock_if_current(analysis):
+        return
+
+    analysis.status = "completed"
+    analysis.is_provisional = False
+    analysis.resume = resume
+    analysis.candidate_level = candidate_level
+    analysis.target_stack = target_stack
+    analysis.error_message = ""
+    analysis.ats_score = result.get("ats_score", 0)
+    analysis.score_breakdown = result.get("score_breakdown", {})
+    analysis.missing_keywords = result.get("missing_keywords", [])
+    analysis.strengths = result.get("strengths", [])
+    analysis.suggestions = result.get("suggestions", [])
+    if "prompt_stats" in result:
+        prompt_stats = result["prompt_stats"] or {}
+        analysis.prompt_tokens = prompt_stats.get("prompt_tokens", 0)
+        analysis.prompt_trimmed = {
+            key: value for key, value in prompt_stats.items() if key != "prompt_tokens"
+        }
+    if result.get("model"):
+        analysis.model_name = result["model"]
+        analysis.routing_decision = result.get("routing", {})
+    analysis.save(update_fields=[
+        "status",
+        "is_provisional",
+        "resume",
+        "candidate_level",
+        "target_stack",
+        "error_message",
+        "ats_score",
+        "score_breakdown",
+        "missing_keywords",
+        "strengths",
+        "suggestions",
+        "prompt_tokens",
+        "prompt_trimmed",
+        "model_name",
+        "routing_decision",
+    ])
+    _publish_result(analysis)
+
+
+@transaction.atomic
+def _fail_analysis(analysis, exc):
+    if not _lock_if_current(analysis):
+        return
+
+    if getattr(settings, "AI_LOCAL_FALLBACK_ENABLED", True) and _apply_local_fallback(analysis, exc):
+        _publish_result(analysis)
+        return
+
+    analysis.status = "failed"
+    analysis.error_message = str(exc)
+    analysis.save(update_fields=["status", "error_message"])
+    _publish_result(analysis)
+
+
+def _apply_local_fallback(analysis, exc):
+    job = analysis.job_application
+    resume = analysis.resume
+    if not resume or not (resume.parsed_text or "").strip() or not (job.job_description or "").strip():
+        return False
+
+    try:
+        result = get_provisional_analysis(job, resume, analysis.candidate_level, analysis.target_stack)
+    except Exception:
+        logger.exception("Local fallback scoring failed for job_id=%s", job.id)
+        return False
+
+    analysis.status = "completed"
+    analysis.is_provisional = True
+    analysis.error_message = f"AI analysis unavailable, showing a local estimate instead: {exc}"
+    for field, value in result.items():
+        setattr(analysis, field, value)
+    analysis.save(update_fields=[
+        "status",
+        "is_provisional",
+        "error_message",
+        "ats_score",
+        "score_breakdown",
+        "missing_keywords",
+        "strengths",
+        "suggestions",
+    ])
+    return True
+
+
+def _record_queue_wait(enqueued_at):
+    if enqueued_at:
+        metrics.record("queue_wait_seconds", max(0.0, time.time() - enqueued_at))
+        metrics.record("queue_wait_count")
+
+
+@shared_task(bind=True)
+def run_ai_analysis_task(
+    self,
+    job_id,
+    resume_id,
+    candidate_level,
+    target_stack=None,
+    enqueued_at=None,
+    run_id=None,
+):
+    analysis = None
+    if not self.request.retries:
+        _record_queue_wait(enqueued_at)
+
+    try:
+        target_stack = target_stack or []
+        job, resume, analysis = _start_analysis(job_id, resume_id, candidate_level, target_stack, run_id)
+
+        on_chunk = None
+        if getattr(settings, "AI_STREAM_TOKENS", False):
+            def on_chunk(delta):
+                publish_analysis_event(job_id, "chunk", {"content": delta})
 
         result = run_ai_analysis(
             job,
             resume,
             candidate_level=candidate_level,
             target_stack=target_stack,
+            on_chunk=on_chunk,
         )
 
-        analysis.status = "completed"
-        analysis.resume = resume
-        analysis.candidate_level = candidate_level
-        analysis.target_stack = target_stack
-        analysis.error_message = ""
-        analysis.ats_score = result.get("ats_score", 0)
-        analysis.score_breakdown = result.get("score_breakdown", {})
-        analysis.missing_keywords = result.get("missing_keywords", [])
-        analysis.strengths = result.get("strengths", [])
-        analysis.suggestions = result.get("suggestions", [])
-        analysis.save(update_fields=[
-            "status",
-            "resume",
-            "candidate_level",
-            "target_stack",
-            "error_message",
-            "ats_score",
-            "score_breakdown",
-            "missing_keywords",
-            "strengths",
-            "suggestions",
-        ])
+        _complete_analysis(analysis, resume, candidate_level, target_stack, result)
 
     except (JobApplication.DoesNotExist, Resume.DoesNotExist):
         return
+    except AnalysisSuperseded as exc:
+        metrics.record("superseded_runs_skipped")
+        logger.info("%s", exc)
+        return
+    except RateLimited as exc:
+        max_retries = getattr(settings, "AI_RETRY_MAX_ATTEMPTS", 5)
+        if self.request.called_directly or self.request.retries >= max_retries:
+            if analysis and not self.request.called_directly:
+                _fail_analysis(analysis, exc)
+            raise
+        # Leave the row in "processing" and let the limiter / provider window reopen.
+        countdown = backoff_delay(self.request.retries, exc.retry_after)
+        metrics.record("retries_scheduled")
+        logger.info("Rate limited for job_id=%s, retrying in %.1fs", job_id, countdown)
+        raise self.retry(exc=exc, countdown=countdown, max_retries=max_retries)
     except Exception as exc:
         if analysis:
-            analysis.status = "failed"
-            analysis.error_message = str(exc)
-            analysis.save(update_fields=["status", "error_message"])
+            _fail_analysis(analysis, exc)
         raise
+
+
+async def _run_one_async(semaphore, async_session, job_id, run_id, resume_id, candidate_level, target_stack):
+    analysis = None
+
+    max_retries = getattr(settings, "AI_RETRY_MAX_ATTEMPTS", 5)
+
+    try:
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    job, resume, analysis = await sync_to_async(_start_analysis)(
+                        job_id, resume_id, candidate_level, target_stack, run_id
+                    )
+                    result = await run_ai_analysis_async(
+                        job,
+                        resume,
+                        candidate_level=candidate_level,
+                        target_stack=target_stack,
+                        async_session=async_session,
+                    )
+                break
+            except RateLimited as exc:
+                if attempt >= max_retries:
+                    raise
+                metrics.record("retries_scheduled")
+                await asyncio.sleep(backoff_delay(attempt, exc.retry_after))
+                attempt += 1
+        await sync_to_async(_complete_analysis)(analysis, resume, candidate_level, target_stack, result)
+
+    except (JobApplication.DoesNotExist, Resume.DoesNotExist):
+        return
+    except AnalysisSuperseded as exc:
+        metrics.record("superseded_runs_skipped")
+        logger.info("%s", exc)
+    except Exception as exc:
+        logger.exception("Async analysis failed for job_id=%s", job_id)
+        if analysis:
+            await sync_to_async(_fail_analysis)(analysis, exc)
+
+
+async def _run_many_async(job_runs, resume_id, candidate_level, target_stack):
+    semaphore = asyncio.Semaphore(max(1, getattr(settings, "AI_ASYNC_MAX_IN_FLIGHT", 8)))
+    async with open_async_session() as async_session:
+        await asyncio.gather(*(
+            _run_one_async(semaphore, async_session, job_id, run_id, resume_id, candidate_level, target_stack)
+            for job_id, run_id in job_runs
+        ))
+
+
+@shared_task
+def run_ai_analysis_async_task(job_runs, resume_id, candidate_level, target_stack=None):
+    # Keeps up to AI_ASYNC_MAX_IN_FLIGHT Groq calls open from a single worker slot;
+    # status transitions are the same as run_ai_analysis_task, per job.
+    asyncio.run(_run_many_async(list(job_runs), resume_id, candidate_level, target_stack or []))
+
+
+@shared_task
+def run_ai_analysis_batch_lane_task(job_runs, resume_id, candidate_level, target_stack=None):
+    # Each lane works through its jobs one at a time so a batch never holds more
+    # than AI_BATCH_MAX_CONCURRENCY worker slots.
+    max_retries = getattr(settings, "AI_RETRY_MAX_ATTEMPTS", 5)
+    for job_id, run_id in job_runs:
+        for attempt in range(max_retries + 1):
+            try:
+                run_ai_analysis_task(job_id, resume_id, candidate_level, target_stack, run_id=run_id)
+            except RateLimited as exc:
+                if attempt < max_retries:
+                    metrics.record("retries_scheduled")
+                    time.sleep(backoff_delay(attempt, exc.retry_after))
+                    continue
+                _fail_rate_limited_job(job_id, run_id, exc)
+            except Exception:
+                logger.exception("Batch analysis failed for job_id=%s", job_id)
+            break
+
+
+@shared_task
+def run_ai_analysis_packed_lane_task(job_runs, resume_id, candidate_level, target_stack=None):
+    # Jobs in a lane share one resume, so they are scored with packed prompts; any job
+    # a packed response did not answer validly is run on its own.
+    target_stack = target_stack or []
+    started = []
+    resume = None
+    for job_id, run_id in job_runs:
+        try:
+            job, resume, analysis = _start_analysis(job_id, resume_id, candidate_level, target_stack, run_id)
+        except (JobApplication.DoesNotExist, Resume.DoesNotExist):
+            continue
+        except AnalysisSuperseded as exc:
+            metrics.record("superseded_runs_skipped")
+            logger.info("%s", exc)
+            continue
+        started.append((job, analysis, run_id))
+
+    results = {}
+    if started:
+        try:
+            results = run_packed_ai_analysis([job for job, _, _ in started], resume, candidate_level, target_stack)
+        except Exception:
+            logger.exception("Packed analysis failed for resume_id=%s", resume_id)
+
+    leftover = []
+    for job, analysis, run_id in started:
+        result = results.get(job.id)
+        if result is None:
+            leftover.append([job.id, run_id])
+            continue
+        _complete_analysis(analysis, resume, candidate_level, target_stack, result)
+
+    if leftover:
+        metrics.record("packed_fallback_jobs", len(leftover))
+        run_ai_analysis_batch_lane_task(leftover, resume_id, candidate_level, target_stack)
+
+
+def _fail_rate_limited_job(job_id, run_id, exc):
+    analysis = AIAnalysis.objects.filter(job_application_id=job_id, run_id=run_id).first()
+    if analysis:
+        _fail_analysis(analysis, exc)
+
+
+def dispatch_ai_analysis_batch(job_runs, resume_id, candidate_level, target_stack=None):
+    """Queue ``(job_id, run_id)`` pairs that share one resume and analysis settings."""
+    job_runs = [list(pair) for pair in job_runs]
+    if not job_runs:
+        return None
+
+    if getattr(settings, "AI_ASYNC_CLIENT_ENABLED", False):
+        return run_ai_analysis_async_task.delay(job_runs, resume_id, candidate_level, target_stack)
+
+    max_lanes = max(1, getattr(settings, "AI_BATCH_MAX_CONCURRENCY", 4))
+    lane_task = run_ai_analysis_batch_lane_task
+    lane_count = min(max_lanes, len(job_runs))
+    if getattr(settings, "AI_PACKED_PROMPTS_ENABLED", False):
+        # Fewer, fuller lanes so each one has enough jobs to pack into a prompt.
+        pack_size = max(1, getattr(settings, "AI_PACKED_MAX_JOBS", 4))
+        lane_task = run_ai_analysis_packed_lane_task
+        lane_count = min(max_lanes, -(-len(job_runs) // pack_size))
+    lanes = [job_runs[index::lane_count] for index in range(lane_count)]
+
+    return group(
+        lane_task.si(lane, resume_id, candidate_level, target_stack)
+        for lane in lanes
+    ).apply_async()
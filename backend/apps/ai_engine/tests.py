@@ -1,3 +1,741 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import redis
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.jobs.models import JobApplication
+from apps.resumes.models import Resume
+from . import client, events, hedging, metrics, prompt_budget, providers, rate_limit, routing, services
+from .cache import build_cache_key, cached_analysis_fields, get_cached_result, store_cached_result
+from .local_scorer import score_locally
+from .models import AIAnalysis
+from .rate_limit import InMemoryTokenBucket
+from .routing import InMemoryCircuitBreaker
+from .services import get_analysis_cache_key
+from .stream_auth import issue_stream_token
+from .tasks import AnalysisSuperseded, _complete_analysis, _start_analysis
+
+
+def make_user(name="alice"):
+    return get_user_model().objects.create_user(username=name, email=f"{name}@example.com", password="pw")
+
+
+def fake_stream(job_id, snapshot, include_chunks=False):
+    yield f"event: status\ndata: {{\"job\": {job_id}}}\n\n"
+
+
+@mock.patch("apps.ai_engine.views.stream_analysis_events", fake_stream)
+class StreamTokenTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.job = JobApplication.objects.create(user=self.user, job_title="Backend Engineer")
+        self.client = APIClient()
+
+    def stream(self, job_id, token):
+        return self.client.get(f"/api/ai/stream/{job_id}/", {"token": token})
+
+    def test_issued_token_opens_the_stream(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(f"/api/ai/stream/{self.job.id}/token/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f"/api/ai/stream/{self.job.id}/?token=", response.data["stream_url"])
+
+        self.client.force_authenticate(None)
+        response = self.stream(self.job.id, response.data["token"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertIn(b"event: status", b"".join(response.streaming_content))
+
+    def test_stream_without_credentials_is_rejected(self):
+        self.assertEqual(self.client.get(f"/api/ai/stream/{self.job.id}/").status_code, 401)
+
+    def test_token_is_bound_to_its_job(self):
+        other = JobApplication.objects.create(user=self.user, job_title="Other")
+        self.assertEqual(self.stream(other.id, issue_stream_token(self.user, self.job.id)).status_code, 403)
+
+    def test_token_for_another_users_job_is_not_found(self):
+        mallory = make_user("mallory")
+        self.assertEqual(self.stream(self.job.id, issue_stream_token(mallory, self.job.id)).status_code, 404)
+
+    def test_forged_and_expired_tokens_are_rejected(self):
+        forged = signing.dumps({"user": self.user.pk, "job": self.job.id}, salt="other")
+        self.assertEqual(self.stream(self.job.id, forged).status_code, 401)
+
+        token = issue_stream_token(self.user, self.job.id)
+        with override_settings(AI_STREAM_AUTH_TOKEN_TTL=-1):
+            self.assertEqual(self.stream(self.job.id, token).status_code, 401)
+
+    def test_token_request_needs_the_jwt_user(self):
+        self.assertEqual(self.client.post(f"/api/ai/stream/{self.job.id}/token/").status_code, 401)
+
+
+class StreamEventsTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = mock.Mock()
+        self.pubsub = self.redis.pubsub.return_value
+        self.pubsub.get_message.return_value = None
+        patcher = mock.patch.object(events, "_get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stream(self, status="processing"):
+        return events.stream_analysis_events(1, lambda: (status, {"status": status}), timeout=5)
+
+    def test_redis_outage_sends_the_current_status_and_closes(self):
+        self.pubsub.subscribe.side_effect = redis.exceptions.ConnectionError("connection refused")
+        frames = list(self.stream("completed"))
+        self.assertEqual([frame.split("\n")[0] for frame in frames], ["event: status", "event: result"])
+        self.assertIn("poll the result endpoint", frames[0])
+
+        self.pubsub.subscribe.side_effect = None
+        self.pubsub.get_message.side_effect = redis.exceptions.ConnectionError("connection reset")
+        frames = list(self.stream())
+        self.assertEqual(len(frames), 2)
+        self.assertIn("interrupted", frames[1])
+
+    @override_settings(AI_STREAM_MAX_OPEN=1)
+    def test_streams_past_the_limit_are_told_to_poll(self):
+        held = self.stream()
+        self.assertIn("processing", next(held))
+        frames = list(self.stream())
+        self.assertEqual(len(frames), 1)
+        self.assertIn("Too many open streams", frames[0])
+
+        held.close()
+        self.assertNotIn("detail", next(self.stream()))
+
+
+class InMemoryTokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("apps.ai_engine.rate_limit.time.time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.bucket = InMemoryTokenBucket()
+
+    def test_grants_up_to_capacity_then_returns_the_wait(self):
+        for _ in range(3):
+            self.assertEqual(self.bucket.acquire([("requests", 3, 1.0, 1)]), 0)
+        self.assertAlmostEqual(self.bucket.acquire([("requests", 3, 1.0, 1)]), 1.0)
+
+    def test_refills_at_the_rate_but_not_past_capacity(self):
+        self.assertEqual(self.bucket.acquire([("tokens", 10, 2.0, 10)]), 0)
+        self.now += 2.5
+        self.assertAlmostEqual(self.bucket.acquire([("tokens", 10, 2.0, 10)]), 2.5)
+        self.now += 2.5
+        self.assertEqual(self.bucket.acquire([("tokens", 10, 2.0, 10)]), 0)
+        self.now += 3600
+        self.assertEqual(self.bucket.acquire([("tokens", 10, 2.0, 10)]), 0)
+        self.assertGreater(self.bucket.acquire([("tokens", 10, 2.0, 1)]), 0)
+
+    def test_buckets_are_debited_together_or_not_at_all(self):
+        self.assertEqual(self.bucket.acquire([("tokens", 100, 1.0, 95)]), 0)
+        wait = self.bucket.acquire([("requests", 5, 1.0, 1), ("tokens", 100, 1.0, 10)])
+        self.assertAlmostEqual(wait, 5.0)
+        # The refused call took nothing from the request bucket.
+        for _ in range(5):
+            self.assertEqual(self.bucket.acquire([("requests", 5, 1.0, 1)]), 0)
+
+    @override_settings(AI_RATE_LIMIT_RPM=2, AI_RATE_LIMIT_TPM=1000)
+    def test_acquire_reserves_requests_and_tokens_per_model(self):
+        with mock.patch.object(rate_limit, "_limiter", self.bucket), mock.patch.object(metrics, "record"):
+            self.assertEqual(rate_limit.acquire("model-a", 5000), 0)
+            self.assertAlmostEqual(rate_limit.acquire("model-a", 10), 0.6)
+            self.assertEqual(rate_limit.acquire("model-b", 10), 0)
+
+    @override_settings(AI_RATE_LIMIT_RPM=2)
+    def test_limiter_outage_fails_open(self):
+        limiter = mock.Mock()
+        limiter.acquire.side_effect = redis.exceptions.ConnectionError("connection refused")
+        with mock.patch.object(rate_limit, "_limiter", limiter), mock.patch.object(metrics, "record") as record:
+            self.assertEqual(rate_limit.acquire("model-a", 10), 0)
+        record.assert_called_once_with("limiter_errors")
+
+    @override_settings(AI_RATE_LIMIT_COMPLETION_TOKENS=100)
+    def test_packed_calls_reserve_one_completion_per_job(self):
+        jobs = [{"key": key, "job_description": "Build Django APIs.", "job_title": "Backend"} for key in (1, 2, 3)]
+        with mock.patch.object(client, "acquire", return_value=4.0) as acquire:
+            with self.assertRaises(rate_limit.RateLimited):
+                client.analyze_resume_packed("Python Django", jobs)
+        model, tokens = acquire.call_args.args
+        _, prompt_stats = client._build_packed_messages("Python Django", jobs, model=model)
+        self.assertEqual(tokens, prompt_stats["prompt_tokens"] + 3 * 100)
+
+
+@mock.patch("apps.ai_engine.tasks.publish_analysis_event")
+@mock.patch("apps.ai_engine.views.dispatch_ai_analysis_batch")
+@mock.patch("apps.ai_engine.views.run_ai_analysis_task")
+class AnalysisCoalescingTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.job = JobApplication.objects.create(
+            user=self.user, job_title="Backend Engineer", job_description="Build Django APIs with Python and Redis."
+        )
+        self.resume = Resume.objects.create(user=self.user, file="resumes/cv.pdf", parsed_text="Python Django Redis")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def analyze(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f"/api/ai/analyze/{self.job.id}/", {"resume_id": self.resume.id, **data}, format="json"
+            )
+
+    def analyze_batch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                "/api/ai/analyze/batch/", {"resume_id": self.resume.id, "job_ids": [self.job.id]}, format="json"
+            )
+
+    def test_identical_request_joins_the_running_analysis(self, task, dispatch, publish):
+        self.assertEqual(self.analyze().status_code, 202)
+        run_id = AIAnalysis.objects.get(job_application=self.job).run_id
+
+        response = self.analyze()
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.data["coalesced"])
+        self.assertEqual(task.delay.call_count, 1)
+        self.assertEqual(AIAnalysis.objects.get(job_application=self.job).run_id, run_id)
+
+        response = self.analyze_batch()
+        self.assertEqual((response.data["coalesced"], response.data["queued"]), (1, 0))
+        dispatch.assert_called_once_with([], self.resume.id, "experienced", [])
+
+    def test_stale_run_is_replaced_by_a_new_run(self, task, dispatch, publish):
+        self.analyze()
+        stale = timezone.now() - timedelta(seconds=301)
+        AIAnalysis.objects.filter(job_application=self.job).update(started_at=stale)
+        old_run_id = AIAnalysis.objects.get(job_application=self.job).run_id
+
+        response = self.analyze()
+        self.assertNotIn("coalesced", response.data)
+        self.assertEqual(task.delay.call_count, 2)
+        analysis = AIAnalysis.objects.get(job_application=self.job)
+        self.assertNotEqual(analysis.run_id, old_run_id)
+        self.assertGreater(analysis.started_at, stale)
+
+        AIAnalysis.objects.filter(job_application=self.job).update(started_at=stale)
+        response = self.analyze_batch()
+        self.assertEqual((response.data["coalesced"], response.data["queued"]), (0, 1))
+
+    def test_different_inputs_supersede_the_running_analysis(self, task, dispatch, publish):
+        self.analyze()
+        old_run_id = AIAnalysis.objects.get(job_application=self.job).run_id
+        self.analyze(candidate_level="fresher")
+        self.assertEqual(task.delay.call_count, 2)
+        new_run_id = task.delay.call_args.kwargs["run_id"]
+
+        with self.assertRaises(AnalysisSuperseded):
+            _start_analysis(self.job.id, self.resume.id, "experienced", [], run_id=old_run_id)
+        job, resume, analysis = _start_analysis(self.job.id, self.resume.id, "fresher", [], run_id=new_run_id)
+        self.assertEqual(analysis.run_id, new_run_id)
+
+    def test_superseded_run_does_not_write_its_result(self, task, dispatch, publish):
+        self.analyze()
+        _, _, analysis = _start_analysis(
+            self.job.id, self.resume.id, "experienced", [], run_id=task.delay.call_args.kwargs["run_id"]
+        )
+        self.analyze(candidate_level="fresher")
+
+        with mock.patch.object(metrics, "record") as record:
+            _complete_analysis(analysis, self.resume, "experienced", [], {"ats_score": 99})
+        record.assert_called_once_with("superseded_writes_skipped")
+        current = AIAnalysis.objects.get(job_application=self.job)
+        self.assertEqual(current.status, "processing")
+        self.assertEqual(current.candidate_level, "fresher")
+        self.assertNotEqual(current.ats_score, 99)
+
+    def test_running_analysis_stays_with_its_batch(self, task, dispatch, publish):
+        other = JobApplication.objects.create(
+            user=self.user, job_title="Data Engineer", job_description="Build pipelines with Python and SQL."
+        )
+        first = self.analyze_batch()
+        self.assertEqual(first.data["queued"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.client.post(
+                "/api/ai/analyze/batch/",
+                {"resume_id": self.resume.id, "job_ids": [self.job.id, other.id], "candidate_level": "fresher"},
+                format="json",
+            )
+        self.assertEqual((second.data["total"], second.data["busy_job_ids"]), (1, [self.job.id]))
+        analysis = AIAnalysis.objects.get(job_application=self.job)
+        self.assertEqual((analysis.batch_id, analysis.candidate_level), (first.data["batch_id"], "experienced"))
+        progress = self.client.get(f"/api/ai/batch/{first.data['batch_id']}/").data
+        self.assertEqual((progress["total"], progress["counts"]["processing"]), (1, 1))
+
+        self.assertEqual(self.analyze_batch().status_code, 409)
+
+    def test_batch_locks_the_jobs_and_their_analyses(self, task, dispatch, publish):
+        lock_jobs = mock.patch.object(
+            JobApplication.objects, "select_for_update", wraps=JobApplication.objects.select_for_update
+        )
+        lock_analyses = mock.patch.object(
+            AIAnalysis.objects, "select_for_update", wraps=AIAnalysis.objects.select_for_update
+        )
+        with lock_jobs as jobs, lock_analyses as analyses:
+            self.analyze_batch()
+        jobs.assert_called_once_with()
+        analyses.assert_called_once_with()
+
+    def test_cache_hit_records_the_model_that_produced_the_result(self, task, dispatch, publish):
+        AIAnalysis.objects.create(
+            job_application=self.job, status="completed", model_name="old-model", routing_decision={"tier": "old"}
+        )
+        store_cached_result(
+            get_analysis_cache_key(self.job, self.resume, "experienced", []),
+            {
+                "ats_score": 81,
+                "score_breakdown": {},
+                "missing_keywords": [],
+                "strengths": ["Django"],
+                "suggestions": [],
+                "model": "large-model",
+                "routing": {"preferred_model": "large-model", "tier": "large"},
+            },
+        )
+
+        response = self.analyze()
+        self.assertEqual(response.status_code, 200)
+        analysis = AIAnalysis.objects.get(job_application=self.job)
+        self.assertEqual((analysis.ats_score, analysis.model_name), (81, "large-model"))
+        self.assertEqual(analysis.routing_decision["tier"], "large")
+        task.delay.assert_not_called()
+
+
+TIERS = [
+    {"name": "fast", "model": "small-model", "max_input_tokens": 1000},
+    {"name": "medium", "model": "medium-model", "max_input_tokens": 4000},
+    {"name": "large", "model": "large-model", "max_input_tokens": None},
+]
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("apps.ai_engine.routing.time.time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = InMemoryCircuitBreaker()
+
+    def fail(self, model="small-model"):
+        return self.breaker.record_failure(model, threshold=3, window=60, cooldown=30)
+
+    def test_trips_after_threshold_failures_within_the_window(self):
+        self.assertFalse(self.fail())
+        self.now += 61
+        self.assertFalse(self.fail())
+        self.assertFalse(self.fail())
+        self.assertEqual(self.breaker.is_open("small-model"), 0)
+        self.assertTrue(self.fail())
+        self.assertAlmostEqual(self.breaker.is_open("small-model"), 30)
+        self.assertEqual(self.breaker.is_open("large-model"), 0)
+
+    def test_half_open_probe_failure_trips_again_and_success_closes(self):
+        for _ in range(3):
+            self.fail()
+        self.now += 31
+        self.assertEqual(self.breaker.is_open("small-model"), 0)
+        self.assertTrue(self.fail())
+
+        self.now += 31
+        self.breaker.record_success("small-model")
+        self.assertFalse(self.fail())
+
+
+@override_settings(AI_MODEL_TIERING_ENABLED=True, AI_MODEL_TIERS=TIERS)
+class PlanRouteTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = InMemoryCircuitBreaker()
+        for patcher in (mock.patch.object(routing, "_breaker", self.breaker), mock.patch.object(metrics, "record")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def trip(self, model):
+        self.breaker.record_failure(model, threshold=1, window=60, cooldown=30)
+
+    def test_prefers_the_smallest_tier_that_fits_then_fails_over(self):
+        tiers, decision = routing.plan_route(500)
+        self.assertEqual([tier["name"] for tier in tiers], ["fast", "medium", "large"])
+        self.assertEqual(decision["preferred_model"], "small-model")
+
+        tiers, decision = routing.plan_route(2000)
+        self.assertEqual([tier["name"] for tier in tiers], ["medium", "large", "fast"])
+        self.assertEqual(decision["preferred_tier"], "medium")
+
+    def test_open_tiers_are_skipped(self):
+        self.trip("medium-model")
+        tiers, decision = routing.plan_route(2000)
+        self.assertEqual([tier["name"] for tier in tiers], ["large", "fast"])
+        self.assertEqual(decision["preferred_tier"], "medium")
+        self.assertEqual(decision["skipped_open_tiers"], ["medium"])
+
+    def test_all_tiers_open_raises_circuit_open(self):
+        for tier in TIERS:
+            self.trip(tier["model"])
+        with self.assertRaises(routing.CircuitOpen) as raised:
+            routing.plan_route(10)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+    def test_record_outcome_trips_on_slow_calls(self):
+        with override_settings(AI_BREAKER_FAILURE_THRESHOLD=2, AI_BREAKER_LATENCY_THRESHOLD=5):
+            routing.record_outcome("large-model", latency=1)
+            routing.record_outcome("large-model", latency=6)
+            routing.record_outcome("large-model", latency=7)
+        self.assertGreater(self.breaker.is_open("large-model"), 0)
+
+
+class RoutedResultCacheTests(TestCase):
+    def result(self, model, preferred_model="large-model"):
+        routing_decision = {"preferred_tier": "large", "preferred_model": preferred_model, "tier": "large"}
+        return {"ats_score": 70, "model": model, "routing": routing_decision}
+
+    def test_only_the_preferred_models_results_are_cached(self):
+        store_cached_result("served-by-failover", self.result("small-model"))
+        self.assertIsNone(get_cached_result("served-by-failover"))
+
+        store_cached_result("served-by-preferred", self.result("large-model"))
+        cached = get_cached_result("served-by-preferred")
+        self.assertEqual(cached_analysis_fields(cached)["model_name"], "large-model")
+        self.assertEqual(cached_analysis_fields(cached)["routing_decision"]["tier"], "large")
+
+    def test_key_changes_with_the_model_tiers(self):
+        default_key = build_cache_key("resume", "job", "experienced")
+        with override_settings(AI_MODEL_TIERING_ENABLED=True, AI_MODEL_TIERS=TIERS):
+            self.assertNotEqual(build_cache_key("resume", "job", "experienced"), default_key)
+
+
+class FakeProvider:
+    """Completes per model: a string is returned, an Event is waited on first, an exception is raised."""
+
+    def __init__(self, **answers):
+        self.answers = answers
+        self.calls = []
+        self.release = threading.Event()
+
+    def _answer(self, model):
+        self.calls.append(model)
+        answer = self.answers[model.replace("-", "_")]
+        if isinstance(answer, Exception):
+            raise answer
+        if answer.startswith("slow:"):
+            self.release.wait(5)
+            answer = answer[len("slow:"):]
+        return answer
+
+    def complete(self, model, messages, temperature):
+        return self._answer(model)
+
+    async def complete_async(self, model, messages, temperature, session=None):
+        answer = self.answers[model.replace("-", "_")]
+        if isinstance(answer, str) and answer.startswith("slow:"):
+            self.calls.append(model)
+            await asyncio.sleep(5)
+            return answer[len("slow:"):]
+        return self._answer(model)
+
+
+def validate(content):
+    if content == "invalid":
+        raise ValueError("unparseable response")
+    return {"content": content}
+
+
+@override_settings(AI_HEDGE_MODEL="hedge-model")
+class HedgedCompletionTests(SimpleTestCase):
+    def setUp(self):
+        patchers = [
+            mock.patch.object(hedging, "_tracker", hedging.LatencyTracker()),
+            mock.patch.object(hedging, "_budget", hedging.HedgeBudget(ratio=1, burst=5)),
+            mock.patch.object(hedging, "hedge_delay", return_value=0.05),
+            mock.patch.object(hedging, "acquire", return_value=0),
+            mock.patch.object(metrics, "record"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def complete(self, provider):
+        self.addCleanup(provider.release.set)
+        return hedging.complete_hedged(
+            provider, model="main-model", messages=[], temperature=0, validate=validate, estimated_tokens=10
+        )
+
+    def test_fast_primary_is_not_hedged(self):
+        provider = FakeProvider(main_model="primary", hedge_model="hedge")
+        result, model, hedge = self.complete(provider)
+        self.assertEqual((result["content"], model, hedge), ("primary", "main-model", {"fired": False}))
+        self.assertEqual(provider.calls, ["main-model"])
+
+    def test_hedge_wins_against_a_slow_primary(self):
+        provider = FakeProvider(main_model="slow:primary", hedge_model="hedge")
+        result, model, hedge = self.complete(provider)
+        self.assertEqual((result["content"], model), ("hedge", "hedge-model"))
+        self.assertEqual((hedge["fired"], hedge["winner"]), (True, "hedge"))
+        metrics.record.assert_any_call("hedges_won")
+
+    def test_invalid_hedge_answer_does_not_win(self):
+        provider = FakeProvider(main_model="slow:primary", hedge_model="invalid")
+        threading.Timer(0.2, provider.release.set).start()
+        result, model, hedge = self.complete(provider)
+        self.assertEqual((result["content"], model, hedge["winner"]), ("primary", "main-model", "primary"))
+
+    def test_both_failing_raises_the_last_error(self):
+        provider = FakeProvider(main_model="slow:invalid", hedge_model=RuntimeError("provider down"))
+        threading.Timer(0.2, provider.release.set).start()
+        with self.assertRaises(ValueError):
+            self.complete(provider)
+
+    def test_no_hedge_without_budget(self):
+        provider = FakeProvider(main_model="slow:primary", hedge_model="hedge")
+        threading.Timer(0.2, provider.release.set).start()
+        with mock.patch.object(hedging, "_budget", hedging.HedgeBudget(ratio=0, burst=0)):
+            result, model, hedge = self.complete(provider)
+        self.assertEqual((result["content"], hedge["fired"]), ("primary", False))
+        self.assertEqual(provider.calls, ["main-model"])
+        metrics.record.assert_any_call("hedge_skipped_budget")
+
+    def test_async_hedge_wins_and_cancels_the_primary(self):
+        provider = FakeProvider(main_model="slow:primary", hedge_model="hedge")
+
+        async def race():
+            result = await hedging.complete_hedged_async(
+                provider, model="main-model", messages=[], temperature=0, validate=validate, estimated_tokens=10
+            )
+            # Let the cancellation of the primary reach it.
+            await asyncio.sleep(0)
+            return result, [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+        (result, model, hedge), leftover = asyncio.run(race())
+        self.assertEqual((result["content"], model, hedge["winner"]), ("hedge", "hedge-model", "hedge"))
+        self.assertEqual(leftover, [])
+
+
+def packed_entry(job_id, skills_match):
+    breakdown = {"skills_match": skills_match, "project_impact": 15, "tools_frameworks": 15, "role_fit": 20}
+    return {"job_id": job_id, "score_breakdown": breakdown, "strengths": ["Python"]}
+
+
+class PackedPromptTests(TestCase):
+    @override_settings(AI_PACKED_MAX_JOBS=2, AI_PACKED_PROMPT_TOKEN_BUDGET=1000)
+    def test_packs_are_capped_by_job_count_and_token_budget(self):
+        jobs = [{"key": key, "job_description": "word " * size} for key, size in enumerate([50, 50, 50, 2000, 50])]
+        packs = client.pack_jobs("resume " * 100, jobs)
+        self.assertEqual([[job["key"] for job in pack] for pack in packs], [[0, 1], [2], [3], [4]])
+
+    def test_response_is_split_by_job_position(self):
+        content = json.dumps({"results": [
+            packed_entry("2", 10),
+            packed_entry(" 1 ", 20),
+            packed_entry("1", 5),
+            packed_entry("3", 25),
+            {"job_id": "1", "ats_score": 50},
+            "not an entry",
+        ]})
+        results = client._parse_packed_response(content, 2)
+        self.assertEqual({position: result["ats_score"] for position, result in results.items()}, {1: 70, 2: 60})
+        self.assertEqual(client._parse_packed_response("not json", 2), {})
+
+    def test_results_are_mapped_back_to_the_job_keys(self):
+        provider = mock.Mock()
+        provider.complete.return_value = json.dumps({"results": [packed_entry("1", 20)]})
+        jobs = [
+            {"key": 41, "job_description": "Build Django APIs.", "job_title": "Backend"},
+            {"key": 42, "job_description": "Build data pipelines.", "job_title": "Data"},
+        ]
+        with mock.patch.object(client, "get_provider", return_value=provider), \
+                mock.patch.object(client, "acquire", return_value=0), \
+                mock.patch.object(client, "record_outcome"):
+            results = client.analyze_resume_packed("Python Django", jobs)
+        self.assertEqual(list(results), [41])
+        self.assertEqual(results[41]["routing"]["packed_jobs"], 2)
+        prompt = provider.complete.call_args.kwargs["messages"][1]["content"]
+        self.assertIn("JOB_ID: 1\nJOB_TITLE: Backend", prompt)
+        self.assertIn("JOB_ID: 2\nJOB_TITLE: Data", prompt)
+
+    def test_packed_answers_are_not_cached(self):
+        user = make_user()
+        job = JobApplication.objects.create(user=user, job_title="Backend", job_description="Build Django APIs.")
+        resume = Resume.objects.create(user=user, file="resumes/cv.pdf", parsed_text="Python Django")
+        answer = {
+            **packed_entry("1", 20),
+            "ats_score": 70,
+            "model": client.MODEL_NAME,
+            "routing": {"preferred_model": client.MODEL_NAME},
+        }
+        with mock.patch.object(services, "analyze_resume_packed", return_value={job.id: answer}), \
+                mock.patch.object(metrics, "record"):
+            results = services.run_packed_ai_analysis([job], resume)
+        self.assertEqual(results[job.id]["ats_score"], 70)
+        self.assertIsNone(get_cached_result(get_analysis_cache_key(job, resume)))
+
+
+def section(heading, count, line):
+    return "\n".join([f"{heading}:"] + [f"{line} number {index}" for index in range(count)])
+
+
+class PromptBudgetTests(SimpleTestCase):
+    resume = "\n".join([
+        section("Experience", 8, "Built Django services handling payments traffic"),
+        section("Hobbies", 20, "Hiking and photography on weekends"),
+    ])
+    job = "\n".join([
+        section("Requirements", 8, "Five years of Python and Django in production"),
+        section("Benefits", 20, "Generous health insurance and home office budget"),
+    ])
+
+    @override_settings(AI_PROMPT_TOKEN_BUDGETS={"small-model": 1000}, AI_PROMPT_DEFAULT_TOKEN_BUDGET=4000)
+    def test_budget_is_per_model_with_a_default(self):
+        self.assertEqual(prompt_budget.get_token_budget("small-model"), 1000)
+        self.assertEqual(prompt_budget.get_token_budget("unknown-model"), 4000)
+
+    def test_both_inputs_are_kept_and_low_priority_sections_go_first(self):
+        resume, job, stats = prompt_budget.fit_inputs_to_budget(self.resume, self.job, 300)
+        self.assertIn("payments traffic number 7", resume)
+        self.assertIn("Python and Django in production number 7", job)
+        self.assertLessEqual(stats["resume"]["final_tokens"], 150)
+        self.assertLessEqual(stats["job_description"]["final_tokens"], 150)
+        self.assertEqual(stats["resume"]["truncated_sections"], ["Hobbies"])
+        self.assertEqual(stats["job_description"]["truncated_sections"], ["Benefits"])
+
+    def test_a_short_side_hands_its_unused_share_to_the_other(self):
+        resume, job, stats = prompt_budget.fit_inputs_to_budget("Python developer", self.job, 300)
+        self.assertEqual(resume, "Python developer")
+        self.assertGreater(stats["job_description"]["final_tokens"], 150)
+        self.assertLessEqual(stats["job_description"]["final_tokens"], 300 - stats["resume"]["final_tokens"])
+
+    def test_duplicates_and_boilerplate_are_removed_before_trimming(self):
+        job = "Python and Django\nPython and Django\nWe are an equal opportunity employer."
+        _, fitted, stats = prompt_budget.fit_inputs_to_budget("Python", job, 1000)
+        self.assertEqual(fitted, "Python and Django")
+        self.assertEqual(
+            (stats["job_description"]["duplicate_lines"], stats["job_description"]["boilerplate_lines"]), (1, 1)
+        )
+
+    def test_packed_jobs_share_what_is_left_after_the_resume(self):
+        jobs = ["Short Python role", self.job, self.job]
+        resume, jobs, stats = prompt_budget.fit_packed_inputs(self.resume, jobs, 600)
+        self.assertIn("payments traffic number 0", resume)
+        self.assertEqual(jobs[0], "Short Python role")
+        used = stats["resume"]["final_tokens"] + sum(job["final_tokens"] for job in stats["job_descriptions"])
+        self.assertLessEqual(used, 600)
+        self.assertTrue(all("Python and Django in production number 0" in job for job in jobs[1:]))
+
+
+class LocalScorerTests(SimpleTestCase):
+    job = (
+        "Backend Engineer\n"
+        "Build REST APIs in Python and Django.\n"
+        "Run PostgreSQL and Redis in production on AWS with Docker.\n"
+        "Experience with Celery and Kubernetes is a plus."
+    )
+    matching = (
+        "Built Django REST APIs in Python serving 2M users.\n"
+        "Optimized PostgreSQL queries, reduced latency by 40%.\n"
+        "Deployed services with Docker on AWS; ran Celery workers backed by Redis."
+    )
+    unrelated = "Led store operations and retail merchandising.\nManaged seasonal staff schedules."
+
+    def test_scores_stay_in_range_with_all_breakdown_keys(self):
+        for resume in (self.matching, self.unrelated, ""):
+            with self.subTest(resume=resume[:20]):
+                result = score_locally(resume, self.job, job_title="Backend Engineer")
+                self.assertEqual(set(result["score_breakdown"]), set(client.BREAKDOWN_KEYS))
+                self.assertTrue(all(0 <= value <= 25 for value in result["score_breakdown"].values()))
+                self.assertEqual(result["ats_score"], sum(result["score_breakdown"].values()))
+
+    def test_empty_inputs_score_zero_without_errors(self):
+        result = score_locally("", "")
+        self.assertEqual((result["ats_score"], result["missing_keywords"], result["strengths"]), (0, [], []))
+
+    def test_matching_resume_scores_higher_than_an_unrelated_one(self):
+        matching = score_locally(self.matching, self.job, job_title="Backend Engineer")
+        unrelated = score_locally(self.unrelated, self.job, job_title="Backend Engineer")
+        self.assertGreater(matching["ats_score"], unrelated["ats_score"] + 30)
+        self.assertIn("kubernetes", matching["missing_keywords"])
+        self.assertNotIn("django", matching["missing_keywords"])
+        self.assertIn("django", unrelated["missing_keywords"])
+
+    def test_target_stack_terms_count_as_required_tools(self):
+        without = score_locally(self.matching, self.job)
+        with_stack = score_locally(self.matching, self.job, target_stack=["Terraform", "Kafka"])
+        self.assertLess(
+            with_stack["score_breakdown"]["tools_frameworks"], without["score_breakdown"]["tools_frameworks"]
+        )
+        self.assertIn("terraform", with_stack["missing_keywords"])
+
+
+INSTANT = {"latency": {"distribution": "fixed", "seconds": 0}, "seed": 1}
+MESSAGES = [{"role": "user", "content": "Score this resume."}]
+
+
+class ProviderTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "recordings.jsonl")
+
+    def test_backend_is_chosen_by_setting(self):
+        cases = [
+            ({"AI_PROVIDER": "simulated"}, providers.SimulatedProvider),
+            ({"AI_PROVIDER": "replay", "AI_PROVIDER_RECORDINGS_PATH": self.path}, providers.ReplayProvider),
+            ({"AI_PROVIDER": "apps.ai_engine.providers.SimulatedProvider"}, providers.SimulatedProvider),
+            (
+                {"AI_PROVIDER": "simulated", "AI_PROVIDER_RECORD": True, "AI_PROVIDER_RECORDINGS_PATH": self.path},
+                providers.RecordingProvider,
+            ),
+        ]
+        for overrides, expected in cases:
+            with self.subTest(overrides), override_settings(AI_SIMULATED_PROVIDER=INSTANT, **overrides):
+                self.assertIs(type(providers.build_provider()), expected)
+
+    def test_simulated_failures_and_chunks(self):
+        with self.assertRaises(rate_limit.RateLimited) as raised:
+            providers.SimulatedProvider({**INSTANT, "rate_limit_rate": 1, "retry_after": 7}).complete(
+                model="m", messages=MESSAGES, temperature=0
+            )
+        self.assertEqual(raised.exception.retry_after, 7)
+        with self.assertRaises(providers.ProviderError):
+            providers.SimulatedProvider({**INSTANT, "failure_rate": 1}).complete(
+                model="m", messages=MESSAGES, temperature=0
+            )
+
+        chunks = []
+        content = providers.SimulatedProvider({**INSTANT, "chunk_size": 10}).complete(
+            model="m", messages=MESSAGES, temperature=0, on_chunk=chunks.append
+        )
+        self.assertEqual("".join(chunks), content)
+        self.assertEqual(json.loads(content), providers.DEFAULT_SIMULATED_RESPONSE)
+
+    def test_replay_serves_what_was_recorded(self):
+        inner = mock.Mock(spec=providers.LLMProvider, complete=mock.Mock(return_value='{"ats_score": 91}'))
+        inner.name = "fake"
+        providers.RecordingProvider(inner, self.path).complete(model="m", messages=MESSAGES, temperature=0)
+
+        replay = providers.ReplayProvider(self.path, strict=True, config=INSTANT)
+        self.assertEqual(replay.complete(model="m", messages=MESSAGES, temperature=0), '{"ats_score": 91}')
+        self.assertEqual(
+            asyncio.run(replay.complete_async(model="m", messages=MESSAGES, temperature=0)), '{"ats_score": 91}'
+        )
+        with self.assertRaises(providers.ProviderError):
+            replay.complete(model="other-model", messages=MESSAGES, temperature=0)
+
+        lenient = providers.ReplayProvider(self.path, config=INSTANT)
+        fallback = lenient.complete(model="other-model", messages=MESSAGES, temperature=0)
+        self.assertEqual(json.loads(fallback), providers.DEFAULT_SIMULATED_RESPONSE)
+
+    def test_groq_sdk_retries_are_off(self):
+        provider = providers.GroqProvider()
+        self.addCleanup(provider.close)
+        self.assertEqual(provider._client.max_retries, 0)
+        self.assertEqual(provider.open_async_session().max_retries, 0)
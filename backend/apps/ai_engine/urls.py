@@ -1,7 +1,18 @@
 from django.urls import path
-from .views import RunAIAnalysisView, AIAnalysisResultView
+from .views import (
+    RunAIAnalysisView,
+    AIAnalysisResultView,
+    AIAnalysisStreamView,
+    AIAnalysisStreamTokenView,
+    BatchAIAnalysisView,
+    AnalysisBatchResultView,
+)
 
 urlpatterns = [
     path('analyze/<int:job_id>/', RunAIAnalysisView.as_view(), name='run-ai-analysis'),
     path('result/<int:job_id>/', AIAnalysisResultView.as_view(), name='ai-analysis-result'),
+    path('stream/<int:job_id>/', AIAnalysisStreamView.as_view(), name='ai-analysis-stream'),
+    path('stream/<int:job_id>/token/', AIAnalysisStreamTokenView.as_view(), name='ai-analysis-stream-token'),
+    path('analyze/batch/', BatchAIAnalysisView.as_view(), name='run-ai-analysis-batch'),
+    path('batch/<int:batch_id>/', AnalysisBatchResultView.as_view(), name='ai-analysis-batch-result'),
 ]
\ No newline at end of file
@@ -1,13 +1,58 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import permissions, status
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
 from apps.jobs.models import JobApplication
 from apps.resumes.models import Resume
-from .models import AIAnalysis
+from .cache import cached_analysis_fields, get_cached_result, get_cached_results
+from .events import format_sse, stream_analysis_events
+from .models import AIAnalysis, AnalysisBatch
 from .serializers import AIAnalysisSerializer
-from .tasks import run_ai_analysis_task
+from .services import get_analysis_cache_key, get_provisional_analysis
+from .stream_auth import StreamTokenAuthentication, issue_stream_token, stream_token_ttl
+from .tasks import dispatch_ai_analysis_batch, run_ai_analysis_task
+
+
+def _is_running(analysis) -> bool:
+    """
+    Whether ``analysis`` has a run in flight. Runs older than ``AI_COALESCE_STALE_AFTER``
+    are presumed stuck (a dead worker, or a long rate-limit retry) and may be replaced.
+    """
+    if analysis.status != "processing" or not analysis.started_at:
+        return False
+    stale_after = timedelta(seconds=getattr(settings, "AI_COALESCE_STALE_AFTER", 300))
+    return timezone.now() - analysis.started_at < stale_after
+
+
+def _is_joinable_run(analysis, input_hash) -> bool:
+    """Whether a new request for ``input_hash`` can attach to ``analysis`` instead of starting its own run."""
+    return analysis.input_hash == input_hash and _is_running(analysis)
+
+
+def _lock_analyses(job_ids) -> dict:
+    """
+    Locks the jobs, then their analyses, in id order, and returns the analyses by job id.
+    Locking the job rows too keeps a concurrent request from creating the one-to-one
+    analysis row in between.
+    """
+    list(JobApplication.objects.select_for_update().filter(id__in=job_ids).order_by("id").values_list("id"))
+    return {
+        analysis.job_application_id: analysis
+        for analysis in AIAnalysis.objects.select_for_update().filter(job_application_id__in=job_ids)
+    }
 
 
 class RunAIAnalysisView(APIView):
@@ -60,17 +105,71 @@ class RunAIAnalysisView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        analysis, _ = AIAnalysis.objects.update_or_create(
-            job_application=job,
-            defaults={
-                "resume": resume,
-                "candidate_level": candidate_level,
-                "target_stack": target_stack,
-                "status": "processing",
-                "error_message": "",
-            },
-        )
-        run_ai_analysis_task.delay(job.id, resume.id, candidate_level, target_stack)
+        cache_key = get_analysis_cache_key(job, resume, candidate_level, target_stack)
+        cached = get_cached_result(cache_key)
+        run_id = uuid.uuid4().hex
+
+        with transaction.atomic():
+            current = _lock_analyses([job.id]).get(job.id)
+            if cached is None and current and _is_joinable_run(current, cache_key):
+                # Same inputs are already being analyzed: attach to that run instead of
+                # enqueuing a duplicate Groq call.
+                return Response(
+                    {
+                        "analysis_id": current.id,
+                        "status": "processing",
+                        "candidate_level": candidate_level,
+                        "target_stack": target_stack,
+                        "coalesced": True,
+                        "message": "An identical AI analysis is already running. Poll the result endpoint for updates.",
+                    },
+                    status=status.HTTP_202_ACCEPTED,
+                )
+
+            if cached is not None:
+                analysis, _ = AIAnalysis.objects.update_or_create(
+                    job_application=job,
+                    defaults={
+                        "resume": resume,
+                        "candidate_level": candidate_level,
+                        "target_stack": target_stack,
+                        "status": "completed",
+                        "is_provisional": False,
+                        "input_hash": cache_key,
+                        "run_id": run_id,
+                        "error_message": "",
+                        **cached_analysis_fields(cached),
+                    },
+                )
+                return Response(AIAnalysisSerializer(analysis).data, status=status.HTTP_200_OK)
+
+            # A new run_id supersedes any older in-flight run for this job.
+            provisional = get_provisional_analysis(job, resume, candidate_level, target_stack)
+            analysis, _ = AIAnalysis.objects.update_or_create(
+                job_application=job,
+                defaults={
+                    "resume": resume,
+                    "candidate_level": candidate_level,
+                    "target_stack": target_stack,
+                    "status": "processing",
+                    "is_provisional": True,
+                    "input_hash": cache_key,
+                    "run_id": run_id,
+                    "started_at": timezone.now(),
+                    "error_message": "",
+                    **provisional,
+                },
+            )
+            transaction.on_commit(
+                lambda: run_ai_analysis_task.delay(
+                    job.id,
+                    resume.id,
+                    candidate_level,
+                    target_stack,
+                    enqueued_at=time.time(),
+                    run_id=run_id,
+                )
+            )
 
         return Response(
             {
@@ -78,6 +177,7 @@ class RunAIAnalysisView(APIView):
                 "status": "processing",
                 "candidate_level": candidate_level,
                 "target_stack": target_stack,
+                "provisional": {"is_provisional": True, **provisional},
                 "message": "AI analysis has started. Poll the result endpoint for updates.",
             },
             status=status.HTTP_202_ACCEPTED,
@@ -100,3 +200,278 @@ class AIAnalysisResultView(APIView):
 
         serializer = AIAnalysisSerializer(analysis)
         return Response(serializer.data)
+
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = "text/event-stream"
+    format = "txt"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error responses reach the renderer; the stream itself bypasses it.
+        return format_sse("error", data).encode("utf-8")
+
+
+class AIAnalysisStreamTokenView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, job_id):
+        get_object_or_404(JobApplication, id=job_id, user=request.user)
+        token = issue_stream_token(request.user, job_id)
+        return Response(
+            {
+                "token": token,
+                "expires_in": stream_token_ttl(),
+                "stream_url": request.build_absolute_uri(
+                    reverse("ai-analysis-stream", args=[job_id]) + f"?token={token}"
+                ),
+            }
+        )
+
+
+class AIAnalysisStreamView(APIView):
+    # The stream token comes first: EventSource clients cannot send the JWT header.
+    authentication_classes = [StreamTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request, job_id):
+        if isinstance(request.auth, dict) and request.auth.get("job") != job_id:
+            return Response({"detail": "Stream token is for another job."}, status=status.HTTP_403_FORBIDDEN)
+        get_object_or_404(JobApplication, id=job_id, user=request.user)
+        include_chunks = str(request.query_params.get("tokens", "")).strip().lower() in {"1", "true", "yes"}
+
+        def snapshot():
+            analysis = AIAnalysis.objects.filter(job_application__id=job_id).first()
+            if not analysis:
+                return "pending", {"status": "pending"}
+            return analysis.status, AIAnalysisSerializer(analysis).data
+
+        response = StreamingHttpResponse(
+            stream_analysis_events(job_id, snapshot, include_chunks=include_chunks),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class BatchAIAnalysisView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @staticmethod
+    def _parse_job_ids(value):
+        if not isinstance(value, list):
+            return None
+        job_ids = []
+        for item in value:
+            try:
+                job_ids.append(int(item))
+            except (TypeError, ValueError):
+                return None
+        return list(dict.fromkeys(job_ids))
+
+    def post(self, request):
+        resume_id = request.data.get("resume_id")
+        candidate_level = str(
+            request.data.get("candidate_level", AIAnalysis.CANDIDATE_LEVEL_EXPERIENCED)
+        ).strip().lower()
+        target_stack = RunAIAnalysisView._normalize_target_stack(request.data.get("target_stack"))
+        analyze_all = str(request.data.get("all", "")).strip().lower() in {"1", "true", "yes"}
+
+        if not resume_id:
+            return Response(
+                {"detail": "resume_id is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        allowed_levels = {
+            AIAnalysis.CANDIDATE_LEVEL_FRESHER,
+            AIAnalysis.CANDIDATE_LEVEL_EXPERIENCED,
+        }
+        if candidate_level not in allowed_levels:
+            return Response(
+                {"detail": "candidate_level must be either 'fresher' or 'experienced'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        jobs_qs = JobApplication.objects.filter(user=request.user)
+        if not analyze_all:
+            job_ids = self._parse_job_ids(request.data.get("job_ids"))
+            if not job_ids:
+                return Response(
+                    {"detail": "Provide a non-empty job_ids list or set all=true."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            jobs_qs = jobs_qs.filter(id__in=job_ids)
+
+        resume = get_object_or_404(Resume, id=resume_id, user=request.user)
+        if not (resume.parsed_text or "").strip():
+            return Response(
+                {"detail": "Selected resume is not parsed yet."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        jobs = list(jobs_qs.only("id", "user_id", "job_title", "job_description"))
+        if not analyze_all:
+            unknown_ids = sorted(set(job_ids) - {job.id for job in jobs})
+            if unknown_ids:
+                return Response(
+                    {"detail": "Some job applications were not found.", "job_ids": unknown_ids},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+
+        max_jobs = getattr(settings, "AI_BATCH_MAX_JOBS", 100)
+        if len(jobs) > max_jobs:
+            return Response(
+                {"detail": f"A batch can contain at most {max_jobs} job applications."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ready_jobs = [job for job in jobs if (job.job_description or "").strip()]
+        ready_ids = {job.id for job in ready_jobs}
+        skipped_job_ids = sorted(job.id for job in jobs if job.id not in ready_ids)
+        if not ready_jobs:
+            return Response(
+                {"detail": "None of the selected jobs has a job description.", "skipped_job_ids": skipped_job_ids},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cache_keys = {
+            job.id: get_analysis_cache_key(job, resume, candidate_level, target_stack)
+            for job in ready_jobs
+        }
+        cached_results = get_cached_results(cache_keys.values())
+
+        with transaction.atomic():
+            existing = _lock_analyses(ready_ids)
+            # An analysis has one batch at a time; taking a running one over would throw off
+            # the counts of the batch that started it.
+            busy_job_ids = sorted(
+                job_id for job_id, analysis in existing.items()
+                if analysis.batch_id and _is_running(analysis)
+            )
+            ready_jobs = [job for job in ready_jobs if job.id not in busy_job_ids]
+            if not ready_jobs:
+                return Response(
+                    {
+                        "detail": "All of the selected jobs are still running in another batch.",
+                        "busy_job_ids": busy_job_ids,
+                        "skipped_job_ids": skipped_job_ids,
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            batch = AnalysisBatch.objects.create(
+                user=request.user,
+                resume=resume,
+                candidate_level=candidate_level,
+                target_stack=target_stack,
+                skipped_job_ids=skipped_job_ids,
+            )
+
+            to_create, to_update, queued_runs, coalesced_ids = [], [], [], []
+            for job in ready_jobs:
+                analysis = existing.get(job.id) or AIAnalysis(job_application=job)
+                cached = cached_results.get(cache_keys[job.id])
+                if cached is None and analysis.pk and _is_joinable_run(analysis, cache_keys[job.id]):
+                    # Already running with the same inputs; just track it in this batch.
+                    coalesced_ids.append(analysis.pk)
+                    continue
+
+                analysis.batch = batch
+                analysis.input_hash = cache_keys[job.id]
+                analysis.run_id = uuid.uuid4().hex
+                analysis.resume = resume
+                analysis.candidate_level = candidate_level
+                analysis.target_stack = target_stack
+                analysis.error_message = ""
+
+                if cached is not None:
+                    analysis.status = "completed"
+                    analysis.is_provisional = False
+                    for field, value in cached_analysis_fields(cached).items():
+                        setattr(analysis, field, value)
+                else:
+                    analysis.status = "processing"
+                    analysis.is_provisional = True
+                    analysis.started_at = timezone.now()
+                    provisional = get_provisional_analysis(job, resume, candidate_level, target_stack)
+                    for field, value in provisional.items():
+                        setattr(analysis, field, value)
+                    queued_runs.append((job.id, analysis.run_id))
+
+                if analysis.pk:
+                    to_update.append(analysis)
+                else:
+                    to_create.append(analysis)
+
+            AIAnalysis.objects.filter(pk__in=coalesced_ids).update(batch=batch)
+            AIAnalysis.objects.bulk_create(to_create)
+            AIAnalysis.objects.bulk_update(to_update, [
+                "batch",
+                "resume",
+                "candidate_level",
+                "target_stack",
+                "status",
+                "is_provisional",
+                "input_hash",
+                "run_id",
+                "started_at",
+                "error_message",
+                "ats_score",
+                "score_breakdown",
+                "missing_keywords",
+                "strengths",
+                "suggestions",
+                "model_name",
+                "routing_decision",
+            ])
+
+            transaction.on_commit(
+                lambda: dispatch_ai_analysis_batch(queued_runs, resume.id, candidate_level, target_stack)
+            )
+
+        return Response(
+            {
+                "batch_id": batch.id,
+                "total": len(ready_jobs),
+                "queued": len(queued_runs),
+                "coalesced": len(coalesced_ids),
+                "cached": len(ready_jobs) - len(queued_runs) - len(coalesced_ids),
+                "skipped_job_ids": skipped_job_ids,
+                "busy_job_ids": busy_job_ids,
+                "candidate_level": candidate_level,
+                "target_stack": target_stack,
+                "message": "Batch AI analysis has started. Poll the batch endpoint for updates.",
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class AnalysisBatchResultView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, batch_id):
+        batch = get_object_or_404(AnalysisBatch, id=batch_id, user=request.user)
+        analyses = list(batch.analyses.select_related("job_application").order_by("job_application_id"))
+
+        counts = {"pending": 0, "processing": 0, "completed": 0, "failed": 0}
+        for row in batch.analyses.values("status").annotate(total=Count("id")):
+            counts[row["status"]] = row["total"]
+        total = len(analyses)
+        finished = counts["completed"] + counts["failed"]
+
+        return Response(
+            {
+                "batch_id": batch.id,
+                "resume": batch.resume_id,
+                "candidate_level": batch.candidate_level,
+                "target_stack": batch.target_stack,
+                "skipped_job_ids": batch.skipped_job_ids,
+                "total": total,
+                "counts": counts,
+                "progress": round(finished / total, 4) if total else 1.0,
+                "status": "completed" if finished == total else "processing",
+                "results": AIAnalysisSerializer(analyses, many=True).data,
+            }
+        )
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import JobApplication
+from .models import ExtractionStrategyStats, JobApplication, JobImportBatch, JobPageSnapshot
 
 
 @admin.register(JobApplication)
@@ -47,6 +47,7 @@ class JobApplicationAdmin(admin.ModelAdmin):
                 "company_name",
                 "job_title",
                 "job_url",
+                "import_batch",
             )
         }),
 
@@ -70,3 +71,26 @@ class JobApplicationAdmin(admin.ModelAdmin):
             )
         }),
     )
+
+
+@admin.register(JobImportBatch)
+class JobImportBatchAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "created_at")
+    search_fields = ("user__username",)
+    ordering = ("-created_at",)
+
+
+@admin.register(JobPageSnapshot)
+class JobPageSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("id", "job", "url", "fetched_at")
+    search_fields = ("url",)
+    exclude = ("pages",)
+    readonly_fields = ("job", "url", "fetched_at")
+
+
+@admin.register(ExtractionStrategyStats)
+class ExtractionStrategyStatsAdmin(admin.ModelAdmin):
+    list_display = ("domain", "strategy", "attempts", "accepted", "win_rate", "avg_ms", "avg_quality", "updated_at")
+    list_filter = ("strategy",)
+    search_fields = ("domain",)
+    ordering = ("domain", "strategy")
@@ -0,0 +1,137 @@
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.jobs.services import job_extractor
+
+SAMPLE_URL = "https://boards.example.com/acme/jobs/1234"
+
+
+def build_sample_page(paragraphs: int = 120) -> str:
+    """A large job page with navigation, scripts, JSON-LD and a long description."""
+    description = "".join(
+        f"<p>Responsibility {index}: build and operate Python, Django and PostgreSQL services; "
+        f"own Celery pipelines and Redis caching for feature {index}.</p>"
+        for index in range(paragraphs)
+    )
+    posting = {
+        "@context": "https://schema.org",
+        "@type": "JobPosting",
+        "title": "Senior Backend Engineer",
+        "hiringOrganization": {"@type": "Organization", "name": "Acme"},
+        "description": description,
+    }
+    navigation = "".join(f'<li><a href="/jobs/{index}">Other job {index}</a></li>' for index in range(300))
+    scripts = "".join(f"<script>var tracker{index} = {{id: {index}}};</script>" for index in range(40))
+    return (
+        "<!DOCTYPE html><html><head><title>Senior Backend Engineer - Acme</title>"
+        '<meta property="og:title" content="Senior Backend Engineer">'
+        '<meta property="og:site_name" content="Acme">'
+        f'<script type="application/ld+json">{json.dumps(posting)}</script>{scripts}</head>'
+        f"<body><nav><ul>{navigation}</ul></nav><main><article><h1>Senior Backend Engineer</h1>"
+        f"{description}</article></main><footer>{navigation}</footer></body></html>"
+    )
+
+
+def legacy_extract(html: str, url: str) -> dict:
+    """The previous pipeline: readability, trafilatura and two BeautifulSoup parses."""
+    content = job_extractor.extract_with_readability(html)
+    if not content or len(content) < 200:
+        content = job_extractor.extract_with_trafilatura(html)
+    text = BeautifulSoup(content, "html.parser").get_text(separator="\n", strip=True)
+    job_description = job_extractor.clean_text(text)
+
+    soup = BeautifulSoup(html, "html.parser")
+    job_title = ""
+    company_name = ""
+    for script in soup.find_all("script", attrs={"type": "application/ld+json"}):
+        try:
+            data = json.loads(script.string or script.get_text(strip=True))
+        except json.JSONDecodeError:
+            continue
+        for node in job_extractor._walk_json(data):
+            if job_extractor._is_job_posting_type(node.get("@type")):
+                job_title = job_title or job_extractor.clean_text(str(node.get("title", "")))
+                company_name = company_name or job_extractor._organization_name(node.get("hiringOrganization"))
+    if not job_title and soup.title and soup.title.string:
+        job_title = job_extractor.clean_text(soup.title.string)
+    return {"job_description": job_description, "job_title": job_title, "company_name": company_name}
+
+
+PIPELINES = {
+    "legacy": legacy_extract,
+    "single-parse": job_extractor.extract_job_posting_from_html,
+}
+
+
+def _measure(name, pages, repeat, queue):
+    # Runs in a fresh child process so the RSS high-water mark belongs to one pipeline.
+    extract = PIPELINES[name]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    cpu_times = []
+    for _ in range(repeat):
+        for html in pages:
+            started = time.process_time()
+            try:
+                extract(html, SAMPLE_URL)
+            except job_extractor.JobExtractionError:
+                pass
+            cpu_times.append(time.process_time() - started)
+    _, peak_python = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        "name": name,
+        "cpu_ms_mean": statistics.mean(cpu_times) * 1000,
+        "cpu_ms_p95": sorted(cpu_times)[int(0.95 * (len(cpu_times) - 1))] * 1000,
+        "python_peak_kb": peak_python / 1024,
+        "rss_growth_kb": max(0, rss_after - rss_before),
+    })
+
+
+class Command(BaseCommand):
+    help = "Compare CPU time and peak memory of the legacy and single-parse job extraction pipelines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--html-dir", help="Directory of saved .html job pages (default: a synthetic page).")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options["html_dir"]:
+            paths = sorted(Path(options["html_dir"]).glob("**/*.html"))
+            if not paths:
+                raise CommandError(f"No .html files found in {options['html_dir']}")
+            pages = [path.read_text(encoding="utf-8", errors="replace") for path in paths]
+        else:
+            pages = [build_sample_page()]
+
+        self.stdout.write(
+            f"pages={len(pages)} repeat={options['repeat']} "
+            f"avg_size_kb={sum(len(page) for page in pages) / len(pages) / 1024:.1f}"
+        )
+        context = multiprocessing.get_context("fork" if os.name == "posix" else "spawn")
+        results = []
+        for name in PIPELINES:
+            queue = context.Queue()
+            process = context.Process(target=_measure, args=(name, pages, options["repeat"], queue))
+            process.start()
+            results.append(queue.get())
+            process.join()
+
+        for result in results:
+            self.stdout.write(
+                "{name:>13}: cpu mean={cpu_ms_mean:.2f}ms p95={cpu_ms_p95:.2f}ms "
+                "python peak={python_peak_kb:.0f}KB rss growth={rss_growth_kb:.0f}KB".format(**result)
+            )
+        legacy, current = results
+        if current["cpu_ms_mean"]:
+            self.stdout.write(f"speedup: {legacy['cpu_ms_mean'] / current['cpu_ms_mean']:.2f}x")
@@ -0,0 +1,193 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.jobs.services import pipeline_benchmark
+
+FIXTURES_DIR = Path(__file__).resolve().parents[2] / "extraction_fixtures"
+LISTING_ROW = '<li><a href="/jobs/{index}">Listing {index}: Senior Engineer at Company {index} · Remote</a></li>'
+
+
+def load_pages(manifest: Path, cases) -> dict:
+    """Page bodies by case name; ``inflate_kb`` pads the page's ``<!-- FILL -->`` with listing rows."""
+    pages = {}
+    for case in cases:
+        html = (manifest.parent / case["file"]).read_text(encoding="utf-8")
+        if case.get("inflate_kb"):
+            rows = []
+            size = 0
+            while size < case["inflate_kb"] * 1024:
+                rows.append(LISTING_ROW.format(index=len(rows)))
+                size += len(rows[-1])
+            html = html.replace("<!-- FILL -->", "".join(rows), 1)
+        pages[case["name"]] = html.encode("utf-8")
+    return pages
+
+
+def serve_pages(pages: dict) -> ThreadingHTTPServer:
+    """Serve ``pages`` on a loopback port so the fetch stage runs the real HTTP client code."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path.lstrip("/"))
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="benchmark-pages", daemon=True).start()
+    return server
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the fixture corpus through fetch, description, metadata and quality checks; report per-stage "
+        "latency, throughput, peak memory and accuracy, optionally against another git ref."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--manifest", default=str(FIXTURES_DIR / "pages" / "manifest.json"))
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--against", help="Git ref (branch, tag or commit) to benchmark on the same corpus.")
+        parser.add_argument("--json-out", help="Write the raw results to this file.")
+
+    def handle(self, *args, **options):
+        manifest = Path(options["manifest"])
+        cases = json.loads(manifest.read_text(encoding="utf-8"))
+        pages = load_pages(manifest, cases)
+        self.stdout.write(
+            f"cases={len(cases)} repeat={options['repeat']} "
+            f"corpus_kb={sum(len(body) for body in pages.values()) / 1024:.0f}"
+        )
+
+        server = serve_pages(pages)
+        job = {
+            "base_url": f"http://127.0.0.1:{server.server_address[1]}",
+            "cases": cases,
+            "repeat": max(1, options["repeat"]),
+        }
+        results = {}
+        worktree = None
+        try:
+            results["current"] = self._run_tree(Path(settings.BASE_DIR), job)
+            if options["against"]:
+                worktree, backend_dir = self._checkout(options["against"])
+                results[options["against"]] = self._run_tree(backend_dir, job)
+        finally:
+            server.shutdown()
+            if worktree:
+                subprocess.run(
+                    ["git", "-C", str(settings.BASE_DIR), "worktree", "remove", "--force", str(worktree)],
+                    capture_output=True,
+                )
+                shutil.rmtree(worktree, ignore_errors=True)
+
+        for name, result in results.items():
+            self._report(name, result)
+        if len(results) == 2:
+            self._compare(*results.items())
+        if options["json_out"]:
+            Path(options["json_out"]).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    def _checkout(self, ref: str):
+        """A detached worktree of ``ref``; returns it and its backend directory."""
+        base_dir = Path(settings.BASE_DIR)
+        top = subprocess.run(
+            ["git", "-C", str(base_dir), "rev-parse", "--show-toplevel"], capture_output=True, text=True
+        )
+        if top.returncode:
+            raise CommandError(f"--against needs a git checkout: {top.stderr.strip()}")
+        worktree = Path(tempfile.mkdtemp(prefix="benchmark-"))
+        added = subprocess.run(
+            ["git", "-C", str(base_dir), "worktree", "add", "--detach", str(worktree), ref],
+            capture_output=True,
+            text=True,
+        )
+        if added.returncode:
+            shutil.rmtree(worktree, ignore_errors=True)
+            raise CommandError(f"Could not check out {ref}: {added.stderr.strip()}")
+        return worktree, worktree / base_dir.relative_to(Path(top.stdout.strip()))
+
+    def _run_tree(self, backend_dir: Path, job: dict) -> dict:
+        env = dict(
+            os.environ,
+            PYTHONPATH=str(backend_dir),
+            # Measure the pipeline, not the disk cache or the politeness limits.
+            JOB_FETCH_CACHE_ENABLED="False",
+            JOB_FETCH_HOST_RATE="1000000",
+            JOB_FETCH_HOST_BURST="1000000",
+            AI_RATE_LIMIT_BACKEND="memory",
+            JOB_FETCH_RATE_LIMIT_BACKEND="memory",
+            NO_PROXY="127.0.0.1,localhost",
+        )
+        completed = subprocess.run(
+            [sys.executable, pipeline_benchmark.__file__],
+            input=json.dumps(job),
+            capture_output=True,
+            text=True,
+            cwd=str(backend_dir),
+            env=env,
+        )
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode or not lines:
+            raise CommandError(f"Benchmark run in {backend_dir} failed:\n{completed.stderr.strip()[-2000:]}")
+        return json.loads(lines[-1])
+
+    def _report(self, name: str, result: dict):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{name}:"))
+        for stage, summary in result["stages"].items():
+            self.stdout.write(f"  {stage:>11}: mean={summary['mean_ms']:.2f}ms p95={summary['p95_ms']:.2f}ms")
+        self.stdout.write(
+            f"  {'total':>11}: mean={result['total']['mean_ms']:.2f}ms p95={result['total']['p95_ms']:.2f}ms "
+            f"throughput={result['pages_per_second']:.1f} pages/s"
+        )
+        self.stdout.write(
+            f"  memory: python peak={result['python_peak_kb']:.0f}KB max rss={result['max_rss_kb']:.0f}KB"
+        )
+        passed = sum(1 for case in result["cases"].values() if not case["problems"])
+        self.stdout.write(f"  accuracy: {passed}/{len(result['cases'])} ({result['accuracy']:.0%})")
+        for case_name, case in result["cases"].items():
+            for problem in case["problems"]:
+                self.stdout.write(self.style.WARNING(f"    {case_name} [{case['kind']}]: {problem}"))
+
+    def _compare(self, current, other):
+        (current_name, current_result), (other_name, other_result) = current, other
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(f"{current_name} vs {other_name} (mean latency ratio, <1 is faster):")
+        )
+        for stage in pipeline_benchmark.STAGES + ("total",):
+            mine = (current_result["stages"].get(stage) or current_result.get(stage) or {}).get("mean_ms")
+            theirs = (other_result["stages"].get(stage) or other_result.get(stage) or {}).get("mean_ms")
+            if mine is not None and theirs:
+                self.stdout.write(f"  {stage:>11}: {mine / theirs:.2f}x ({mine:.2f}ms vs {theirs:.2f}ms)")
+        self.stdout.write(
+            f"  throughput: {current_result['pages_per_second']:.1f} vs "
+            f"{other_result['pages_per_second']:.1f} pages/s; "
+            f"accuracy: {current_result['accuracy']:.0%} vs {other_result['accuracy']:.0%}"
+        )
+        changed = [
+            name
+            for name, case in current_result["cases"].items()
+            if bool(case["problems"]) != bool(other_result["cases"].get(name, {}).get("problems"))
+        ]
+        for name in changed:
+            verdict = "now fails" if current_result["cases"][name]["problems"] else "now passes"
+            self.stdout.write(f"  {name}: {verdict}")
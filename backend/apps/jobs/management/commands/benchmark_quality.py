@@ -0,0 +1,129 @@
+import re
+import statistics
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.jobs.services import extraction_quality
+from apps.jobs.services.job_extractor import html_to_text
+
+
+def _legacy_normalize(value: str) -> str:
+    return re.sub(r"\s+", " ", (value or "")).strip()
+
+
+def legacy_evaluate(job_description: str, job_title: str = "", company_name: str = ""):
+    """The previous checks: a regex normalize and one substring scan per marker, per call."""
+    description = _legacy_normalize(job_description)
+    title = _legacy_normalize(job_title)
+    company = _legacy_normalize(company_name)
+
+    reason = None
+    if not description:
+        reason = "Extracted page did not contain job description text."
+    elif len(description) < extraction_quality.MIN_DESCRIPTION_LENGTH:
+        reason = "Extracted content is too short to be a valid job description."
+    elif title.lower() in extraction_quality.GENERIC_NON_JOB_TITLES:
+        reason = "Extracted page appears to be a login/auth page, not a job posting."
+    else:
+        combined_lower = " ".join([title, company, description]).lower()
+        has_auth = any(marker in combined_lower for marker in extraction_quality.AUTH_WALL_MARKERS)
+        has_job = any(marker in description.lower() for marker in extraction_quality.JOB_HINT_MARKERS)
+        if has_auth and not has_job:
+            reason = "Extracted page appears blocked or login-gated, not a real job description."
+
+    description = _legacy_normalize(job_description).lower()
+    score = 0.0
+    if description:
+        length_score = min(1.0, len(description) / extraction_quality.FULL_SCORE_DESCRIPTION_LENGTH)
+        hits = sum(1 for marker in extraction_quality.JOB_HINT_MARKERS if marker in description)
+        score = (length_score + min(1.0, hits / extraction_quality.FULL_SCORE_JOB_MARKERS)) / 2
+        if any(marker in description for marker in extraction_quality.AUTH_WALL_MARKERS):
+            score /= 2
+    return round(score, 3), reason
+
+
+def build_sample_corpus(size_kb: int = 400) -> list:
+    """Large job descriptions, login walls and noisy listing pages as ``(title, company, text)``."""
+    section = (
+        "About the role\n\nYou will design, build and operate Python services.\n"
+        "Responsibilities:\n  - Own Django APIs and Celery pipelines\t- Review designs\n"
+        "Requirements: 5+ years of experience with PostgreSQL and Redis.\n"
+        "Preferred qualifications: AWS, Kubernetes. Skills: communication, mentoring.\n\n"
+    )
+    filler = "Our team ships features every week across product, data and platform areas.   \n"
+    wall = "Sign in to LinkedIn  |  Join LinkedIn \n New to LinkedIn? Create your account. "
+    listing = "".join(f"Software Engineer {index} · Remote · Apply now\n" for index in range(200))
+
+    def grow(text):
+        return text * max(1, size_kb * 1024 // len(text))
+
+    return [
+        ("Senior Backend Engineer", "Acme", grow(section + filler)),
+        ("Data Engineer", "Globex", grow(filler) + section),
+        ("Sign in | LinkedIn", "", grow(wall)),
+        ("Jobs at Initech", "Initech", grow(wall + filler)),
+        ("Careers", "Umbrella", grow(listing)),
+        ("Platform Engineer", "Hooli", section[:150]),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare the legacy extraction quality checks with the compiled scorer and verify they agree."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--html-dir", help="Directory of saved .html job pages (default: a synthetic corpus).")
+        parser.add_argument("--size-kb", type=int, default=400, help="Text size of each synthetic page.")
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options["html_dir"]:
+            paths = sorted(Path(options["html_dir"]).glob("**/*.html"))
+            if not paths:
+                raise CommandError(f"No .html files found in {options['html_dir']}")
+            corpus = [
+                (path.stem, "", html_to_text(path.read_text(encoding="utf-8", errors="replace")))
+                for path in paths
+            ]
+        else:
+            corpus = build_sample_corpus(options["size_kb"])
+
+        self.stdout.write(
+            f"pages={len(corpus)} repeat={options['repeat']} "
+            f"avg_size_kb={sum(len(text) for _, _, text in corpus) / len(corpus) / 1024:.1f}"
+        )
+
+        # The legacy code only knows the built-in rules; compare like with like.
+        scorer = extraction_quality.QualityScorer()
+
+        def compiled_evaluate(text, title, company):
+            report = scorer.evaluate(text, title, company)
+            return report.score, report.rejection_reason
+
+        implementations = {"legacy": legacy_evaluate, "compiled": compiled_evaluate}
+
+        timings = {}
+        for name, evaluate in implementations.items():
+            times = []
+            for _ in range(options["repeat"]):
+                for title, company, text in corpus:
+                    started = time.perf_counter()
+                    evaluate(text, title, company)
+                    times.append(time.perf_counter() - started)
+            timings[name] = statistics.mean(times) * 1000
+            self.stdout.write(f"{name:>9}: mean={timings[name]:.2f}ms per page")
+        if timings["compiled"]:
+            self.stdout.write(f"speedup: {timings['legacy'] / timings['compiled']:.2f}x")
+
+        mismatches = 0
+        for title, company, text in corpus:
+            legacy_score, legacy_reason = legacy_evaluate(text, title, company)
+            report = scorer.evaluate(text, title, company)
+            if legacy_reason != report.rejection_reason or abs(legacy_score - report.score) > 0.05:
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(
+                    f"differs {title!r}: legacy=({legacy_score}, {legacy_reason!r}) "
+                    f"compiled=({report.score}, {report.rejection_reason!r}) features={report.features}"
+                ))
+        self.stdout.write(f"verdicts: {len(corpus) - mismatches}/{len(corpus)} agree")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from apps.jobs.models import ExtractionStrategyStats
+from apps.jobs.services.strategy_stats import rank_strategies
+
+
+class Command(BaseCommand):
+    help = "Show the learned per-domain description strategy stats and the order they produce, or reset them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--domain", help="Only this domain (without www.).")
+        parser.add_argument("--reset", action="store_true", help="Delete the stats (for --domain only, if given).")
+
+    def handle(self, *args, **options):
+        stats = ExtractionStrategyStats.objects.order_by("domain", "strategy")
+        if options["domain"]:
+            stats = stats.filter(domain=options["domain"].lower())
+
+        if options["reset"]:
+            deleted, _ = stats.delete()
+            self.stdout.write(f"Deleted {deleted} strategy stats rows.")
+            return
+
+        by_domain = {}
+        for row in stats:
+            by_domain.setdefault(row.domain, []).append(row)
+        if not by_domain:
+            self.stdout.write("No strategy stats recorded yet.")
+            return
+
+        for domain, rows in by_domain.items():
+            self.stdout.write(f"{domain}  order: {' > '.join(rank_strategies(rows))}")
+            for row in rows:
+                self.stdout.write(
+                    f"  {row.strategy:<12} attempts={row.attempts:<5} win rate={row.win_rate:.0%} "
+                    f"avg={row.avg_ms:.1f}ms quality={row.avg_quality:.2f}"
+                )
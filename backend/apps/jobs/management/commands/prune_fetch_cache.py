@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.jobs.services.fetch_cache import get_fetch_cache, prune_fetch_cache
+
+
+class Command(BaseCommand):
+    help = "Delete expired job page fetch cache entries, then the oldest ones above JOB_FETCH_CACHE_MAX_MB."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", action="store_true", help="Delete every entry instead.")
+
+    def handle(self, *args, **options):
+        cache = get_fetch_cache()
+        if cache is None:
+            self.stdout.write("The fetch cache is disabled (JOB_FETCH_CACHE_ENABLED=False).")
+            return
+        if options["clear"]:
+            self.stdout.write(f"Removed {cache.clear()} files from {cache.directory}.")
+            return
+        removed, remaining = prune_fetch_cache(cache)
+        self.stdout.write(f"Removed {removed} files from {cache.directory}; {remaining / 1024 / 1024:.1f} MB left.")
@@ -0,0 +1,202 @@
+import difflib
+import multiprocessing
+import os
+from functools import partial
+from itertools import islice
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from apps.jobs.models import JobApplication, JobPageSnapshot
+from apps.jobs.services.extraction_quality import get_extraction_rejection_reason
+from apps.jobs.services.job_extractor import DEFAULT_STRATEGY_ORDER, JobExtractionError, extract_job_posting
+from apps.jobs.services.snapshots import SnapshotReplay, decompress_pages
+
+FIELDS = ("job_title", "company_name", "job_description")
+
+
+def _reextract(item, strategies=DEFAULT_STRATEGY_ORDER):
+    """
+    Worker: replay extraction over one snapshot. Returns ``(job_id, posting, error)``.
+
+    The strategy order is fixed and nothing is recorded in the per-domain stats, so a
+    replay gives the same result every run and leaves live extraction untouched.
+    """
+    job_id, url, blob = item
+    replay = SnapshotReplay(decompress_pages(blob))
+    try:
+        posting = extract_job_posting(
+            url,
+            json_fetcher=replay.fetch_json,
+            html_fetcher=replay.fetch_html,
+            strategies=strategies,
+            record_stats=False,
+        )
+    except JobExtractionError as exc:
+        return job_id, None, str(exc)
+    except Exception as exc:
+        return job_id, None, f"Unexpected extraction error: {exc}"
+
+    posting = {field: (posting.get(field) or "").strip() for field in FIELDS}
+    issue = get_extraction_rejection_reason(**posting)
+    if issue:
+        return job_id, None, issue
+    return job_id, posting, ""
+
+
+def _short(value: str, limit: int = 60) -> str:
+    value = value.replace("\n", " ")
+    return repr(value if len(value) <= limit else value[:limit] + "...")
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run extraction and the quality checks over stored page snapshots (no network) "
+        "and update the extracted jobs whose results changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=200, help="Snapshots read, extracted and written per round.")
+        parser.add_argument("--user", type=int, help="Only jobs of this user id.")
+        parser.add_argument("--job-ids", type=int, nargs="+", help="Only these job ids.")
+        parser.add_argument("--dry-run", action="store_true", help="Report the differences without writing them.")
+        parser.add_argument(
+            "--apply-rejections",
+            action="store_true",
+            help="Mark successful jobs whose snapshot is now rejected as needs_manual (default: report only).",
+        )
+        parser.add_argument("--show", type=int, default=10, help="Example changes to print per kind.")
+        parser.add_argument(
+            "--strategies",
+            nargs="+",
+            choices=DEFAULT_STRATEGY_ORDER,
+            default=list(DEFAULT_STRATEGY_ORDER),
+            help="Description strategies to try, in order (default: all, in the default order).",
+        )
+
+    def handle(self, *args, **options):
+        snapshots = JobPageSnapshot.objects.order_by("job_id")
+        if options["user"]:
+            snapshots = snapshots.filter(job__user_id=options["user"])
+        if options["job_ids"]:
+            snapshots = snapshots.filter(job_id__in=options["job_ids"])
+        rows = snapshots.values_list("job_id", "url", "pages").iterator(chunk_size=options["batch_size"])
+
+        self.counts = dict.fromkeys(
+            (
+                "snapshots",
+                "updated",
+                "titles",
+                "companies",
+                "descriptions",
+                "newly_succeeded",
+                "now_rejected",
+                "still_failing",
+                "unchanged",
+                "skipped_manual",
+            ),
+            0,
+        )
+        self.examples = {"title": [], "company": [], "description": [], "rejected": []}
+        self.show = options["show"]
+
+        # Children must not share the parent's database connection.
+        connections.close_all()
+        workers = max(1, options["workers"])
+        context = multiprocessing.get_context("fork" if os.name == "posix" else "spawn")
+        with context.Pool(processes=workers, initializer=django.setup) as pool:
+            while True:
+                # Bounded rounds: Pool.imap would read the whole table ahead of the workers.
+                batch = [(job_id, url, bytes(blob)) for job_id, url, blob in islice(rows, options["batch_size"])]
+                if not batch:
+                    break
+                results = pool.map(
+                    partial(_reextract, strategies=tuple(options["strategies"])),
+                    batch,
+                    chunksize=max(1, len(batch) // (4 * workers)),
+                )
+                self._apply(results, options)
+
+        self._report(options["dry_run"])
+
+    def _apply(self, results, options):
+        jobs = JobApplication.objects.in_bulk([job_id for job_id, _, _ in results])
+        changed = []
+        now = timezone.now()
+        for job_id, posting, error in results:
+            job = jobs.get(job_id)
+            if job is None:
+                continue
+            self.counts["snapshots"] += 1
+            if job.description_source == "manual":
+                self.counts["skipped_manual"] += 1
+                continue
+
+            if posting is None:
+                if job.extraction_status == "success":
+                    self.counts["now_rejected"] += 1
+                    self._example("rejected", f"#{job.id}: {error}")
+                    if options["apply_rejections"]:
+                        job.extraction_status = "needs_manual"
+                        job.extraction_error = f"{error} Please fill details manually."
+                        job.updated_at = now
+                        changed.append(job)
+                else:
+                    self.counts["still_failing"] += 1
+                continue
+
+            if self._update_fields(job, posting) or job.extraction_status != "success":
+                if job.extraction_status != "success":
+                    self.counts["newly_succeeded"] += 1
+                job.extraction_status = "success"
+                job.extraction_error = ""
+                job.updated_at = now
+                changed.append(job)
+            else:
+                self.counts["unchanged"] += 1
+
+        self.counts["updated"] += len(changed)
+        if changed and not options["dry_run"]:
+            JobApplication.objects.bulk_update(
+                changed,
+                ["job_title", "company_name", "job_description", "extraction_status", "extraction_error", "updated_at"],
+                batch_size=options["batch_size"],
+            )
+
+    def _update_fields(self, job, posting) -> bool:
+        # Same rule as the extraction task: title and company are only replaced by non-empty values.
+        changed = False
+        for field, kind, count in (("job_title", "title", "titles"), ("company_name", "company", "companies")):
+            if posting[field] and posting[field] != getattr(job, field):
+                self.counts[count] += 1
+                self._example(kind, f"#{job.id}: {_short(getattr(job, field))} -> {_short(posting[field])}")
+                setattr(job, field, posting[field])
+                changed = True
+
+        if posting["job_description"] != job.job_description:
+            self.counts["descriptions"] += 1
+            if len(self.examples["description"]) < self.show:
+                similarity = difflib.SequenceMatcher(None, job.job_description, posting["job_description"]).quick_ratio()
+                self._example(
+                    "description",
+                    f"#{job.id}: {len(job.job_description)} -> {len(posting['job_description'])} chars "
+                    f"(similarity {similarity:.2f})",
+                )
+            job.job_description = posting["job_description"]
+            changed = True
+        return changed
+
+    def _example(self, kind, line):
+        if len(self.examples[kind]) < self.show:
+            self.examples[kind].append(line)
+
+    def _report(self, dry_run):
+        self.stdout.write(" ".join(f"{name}={value}" for name, value in self.counts.items()))
+        for kind, lines in self.examples.items():
+            for line in lines:
+                self.stdout.write(f"{kind:>11} {line}")
+        if dry_run:
+            self.stdout.write(self.style.WARNING("Dry run: nothing was written."))
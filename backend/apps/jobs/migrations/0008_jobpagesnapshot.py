@@ -0,0 +1,24 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_jobimportbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobPageSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=1000)),
+                ('pages', models.BinaryField()),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+                ('job', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='page_snapshot', to='jobs.jobapplication')),
+            ],
+        ),
+    ]
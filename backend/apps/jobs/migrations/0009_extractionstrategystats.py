@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_jobpagesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionStrategyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=255)),
+                ('strategy', models.CharField(max_length=30)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('accepted', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('total_quality', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('domain', 'strategy'), name='unique_domain_strategy')],
+            },
+        ),
+    ]
@@ -4,6 +4,20 @@ from django.db import models
 User = settings.AUTH_USER_MODEL
 
 
+class JobImportBatch(models.Model):
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='job_import_batches'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Import {self.pk} ({self.user})"
+
+
 class JobApplication(models.Model):
 
     user = models.ForeignKey(
@@ -38,6 +52,14 @@ class JobApplication(models.Model):
     )
     extraction_error = models.TextField(blank=True, default="")
 
+    import_batch = models.ForeignKey(
+        JobImportBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -45,3 +67,56 @@ class JobApplication(models.Model):
         company = self.company_name or "Unknown Company"
         title = self.job_title or "Unknown Job"
         return f"{company} - {title}"
+
+
+class JobPageSnapshot(models.Model):
+
+    job = models.OneToOneField(
+        JobApplication,
+        on_delete=models.CASCADE,
+        related_name='page_snapshot'
+    )
+
+    # URL the extraction started from, and every response it read (zlib-compressed JSON
+    # of {url: body}), so extraction can be replayed offline.
+    url = models.URLField(max_length=1000)
+    pages = models.BinaryField()
+
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Snapshot of job {self.job_id}"
+
+
+class ExtractionStrategyStats(models.Model):
+    """Running totals of how one description strategy did on one domain."""
+
+    domain = models.CharField(max_length=255)
+    strategy = models.CharField(max_length=30)
+
+    attempts = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    total_quality = models.FloatField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["domain", "strategy"], name="unique_domain_strategy"),
+        ]
+
+    @property
+    def win_rate(self) -> float:
+        return self.accepted / self.attempts if self.attempts else 0.0
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.attempts if self.attempts else 0.0
+
+    @property
+    def avg_quality(self) -> float:
+        return self.total_quality / self.attempts if self.attempts else 0.0
+
+    def __str__(self):
+        return f"{self.domain} {self.strategy}: {self.accepted}/{self.attempts}"
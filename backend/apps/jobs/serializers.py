@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import JobApplication
+from .models import JobApplication, JobImportBatch
+from .services.bulk_import import rows_from_csv
 
 
 class JobApplicationSerializer(serializers.ModelSerializer):
@@ -8,7 +10,7 @@ class JobApplicationSerializer(serializers.ModelSerializer):
     class Meta:
         model = JobApplication
         fields = '__all__'
-        read_only_fields = ('user', 'description_source', 'extraction_status', 'extraction_error')
+        read_only_fields = ('user', 'description_source', 'extraction_status', 'extraction_error', 'import_batch')
         extra_kwargs = {
             "job_url": {"required": False, "allow_null": True, "allow_blank": True}
         }
@@ -32,3 +34,73 @@ class JobApplicationSerializer(serializers.ModelSerializer):
             )
 
         return attrs
+
+
+class JobImportRowSerializer(serializers.Serializer):
+    job_url = serializers.URLField(max_length=1000)
+    company_name = serializers.CharField(required=False, allow_blank=True, max_length=255, default="")
+    job_title = serializers.CharField(required=False, allow_blank=True, max_length=255, default="")
+    job_description = serializers.CharField(required=False, allow_blank=True, default="")
+
+
+class JobImportSerializer(serializers.Serializer):
+    """Accepts ``jobs`` (URL strings or row objects), pasted ``csv`` text, an uploaded ``file``, or a mix."""
+
+    jobs = serializers.ListField(child=serializers.JSONField(), required=False)
+    csv = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False)
+    file = serializers.FileField(required=False)
+
+    def validate(self, attrs):
+        rows = [
+            row if isinstance(row, dict) else {"job_url": row}
+            for row in attrs.get("jobs") or []
+        ]
+        rows.extend(rows_from_csv(attrs.get("csv", "")))
+        upload = attrs.get("file")
+        if upload is not None:
+            rows.extend(rows_from_csv(upload.read().decode("utf-8-sig", errors="replace")))
+
+        if not rows:
+            raise serializers.ValidationError("Provide job URLs in `jobs`, `csv` or an uploaded CSV `file`.")
+        max_rows = getattr(settings, "JOB_IMPORT_MAX_ROWS", 200)
+        if len(rows) > max_rows:
+            raise serializers.ValidationError(f"At most {max_rows} jobs can be imported at once.")
+
+        row_serializer = JobImportRowSerializer(data=rows, many=True)
+        if not row_serializer.is_valid():
+            raise serializers.ValidationError({"rows": row_serializer.errors})
+        return {"rows": row_serializer.validated_data}
+
+
+class ImportedJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobApplication
+        fields = ("id", "job_url", "company_name", "job_title", "description_source", "extraction_status", "extraction_error")
+
+
+class JobImportBatchSerializer(serializers.ModelSerializer):
+    jobs = serializers.SerializerMethodField()
+    status_counts = serializers.SerializerMethodField()
+    is_complete = serializers.SerializerMethodField()
+
+    class Meta:
+        model = JobImportBatch
+        fields = ("id", "created_at", "is_complete", "status_counts", "jobs")
+
+    def _jobs(self, obj):
+        # One query for the rows; the counts below are taken from the same list.
+        if not hasattr(obj, "_imported_jobs"):
+            obj._imported_jobs = list(obj.jobs.order_by("id"))
+        return obj._imported_jobs
+
+    def get_jobs(self, obj):
+        return ImportedJobSerializer(self._jobs(obj), many=True).data
+
+    def get_status_counts(self, obj):
+        counts = {}
+        for job in self._jobs(obj):
+            counts[job.extraction_status] = counts.get(job.extraction_status, 0) + 1
+        return counts
+
+    def get_is_complete(self, obj):
+        return all(job.extraction_status != "pending" for job in self._jobs(obj))
@@ -0,0 +1,258 @@
+import json
+import logging
+import re
+
+from .job_extractor import (
+    JobExtractionError,
+    _extract_jobposting_json_ld,
+    _organization_name,
+    clean_text,
+    description_to_text,
+    parse_html,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _slug_to_name(slug: str) -> str:
+    return slug.replace("-", " ").replace("_", " ").strip().title()
+
+
+def _walk(value):
+    if isinstance(value, dict):
+        yield value
+        for item in value.values():
+            yield from _walk(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _walk(item)
+
+
+def _embedded_json(page: str, variable: str):
+    """Decode ``window.<variable> = {...}`` from an inline script, or return None."""
+    match = re.search(r"window\.%s\s*=\s*" % re.escape(variable), page)
+    if not match:
+        return None
+    try:
+        data, _ = json.JSONDecoder().raw_decode(page, match.end())
+    except ValueError:
+        return None
+    return data
+
+
+def _posting(title, company, description) -> dict:
+    return {
+        "job_title": clean_text(str(title or "")),
+        "company_name": clean_text(str(company or "")),
+        "job_description": description,
+    }
+
+
+def _json_ld_posting(page: str, company_fallback: str = ""):
+    tree = parse_html(page)
+    if tree is None:
+        return None
+    for item in _extract_jobposting_json_ld(tree):
+        description = description_to_text(item.get("description"))
+        if description:
+            company = _organization_name(item.get("hiringOrganization")) or company_fallback
+            return _posting(item.get("title"), company, description)
+    return None
+
+
+class ATSAdapter:
+    """
+    Fast path for one applicant-tracking system.
+
+    Adapters read title, company and description from the public posting API or from
+    JSON embedded in the page. They never fetch themselves: ``extract_with_adapter``
+    passes the fetchers in, so adapters can run against stored fixture pages offline.
+    """
+
+    name = ""
+    url_pattern = None
+
+    def match(self, url: str):
+        return self.url_pattern.match(url or "")
+
+    def api_url(self, match):
+        return None
+
+    def parse_api(self, data, match):
+        return None
+
+    def parse_page(self, page: str, match):
+        return _json_ld_posting(page, self.company_from_url(match))
+
+    def company_from_url(self, match) -> str:
+        return _slug_to_name(match.group("company")) if "company" in match.groupdict() else ""
+
+
+class GreenhouseAdapter(ATSAdapter):
+    name = "greenhouse"
+    url_pattern = re.compile(
+        r"https?://(?:boards|job-boards)(?:\.eu)?\.greenhouse\.io/(?:embed/job_app\?for=)?"
+        r"(?P<company>[\w-]+)/jobs/(?P<job_id>\d+)",
+        re.IGNORECASE,
+    )
+
+    def api_url(self, match):
+        return f"https://boards-api.greenhouse.io/v1/boards/{match.group('company')}/jobs/{match.group('job_id')}"
+
+    def parse_api(self, data, match):
+        if not isinstance(data, dict) or not data.get("content"):
+            return None
+        company = data.get("company_name") or self.company_from_url(match)
+        return _posting(data.get("title"), company, description_to_text(data.get("content")))
+
+    def parse_page(self, page, match):
+        context = _embedded_json(page, "__remixContext")
+        for node in _walk(context):
+            post = node.get("jobPost")
+            if isinstance(post, dict) and post.get("content"):
+                company = post.get("company_name") or self.company_from_url(match)
+                return _posting(post.get("title"), company, description_to_text(post.get("content")))
+        return super().parse_page(page, match)
+
+
+class LeverAdapter(ATSAdapter):
+    name = "lever"
+    url_pattern = re.compile(
+        r"https?://jobs(?:\.eu)?\.lever\.co/(?P<company>[\w.-]+)/(?P<job_id>[0-9a-f-]{36})",
+        re.IGNORECASE,
+    )
+
+    def api_url(self, match):
+        host = "api.eu.lever.co" if ".eu." in match.group(0).lower() else "api.lever.co"
+        return f"https://{host}/v0/postings/{match.group('company')}/{match.group('job_id')}"
+
+    def parse_api(self, data, match):
+        if not isinstance(data, dict) or not data.get("text"):
+            return None
+        parts = [data.get("description") or data.get("descriptionPlain") or ""]
+        for section in data.get("lists") or []:
+            parts.append(f"<h3>{section.get('text', '')}</h3><ul>{section.get('content', '')}</ul>")
+        parts.append(data.get("additional") or data.get("additionalPlain") or "")
+        description = description_to_text("".join(parts))
+        if not description:
+            return None
+        return _posting(data.get("text"), self.company_from_url(match), description)
+
+
+class WorkdayAdapter(ATSAdapter):
+    name = "workday"
+    url_pattern = re.compile(
+        r"https?://(?P<host>(?P<tenant>[\w-]+)\.wd\d+\.myworkdayjobs\.com)/(?:[a-z]{2}-[A-Z]{2}/)?"
+        r"(?P<site>[\w-]+)/job/(?P<path>[^?#]+)",
+        re.IGNORECASE,
+    )
+
+    def api_url(self, match):
+        return (
+            f"https://{match.group('host')}/wday/cxs/{match.group('tenant')}/{match.group('site')}"
+            f"/job/{match.group('path').rstrip('/')}"
+        )
+
+    def parse_api(self, data, match):
+        info = (data or {}).get("jobPostingInfo") if isinstance(data, dict) else None
+        if not isinstance(info, dict) or not info.get("jobDescription"):
+            return None
+        company = _organization_name(data.get("hiringOrganization")) or _slug_to_name(match.group("tenant"))
+        return _posting(info.get("title"), company, description_to_text(info.get("jobDescription")))
+
+    def company_from_url(self, match):
+        return _slug_to_name(match.group("tenant"))
+
+
+class AshbyAdapter(ATSAdapter):
+    name = "ashby"
+    url_pattern = re.compile(
+        r"https?://jobs\.ashbyhq\.com/(?P<company>[^/?#]+)/(?P<job_id>[0-9a-f-]{36})",
+        re.IGNORECASE,
+    )
+
+    def parse_page(self, page, match):
+        data = _embedded_json(page, "__appData")
+        if isinstance(data, dict):
+            posting = data.get("posting") or {}
+            organization = data.get("organization") or {}
+            description = description_to_text(posting.get("descriptionHtml") or posting.get("descriptionPlainText"))
+            if description:
+                company = organization.get("name") or self.company_from_url(match)
+                return _posting(posting.get("title"), company, description)
+        return super().parse_page(page, match)
+
+
+class SmartRecruitersAdapter(ATSAdapter):
+    name = "smartrecruiters"
+    url_pattern = re.compile(
+        r"https?://(?:jobs|careers)\.smartrecruiters\.com/(?P<company>[\w-]+)/(?P<job_id>\d+)",
+        re.IGNORECASE,
+    )
+    SECTIONS = ("companyDescription", "jobDescription", "qualifications", "additionalInformation")
+
+    def api_url(self, match):
+        return f"https://api.smartrecruiters.com/v1/companies/{match.group('company')}/postings/{match.group('job_id')}"
+
+    def parse_api(self, data, match):
+        if not isinstance(data, dict):
+            return None
+        sections = ((data.get("jobAd") or {}).get("sections")) or {}
+        parts = []
+        for key in self.SECTIONS:
+            section = sections.get(key) or {}
+            if section.get("text"):
+                parts.append(f"<h3>{section.get('title') or ''}</h3>{section['text']}")
+        description = description_to_text("".join(parts))
+        if not description:
+            return None
+        company = (data.get("company") or {}).get("name") or self.company_from_url(match)
+        return _posting(data.get("name"), company, description)
+
+
+ADAPTERS = [
+    GreenhouseAdapter(),
+    LeverAdapter(),
+    WorkdayAdapter(),
+    AshbyAdapter(),
+    SmartRecruitersAdapter(),
+]
+
+
+def find_adapter(url: str):
+    for adapter in ADAPTERS:
+        match = adapter.match(url)
+        if match:
+            return adapter, match
+    return None, None
+
+
+def extract_with_adapter(url: str, fetch_json, fetch_html):
+    """
+    Return a posting dict from the matching ATS adapter, or None when no adapter
+    matches or the structured data is unusable (the caller then runs the generic path).
+    """
+    adapter, match = find_adapter(url)
+    if adapter is None:
+        return None
+
+    api_url = adapter.api_url(match)
+    if api_url:
+        try:
+            posting = adapter.parse_api(fetch_json(api_url), match)
+        except JobExtractionError as exc:
+            logger.info("%s posting API unavailable for %s: %s", adapter.name, url, exc)
+            posting = None
+        if posting and posting["job_description"]:
+            posting["adapter"] = adapter.name
+            return posting
+
+    try:
+        posting = adapter.parse_page(fetch_html(url), match)
+    except JobExtractionError as exc:
+        logger.info("%s page unavailable for %s: %s", adapter.name, url, exc)
+        return None
+    if posting and posting["job_description"]:
+        posting["adapter"] = adapter.name
+        return posting
+    return None
@@ -0,0 +1,113 @@
+import codecs
+import re
+import time
+from contextlib import closing
+
+from django.conf import settings
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+JSON_CONTENT_TYPES = ("application/json", "text/json", "text/javascript")
+CHUNK_SIZE = 64 * 1024
+META_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+
+class FetchRejected(Exception):
+    """The response was refused before or while downloading; the message is user-facing."""
+
+
+class FetchedPage:
+    def __init__(self, status_code: int, headers, text: str = ""):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+
+
+def _content_type(headers) -> str:
+    return (headers.get("Content-Type") or "").split(";")[0].strip().lower()
+
+
+def _declared_charset(headers, first_chunk: bytes) -> str:
+    match = re.search(r"charset=([\w-]+)", headers.get("Content-Type") or "", re.IGNORECASE)
+    if not match:
+        match = META_CHARSET_PATTERN.search(first_chunk[:4096])
+    name = match.group(1) if match else "utf-8"
+    if isinstance(name, bytes):
+        name = name.decode("ascii", "ignore")
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return "utf-8"
+
+
+def check_headers(headers, content_types=HTML_CONTENT_TYPES) -> None:
+    """Reject a response from its headers alone, before any of the body is read."""
+    content_type = _content_type(headers)
+    if content_type and content_type not in content_types:
+        raise FetchRejected(f"Unsupported content type '{content_type}' (not a web page).")
+
+    max_chars = getattr(settings, "JOB_FETCH_MAX_CHARS", 5_000_000)
+    declared_length = headers.get("Content-Length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > max_chars:
+        raise FetchRejected(f"Page is too large ({int(declared_length) // 1024} KB).")
+
+
+class BodyDecoder:
+    """Decode body chunks as they arrive while enforcing the size and time budgets."""
+
+    def __init__(self, headers, started: float, deadline: float | None = None):
+        self.headers = headers
+        self.started = started
+        self.deadline = deadline
+        self.max_chars = getattr(settings, "JOB_FETCH_MAX_CHARS", 5_000_000)
+        self.time_budget = getattr(settings, "JOB_FETCH_TIME_BUDGET", 20)
+        self._decoder = None
+        self._parts = []
+        self._size = 0
+
+    def feed(self, chunk: bytes) -> None:
+        if self._decoder is None:
+            self._decoder = codecs.getincrementaldecoder(_declared_charset(self.headers, chunk))(errors="replace")
+        text = self._decoder.decode(chunk)
+        self._size += len(text)
+        if self._size > self.max_chars:
+            raise FetchRejected(f"Page is too large (over {self.max_chars // 1024} KB of text).")
+        if time.monotonic() - self.started > self.time_budget:
+            raise FetchRejected(f"Page took longer than {self.time_budget:g}s to download.")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise FetchRejected("Page did not finish downloading in time.")
+        self._parts.append(text)
+
+    def finish(self) -> str:
+        if self._decoder is not None:
+            self._parts.append(self._decoder.decode(b"", final=True))
+        return "".join(self._parts)
+
+
+def bounded_get(
+    session,
+    url: str,
+    timeout: float,
+    headers=None,
+    content_types=HTML_CONTENT_TYPES,
+    deadline: float | None = None,
+) -> FetchedPage:
+    """
+    Stream ``url`` and decode it incrementally, giving up early on anything that is not
+    a reasonably sized page of an accepted content type, or that is still downloading
+    at ``deadline`` (a ``time.monotonic()`` value).
+
+    Raises ``FetchRejected`` for those cases and ``requests.RequestException`` for
+    network and HTTP errors.
+    """
+    started = time.monotonic()
+    response = session.get(url, timeout=timeout, allow_redirects=True, headers=headers, stream=True)
+    with closing(response):
+        if response.status_code == 304:
+            return FetchedPage(304, response.headers)
+        response.raise_for_status()
+        check_headers(response.headers, content_types)
+
+        body = BodyDecoder(response.headers, started, deadline)
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            body.feed(chunk)
+        return FetchedPage(response.status_code, response.headers, body.finish())
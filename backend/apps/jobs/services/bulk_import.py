@@ -0,0 +1,97 @@
+import csv
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.jobs.models import JobApplication, JobImportBatch
+from .fetch_cache import normalize_url
+
+IMPORT_FIELDS = ("job_url", "company_name", "job_title", "job_description")
+
+
+def rows_from_csv(text: str) -> list:
+    """
+    Rows from pasted CSV. With a header row containing ``job_url`` the named columns
+    are used; otherwise the first column of every line is taken as the URL.
+    """
+    lines = [line for line in (text or "").splitlines() if line.strip()]
+    if not lines:
+        return []
+
+    reader = csv.reader(lines)
+    first = next(reader)
+    header = [cell.strip().lower() for cell in first]
+    if "job_url" in header:
+        return [
+            {
+                field: value.strip()
+                for field, value in zip(header, row)
+                if field in IMPORT_FIELDS
+            }
+            for row in reader
+        ]
+    return [{"job_url": row[0].strip()} for row in [first, *reader] if row and row[0].strip()]
+
+
+def _manual_complete(row: dict) -> bool:
+    return all((row.get(field) or "").strip() for field in ("company_name", "job_title", "job_description"))
+
+
+def _dispatch_extraction(job_ids) -> None:
+    # Imported here so the service stays importable without the Celery app loaded.
+    from apps.jobs.tasks import extract_job_descriptions_task
+
+    chunk_size = max(1, getattr(settings, "JOB_IMPORT_CHUNK_SIZE", 10))
+    for start in range(0, len(job_ids), chunk_size):
+        # Rows with complete manual fields keep them if extraction fails; the task
+        # only falls back for those.
+        extract_job_descriptions_task.delay(job_ids[start:start + chunk_size], manual_fallback=True)
+
+
+def import_jobs(user, rows):
+    """
+    Create pending jobs for ``rows`` in one transaction and queue their extraction.
+
+    URLs the user already saved (or repeated in ``rows``) are skipped; they are compared
+    in normalized form. Returns ``(batch, skipped)`` where ``skipped`` lists
+    ``{"row", "job_url", "reason"}`` entries.
+    """
+    existing = {
+        normalize_url(url)
+        for url in JobApplication.objects.filter(user=user)
+        .exclude(job_url__isnull=True)
+        .exclude(job_url="")
+        .values_list("job_url", flat=True)
+    }
+
+    accepted = []
+    skipped = []
+    for index, row in enumerate(rows):
+        key = normalize_url(row["job_url"])
+        if key in existing:
+            skipped.append({"row": index, "job_url": row["job_url"], "reason": "duplicate"})
+            continue
+        existing.add(key)
+        accepted.append(row)
+
+    with transaction.atomic():
+        batch = JobImportBatch.objects.create(user=user)
+        jobs = JobApplication.objects.bulk_create([
+            JobApplication(
+                user=user,
+                import_batch=batch,
+                job_url=row["job_url"],
+                company_name=(row.get("company_name") or "").strip(),
+                job_title=(row.get("job_title") or "").strip(),
+                job_description=(row.get("job_description") or "").strip(),
+                description_source="manual" if _manual_complete(row) else "extracted",
+                extraction_status="pending",
+                extraction_error="",
+            )
+            for row in accepted
+        ])
+        job_ids = [job.id for job in jobs]
+        if job_ids:
+            transaction.on_commit(lambda: _dispatch_extraction(job_ids))
+
+    return batch, skipped
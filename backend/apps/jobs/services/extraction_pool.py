@@ -0,0 +1,243 @@
+import atexit
+import logging
+import os
+import subprocess
+import sys
+import threading
+from multiprocessing.connection import Connection
+
+from django.conf import settings
+
+from apps.ai_engine import metrics
+from .job_extractor import JobExtractionError, extract_job_posting_from_html
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerUnavailable(Exception):
+    pass
+
+
+class _Worker:
+    """One prewarmed child process, serving one page at a time over a pair of pipes."""
+
+    def __init__(self, memory_limit_mb: int, startup_timeout: float):
+        to_child_read, to_child_write = os.pipe()
+        from_child_read, from_child_write = os.pipe()
+        try:
+            # A plain subprocess rather than multiprocessing: Celery prefork children are
+            # daemonic, and daemonic processes may not start multiprocessing children.
+            self.process = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "apps.jobs.services.extraction_worker",
+                    str(to_child_read),
+                    str(from_child_write),
+                    str(memory_limit_mb),
+                ],
+                pass_fds=(to_child_read, from_child_write),
+                cwd=str(settings.BASE_DIR),
+            )
+        except OSError as exc:
+            os.close(to_child_write)
+            os.close(from_child_read)
+            raise WorkerUnavailable(f"Could not start extraction worker: {exc}")
+        finally:
+            os.close(to_child_read)
+            os.close(from_child_write)
+        self.requests = Connection(to_child_write, readable=False)
+        self.results = Connection(from_child_read, writable=False)
+        self.tasks = 0
+
+        try:
+            ready = self.results.poll(startup_timeout) and self.results.recv()
+        except (EOFError, OSError):
+            ready = None
+        if not ready:
+            self.kill()
+            raise WorkerUnavailable("Extraction worker did not start.")
+        metrics.record("extraction_workers_started")
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, html: str, url: str, strategies, timeout: float):
+        """Returns ``(status, payload, max_rss_kb)``; raises TimeoutError or EOFError."""
+        self.tasks += 1
+        self.requests.send((html, url, strategies))
+        if not self.results.poll(timeout):
+            raise TimeoutError
+        return self.results.recv()
+
+    def kill(self) -> None:
+        if self.process.poll() is None:
+            self.process.kill()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            logger.warning("Extraction worker pid=%s did not exit after SIGKILL", self.process.pid)
+        for conn in (getattr(self, "requests", None), getattr(self, "results", None)):
+            if conn is not None:
+                conn.close()
+
+
+class ExtractionPool:
+    """
+    Runs ``extract_job_posting_from_html`` in child processes with a hard wall-clock
+    timeout. A worker that times out, crashes or runs out of memory is killed and a
+    fresh one is started on the next request; workers are also recycled after
+    ``max_tasks`` pages or once their peak RSS passes ``max_rss_mb``.
+    """
+
+    def __init__(self, size, timeout, memory_limit_mb, max_rss_mb, max_tasks, startup_timeout):
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_rss_mb = max_rss_mb
+        self.max_tasks = max_tasks
+        self.startup_timeout = startup_timeout
+        self.size = max(1, size)
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _take(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive():
+                    return worker
+                worker.kill()
+        return _Worker(self.memory_limit_mb, self.startup_timeout)
+
+    def _spawn_idle(self) -> None:
+        try:
+            worker = _Worker(self.memory_limit_mb, self.startup_timeout)
+        except WorkerUnavailable as exc:
+            logger.warning("Could not prewarm a replacement extraction worker: %s", exc)
+            return
+        with self._lock:
+            # close() may have run while this worker was starting.
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(worker)
+                return
+        worker.kill()
+
+    def _discard(self, worker: _Worker) -> None:
+        # Start the replacement in the background so the next page does not pay for
+        # interpreter startup and imports.
+        worker.kill()
+        threading.Thread(target=self._spawn_idle, name="extraction-worker-spawn", daemon=True).start()
+
+    def _give_back(self, worker: _Worker, rss_kb: int) -> None:
+        if worker.tasks >= self.max_tasks or rss_kb > self.max_rss_mb * 1024:
+            metrics.record("extraction_workers_recycled")
+            self._discard(worker)
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def extract(self, html: str, url: str, strategies=None) -> dict:
+        with self._slots:
+            worker = self._take()
+            try:
+                status, payload, rss_kb = worker.run(html, url, strategies, self.timeout)
+            except TimeoutError:
+                self._discard(worker)
+                metrics.record("extraction_timeouts")
+                raise JobExtractionError(f"Extraction took longer than {self.timeout:g}s and was stopped.")
+            except (EOFError, OSError):
+                self._discard(worker)
+                metrics.record("extraction_worker_crashes")
+                raise JobExtractionError("Extraction ran out of resources on this page.")
+
+            if status == "memory":
+                self._discard(worker)
+                metrics.record("extraction_memory_errors")
+                raise JobExtractionError("Page needs too much memory to extract.")
+            self._give_back(worker, rss_kb)
+
+        if status == "extraction_error":
+            message, attempts = payload
+            raise JobExtractionError(message, attempts=attempts)
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def prewarm(self) -> None:
+        """Starts the idle workers in the background, so the first page finds them ready."""
+        for _ in range(self.size):
+            threading.Thread(target=self._spawn_idle, name="extraction-worker-spawn", daemon=True).start()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+# Set by prewarm_pool(); other processes (management commands, web processes that did not opt in)
+# extract in-process rather than have their first page wait for the children to start.
+_use_pool = False
+
+
+def isolation_enabled() -> bool:
+    # Passing pipe descriptors to the child and RLIMIT_AS are POSIX-only.
+    return _use_pool and os.name == "posix" and getattr(settings, "JOB_EXTRACTION_ISOLATION_ENABLED", True)
+
+
+def prewarm_pool() -> None:
+    """Extracts through the pool in this process from now on, and starts its workers."""
+    global _use_pool
+    _use_pool = True
+    if isolation_enabled():
+        get_pool().prewarm()
+
+
+def get_pool() -> ExtractionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ExtractionPool(
+                    size=getattr(settings, "JOB_EXTRACTION_WORKERS", 2),
+                    timeout=getattr(settings, "JOB_EXTRACTION_TIMEOUT", 15),
+                    memory_limit_mb=getattr(settings, "JOB_EXTRACTION_MEMORY_LIMIT_MB", 1024),
+                    max_rss_mb=getattr(settings, "JOB_EXTRACTION_MAX_RSS_MB", 400),
+                    max_tasks=getattr(settings, "JOB_EXTRACTION_MAX_TASKS", 200),
+                    startup_timeout=getattr(settings, "JOB_EXTRACTION_STARTUP_TIMEOUT", 30),
+                )
+    return _pool
+
+
+def _close_pool() -> None:
+    if _pool is not None:
+        _pool.close()
+
+
+def _forget_pool_after_fork() -> None:
+    # The workers are children of the parent process; a forked child starts its own.
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+atexit.register(_close_pool)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pool_after_fork)
+
+
+def extract_job_posting_isolated(html: str, url: str, strategies=None) -> dict:
+    """``extract_job_posting_from_html`` in the worker pool, or in-process when isolation is off."""
+    if not isolation_enabled():
+        return extract_job_posting_from_html(html, url, strategies)
+    try:
+        return get_pool().extract(html, url, strategies)
+    except WorkerUnavailable:
+        logger.warning("Extraction pool unavailable; extracting %s in-process", url)
+        metrics.record("extraction_pool_fallbacks")
+        return extract_job_posting_from_html(html, url, strategies)
@@ -1,7 +1,14 @@
+import json
 import re
+import string
+import threading
+
+from django.conf import settings
 
 
 MIN_DESCRIPTION_LENGTH = 180
+FULL_SCORE_DESCRIPTION_LENGTH = 1500
+FULL_SCORE_JOB_MARKERS = 4
 
 AUTH_WALL_MARKERS = (
     "linkedin login",
@@ -37,13 +44,205 @@ GENERIC_NON_JOB_TITLES = {
     "linkedin: log in or sign up",
 }
 
+# Punctuation separates words for marker matching ("sign in | linkedin" also matches
+# "Sign in · LinkedIn"); apostrophes stay so "what you'll do" keeps its shape.
+_SEPARATORS = str.maketrans(
+    {char: " " for char in string.punctuation.replace("'", "") + " ·–—•“”"}
+    | {"’": "'"}
+)
+
 
 def _normalize(value: str) -> str:
-    return re.sub(r"\s+", " ", (value or "")).strip()
+    return " ".join((value or "").split())
+
+
+def _fold(value: str) -> str:
+    """Lower-cased, punctuation-free, single-spaced form used on both markers and text."""
+    return " ".join(value.lower().translate(_SEPARATORS).split())
+
+
+def _trie_pattern(words) -> str:
+    """One regex branch per shared prefix, so the engine never re-reads a common start."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        if list(node) == [""]:
+            return ""
+        # Folded text can still hold runs of spaces where punctuation stood.
+        branches = [
+            (" +" if char == " " else re.escape(char)) + build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class QualityReport:
+    def __init__(self, score: float, rejection_reason, features: dict):
+        self.score = score
+        self.rejection_reason = rejection_reason
+        self.features = features
+
+    def as_dict(self) -> dict:
+        return {"score": self.score, "rejection_reason": self.rejection_reason, "features": self.features}
+
+
+class QualityScorer:
+    """
+    Scores extracted job text against auth-wall and job-section marker sets.
+
+    All markers are compiled into one trie-shaped regex anchored on a leading space, so
+    a description is normalized once and scanned once however many markers there are.
+    Markers match at word starts ("skills" matches "skillset", not "upskills").
+    """
+
+    def __init__(
+        self,
+        auth_wall_markers=AUTH_WALL_MARKERS,
+        job_hint_markers=JOB_HINT_MARKERS,
+        generic_titles=GENERIC_NON_JOB_TITLES,
+        min_description_length=MIN_DESCRIPTION_LENGTH,
+        full_score_length=FULL_SCORE_DESCRIPTION_LENGTH,
+        full_score_job_markers=FULL_SCORE_JOB_MARKERS,
+    ):
+        self.min_description_length = min_description_length
+        self.full_score_length = max(1, full_score_length)
+        self.full_score_job_markers = max(1, full_score_job_markers)
+        self.generic_titles = {_normalize(title).lower() for title in generic_titles}
+
+        self._kinds = {}
+        self._names = {}
+        for kind, markers in (("auth_wall", auth_wall_markers), ("job_hint", job_hint_markers)):
+            for marker in markers:
+                folded = _fold(marker)
+                if folded:
+                    self._kinds.setdefault(folded, set()).add(kind)
+                    self._names.setdefault(folded, marker)
+        # The regex reports one marker per position; a marker inside a longer one it
+        # matched ("qualifications" in "preferred qualifications") still counts.
+        self._implied = {
+            marker: {other for other in self._kinds if other != marker and f" {other}" in f" {marker}"}
+            for marker in self._kinds
+        }
+        self._pattern = re.compile(" " + _trie_pattern(self._kinds)) if self._kinds else None
+
+    def _markers(self, text: str) -> set:
+        if self._pattern is None or not text:
+            return set()
+        found = set()
+        for match in set(self._pattern.findall(" " + text.lower().translate(_SEPARATORS))):
+            marker = " ".join(match.split())
+            found.add(marker)
+            found |= self._implied[marker]
+        return found
+
+    def _of_kind(self, markers, kind: str) -> list:
+        return sorted(self._names[marker] for marker in markers if kind in self._kinds[marker])
 
+    def evaluate(self, job_description: str, job_title: str = "", company_name: str = "") -> QualityReport:
+        description = _normalize(job_description)
+        title = _normalize(job_title)
+        if not description:
+            return QualityReport(
+                0.0,
+                "Extracted page did not contain job description text.",
+                {
+                    "length": 0,
+                    "length_score": 0.0,
+                    "job_markers": [],
+                    "marker_score": 0.0,
+                    "auth_wall_markers": [],
+                    "generic_title": False,
+                },
+            )
 
-def _contains_any(text: str, markers) -> bool:
-    return any(marker in text for marker in markers)
+        description_markers = self._markers(description)
+        job_markers = self._of_kind(description_markers, "job_hint")
+        auth_wall_markers = self._of_kind(
+            description_markers | self._markers(title) | self._markers(_normalize(company_name)), "auth_wall"
+        )
+        generic_title = title.lower() in self.generic_titles
+
+        length_score = min(1.0, len(description) / self.full_score_length)
+        marker_score = min(1.0, len(job_markers) / self.full_score_job_markers)
+        score = (length_score + marker_score) / 2
+        if auth_wall_markers:
+            score /= 2
+
+        if len(description) < self.min_description_length:
+            reason = "Extracted content is too short to be a valid job description."
+        elif generic_title:
+            reason = "Extracted page appears to be a login/auth page, not a job posting."
+        elif auth_wall_markers and not job_markers:
+            reason = "Extracted page appears blocked or login-gated, not a real job description."
+        else:
+            reason = None
+
+        return QualityReport(
+            round(score, 3),
+            reason,
+            {
+                "length": len(description),
+                "length_score": round(length_score, 3),
+                "job_markers": job_markers,
+                "marker_score": round(marker_score, 3),
+                "auth_wall_markers": auth_wall_markers,
+                "generic_title": generic_title,
+            },
+        )
+
+
+def _rules_key() -> tuple:
+    return (
+        getattr(settings, "JOB_QUALITY_RULES_FILE", ""),
+        getattr(settings, "JOB_QUALITY_MIN_DESCRIPTION_LENGTH", MIN_DESCRIPTION_LENGTH),
+        getattr(settings, "JOB_QUALITY_FULL_SCORE_LENGTH", FULL_SCORE_DESCRIPTION_LENGTH),
+        getattr(settings, "JOB_QUALITY_FULL_SCORE_MARKERS", FULL_SCORE_JOB_MARKERS),
+    )
+
+
+def build_scorer(rules_file: str = "", min_length=MIN_DESCRIPTION_LENGTH, full_length=FULL_SCORE_DESCRIPTION_LENGTH,
+                 full_markers=FULL_SCORE_JOB_MARKERS) -> QualityScorer:
+    """A scorer from the thresholds and, when given, a JSON file replacing any of the marker lists."""
+    rules = {}
+    if rules_file:
+        with open(rules_file, encoding="utf-8") as handle:
+            rules = json.load(handle)
+    return QualityScorer(
+        auth_wall_markers=rules.get("auth_wall_markers", AUTH_WALL_MARKERS),
+        job_hint_markers=rules.get("job_hint_markers", JOB_HINT_MARKERS),
+        generic_titles=rules.get("generic_titles", GENERIC_NON_JOB_TITLES),
+        min_description_length=min_length,
+        full_score_length=full_length,
+        full_score_job_markers=full_markers,
+    )
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_quality_scorer() -> QualityScorer:
+    """The scorer for the current settings; rebuilt only when they change."""
+    global _scorer
+    key = _rules_key()
+    if _scorer is None or _scorer[0] != key:
+        with _scorer_lock:
+            if _scorer is None or _scorer[0] != key:
+                _scorer = (key, build_scorer(*key))
+    return _scorer[1]
+
+
+def evaluate_extraction(job_description: str, job_title: str = "", company_name: str = "") -> QualityReport:
+    return get_quality_scorer().evaluate(job_description, job_title, company_name)
 
 
 def get_extraction_rejection_reason(
@@ -52,27 +251,12 @@ def get_extraction_rejection_reason(
     job_title: str = "",
     company_name: str = "",
 ) -> str | None:
-    description = _normalize(job_description)
-    title = _normalize(job_title)
-    company = _normalize(company_name)
-
-    if not description:
-        return "Extracted page did not contain job description text."
-
-    if len(description) < MIN_DESCRIPTION_LENGTH:
-        return "Extracted content is too short to be a valid job description."
-
-    title_lower = title.lower()
-    if title_lower in GENERIC_NON_JOB_TITLES:
-        return "Extracted page appears to be a login/auth page, not a job posting."
-
-    description_lower = description.lower()
-    combined_lower = " ".join([title, company, description]).lower()
-
-    has_auth_wall_markers = _contains_any(combined_lower, AUTH_WALL_MARKERS)
-    has_job_markers = _contains_any(description_lower, JOB_HINT_MARKERS)
+    return evaluate_extraction(job_description, job_title, company_name).rejection_reason
 
-    if has_auth_wall_markers and not has_job_markers:
-        return "Extracted page appears blocked or login-gated, not a real job description."
 
-    return None
+def get_extraction_quality_score(job_description: str) -> float:
+    """
+    0..1 estimate of how much an extracted text looks like a full job description:
+    half from its length, half from job-section markers, halved again for auth-wall text.
+    """
+    return evaluate_extraction(job_description).score
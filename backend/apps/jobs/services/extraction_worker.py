@@ -0,0 +1,64 @@
+"""
+Child process of the extraction pool (see ``extraction_pool.py``).
+
+Started as ``python -m apps.jobs.services.extraction_worker <request fd> <result fd> <memory MB>``.
+It imports and warms up the parsers, reports ready, then serves ``(html, url, strategies)`` requests
+one at a time until the parent closes the request pipe.
+"""
+import os
+import resource
+import sys
+from multiprocessing.connection import Connection
+
+WARMUP_URL = "https://example.com/jobs/1"
+WARMUP_PAGE = (
+    "<html><head><title>Backend Engineer - Example</title></head><body><main><article>"
+    + "<p>Build and operate Python services, own the data pipelines and review designs.</p>" * 8
+    + "</article></main></body></html>"
+)
+
+
+def _limit_memory(limit_mb: int) -> None:
+    # Address space rather than RSS: the kernel enforces it, and allocations past it
+    # raise MemoryError in this process instead of hurting the parent.
+    if limit_mb > 0:
+        limit = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def main() -> None:
+    requests_conn = Connection(int(sys.argv[1]), writable=False)
+    results_conn = Connection(int(sys.argv[2]), readable=False)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+    from apps.jobs.services.job_extractor import JobExtractionError, extract_job_posting_from_html
+
+    try:
+        extract_job_posting_from_html(WARMUP_PAGE, WARMUP_URL)
+    except JobExtractionError:
+        # The parsers are warm either way; stricter quality settings may just reject this page.
+        pass
+    _limit_memory(int(sys.argv[3]))
+    results_conn.send(("ready", os.getpid(), 0))
+
+    while True:
+        try:
+            html, url, strategies = requests_conn.recv()
+        except EOFError:
+            return
+        try:
+            outcome = ("ok", extract_job_posting_from_html(html, url, strategies))
+        except JobExtractionError as exc:
+            outcome = ("extraction_error", (str(exc), exc.attempts))
+        except MemoryError:
+            outcome = ("memory", "")
+        except Exception as exc:
+            outcome = ("error", f"{type(exc).__name__}: {exc}")
+        results_conn.send((*outcome, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+
+from apps.ai_engine import metrics
+from .bounded_fetch import HTML_CONTENT_TYPES
+from .host_fetcher import polite_get, polite_get_async
+
+logger = logging.getLogger(__name__)
+
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "igshid",
+    "ref",
+    "ref_src",
+    "gh_src",
+    "lever-source",
+    "lever-origin",
+    "trk",
+    "trkinfo",
+    "trackingid",
+    "refid",
+    "originalsubdomain",
+}
+TRACKING_PREFIXES = ("utm_", "_hs", "mkt_")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used as the cache key: no fragment, tracking params or default port."""
+    parts = urlsplit((url or "").strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class FetchCache:
+    """
+    Gzip-compressed page bodies on disk, one file per normalized URL.
+
+    Entries are served without a request until ``ttl`` expires, and kept for
+    ``stale_ttl`` afterwards so the validators can be sent in a conditional GET.
+    """
+
+    def __init__(self, directory, ttl: int, stale_ttl: int):
+        self.directory = str(directory)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.json.gz")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning("Dropping unreadable fetch cache entry %s: %s", path, exc)
+            self._remove(path)
+            return None
+
+        if entry.get("stored_at", 0) + self.ttl + self.stale_ttl < time.time():
+            self._remove(path)
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        return entry.get("stored_at", 0) + self.ttl > time.time()
+
+    def store(self, key: str, body: str, etag: str = "", last_modified: str = "") -> None:
+        entry = {
+            "url": key,
+            "body": body,
+            "etag": etag or "",
+            "last_modified": last_modified or "",
+            "stored_at": time.time(),
+        }
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so concurrent readers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as handle:
+                handle.write(json.dumps(entry).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            raise
+
+    def touch(self, key: str, entry: dict) -> None:
+        self.store(key, entry["body"], entry.get("etag", ""), entry.get("last_modified", ""))
+
+    def prune(self, max_bytes: int = 0) -> tuple:
+        """
+        Delete entries past ``ttl + stale_ttl`` and leftover temp files, then the least
+        recently stored entries until the cache fits in ``max_bytes`` (0: no size limit).
+        Ages come from file mtimes, which ``store`` and ``touch`` refresh, so nothing is
+        decompressed. Returns ``(removed, remaining_bytes)``.
+        """
+        expired_before = time.time() - self.ttl - self.stale_ttl
+        # A temp file this old belongs to a writer that died before renaming it.
+        abandoned_before = time.time() - 3600
+        removed = 0
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(".tmp"):
+                    if stat.st_mtime < abandoned_before:
+                        self._remove(path)
+                        removed += 1
+                elif stat.st_mtime < expired_before:
+                    self._remove(path)
+                    removed += 1
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if max_bytes > 0 and total > max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= max_bytes:
+                    break
+                self._remove(path)
+                removed += 1
+                total -= size
+        return removed, total
+
+    def clear(self) -> int:
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                self._remove(os.path.join(root, name))
+                removed += 1
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_cache = None
+_last_prune = 0.0
+
+
+def get_fetch_cache():
+    global _cache
+    if _cache is None and getattr(settings, "JOB_FETCH_CACHE_ENABLED", True):
+        _cache = FetchCache(
+            directory=getattr(settings, "JOB_FETCH_CACHE_DIR", os.path.join(tempfile.gettempdir(), "job_fetch_cache")),
+            ttl=getattr(settings, "JOB_FETCH_CACHE_TTL", 3600),
+            stale_ttl=getattr(settings, "JOB_FETCH_CACHE_STALE_TTL", 7 * 24 * 3600),
+        )
+    return _cache
+
+
+def _lookup(cache, url: str):
+    key = normalize_url(url)
+    try:
+        entry = cache.get(key)
+    except OSError as exc:
+        logger.warning("Fetch cache read failed for %s: %s", key, exc)
+        entry = None
+    return key, entry
+
+
+def _validators(entry):
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers or None
+
+
+def prune_fetch_cache(cache) -> tuple:
+    """Apply the JOB_FETCH_CACHE_MAX_MB limit and drop expired entries; see ``FetchCache.prune``."""
+    removed, remaining = cache.prune(max_bytes=int(getattr(settings, "JOB_FETCH_CACHE_MAX_MB", 500) * 1024 * 1024))
+    if removed:
+        metrics.record("fetch_cache_pruned", removed)
+        logger.info("Pruned %s fetch cache files, %s KB left", removed, remaining // 1024)
+    return removed, remaining
+
+
+def _maybe_prune(cache) -> None:
+    # Each process sweeps at most once per interval, after a write, so the cache
+    # stays bounded without a scheduler.
+    global _last_prune
+    interval = getattr(settings, "JOB_FETCH_CACHE_PRUNE_INTERVAL", 3600)
+    if interval <= 0 or time.monotonic() - _last_prune < interval:
+        return
+    _last_prune = time.monotonic()
+    try:
+        prune_fetch_cache(cache)
+    except OSError as exc:
+        logger.warning("Fetch cache prune failed: %s", exc)
+
+
+def _settle(cache, key: str, entry, response) -> str:
+    if entry and response.status_code == 304:
+        metrics.record("fetch_cache_revalidated")
+        _safe_store(cache.touch, key, entry)
+        return entry["body"]
+
+    metrics.record("fetch_cache_misses")
+    body = response.text
+    if "no-store" not in (response.headers.get("Cache-Control") or "").lower():
+        _safe_store(
+            cache.store,
+            key,
+            body,
+            response.headers.get("ETag", ""),
+            response.headers.get("Last-Modified", ""),
+        )
+        _maybe_prune(cache)
+    return body
+
+
+def fetch_with_cache(session, url: str, timeout: float, content_types=HTML_CONTENT_TYPES, deadline=None):
+    """
+    GET ``url`` through the fetch cache and the per-host limits (see ``polite_get`` for
+    ``deadline``).
+
+    Returns the page text. Raises ``requests.RequestException`` or
+    ``bounded_fetch.FetchRejected`` when the page has to be fetched and the request fails.
+    """
+    cache = get_fetch_cache()
+    if cache is None:
+        return polite_get(session, url, timeout=timeout, content_types=content_types, deadline=deadline).text
+
+    key, entry = _lookup(cache, url)
+    if entry and cache.is_fresh(entry):
+        metrics.record("fetch_cache_hits")
+        return entry["body"]
+
+    response = polite_get(
+        session,
+        url,
+        timeout=timeout,
+        headers=_validators(entry),
+        content_types=content_types,
+        deadline=deadline,
+    )
+    return _settle(cache, key, entry, response)
+
+
+async def fetch_with_cache_async(client, gate, url: str, timeout: float, content_types=HTML_CONTENT_TYPES):
+    """Async counterpart of ``fetch_with_cache`` for the concurrent bulk path."""
+    cache = get_fetch_cache()
+    if cache is None:
+        return (await polite_get_async(client, gate, url, timeout=timeout, content_types=content_types)).text
+
+    key, entry = _lookup(cache, url)
+    if entry and cache.is_fresh(entry):
+        metrics.record("fetch_cache_hits")
+        return entry["body"]
+
+    response = await polite_get_async(
+        client,
+        gate,
+        url,
+        timeout=timeout,
+        headers=_validators(entry),
+        content_types=content_types,
+    )
+    return _settle(cache, key, entry, response)
+
+
+def _safe_store(method, key, *args) -> None:
+    # The cache is an optimization; a full disk must not fail the extraction.
+    try:
+        method(key, *args)
+    except OSError as exc:
+        logger.warning("Fetch cache write failed for %s: %s", key, exc)
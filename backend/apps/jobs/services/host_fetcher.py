@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from apps.ai_engine import metrics
+from apps.ai_engine.rate_limit import InMemoryTokenBucket, RedisTokenBucket
+from .bounded_fetch import (
+    CHUNK_SIZE,
+    HTML_CONTENT_TYPES,
+    BodyDecoder,
+    FetchedPage,
+    FetchRejected,
+    bounded_get,
+    check_headers,
+)
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 503}
+HOST_BUCKET_KEY_PREFIX = "job-fetch-host"
+
+BROWSER_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+
+class HostBusy(FetchRejected):
+    """A fetch with a deadline would have had to wait for the host's rate limit, a slot or a retry."""
+
+
+def host_of(url: str) -> str:
+    return (urlsplit(url or "").hostname or "").lower()
+
+
+def _host_concurrency() -> int:
+    return max(1, getattr(settings, "JOB_FETCH_HOST_CONCURRENCY", 2))
+
+
+_session = None
+_session_pid = None
+_semaphores = {}
+_limiter = None
+_state_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Shared session for job page fetches.
+
+    urllib3 keeps one connection pool per host behind the adapter; each pool holds at
+    most JOB_FETCH_HOST_CONCURRENCY connections, matching the per-host semaphore.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _state_lock:
+            if _session is None or _session_pid != os.getpid():
+                session = requests.Session()
+                session.headers.update(BROWSER_HEADERS)
+                adapter = HTTPAdapter(
+                    pool_connections=getattr(settings, "JOB_FETCH_POOL_HOSTS", 32),
+                    pool_maxsize=_host_concurrency(),
+                    pool_block=False,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+                _session_pid = os.getpid()
+    return _session
+
+
+def _host_semaphore(host: str) -> threading.BoundedSemaphore:
+    with _state_lock:
+        semaphore = _semaphores.get(host)
+        if semaphore is None:
+            semaphore = _semaphores[host] = threading.BoundedSemaphore(_host_concurrency())
+        return semaphore
+
+
+def _forget_state_after_fork() -> None:
+    # Pooled sockets and held semaphores belong to the parent; the child starts clean
+    # without closing anything the parent may still be using.
+    global _session, _session_pid, _semaphores, _limiter, _state_lock
+    _session = None
+    _session_pid = None
+    _semaphores = {}
+    _limiter = None
+    _state_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_state_after_fork)
+
+
+def get_host_limiter():
+    """Token buckets for the per-host limit, kept apart from the Groq limiter's keys."""
+    global _limiter
+    if _limiter is None:
+        if getattr(settings, "JOB_FETCH_RATE_LIMIT_BACKEND", "redis") == "memory":
+            _limiter = InMemoryTokenBucket()
+        else:
+            _limiter = RedisTokenBucket(
+                getattr(settings, "JOB_FETCH_RATE_LIMIT_REDIS_URL", None) or settings.CELERY_BROKER_URL,
+                key_prefix=HOST_BUCKET_KEY_PREFIX,
+            )
+    return _limiter
+
+
+def _rate_wait(host: str) -> float:
+    """Take one request from the host's bucket; returns the seconds to wait when it is empty."""
+    rate = getattr(settings, "JOB_FETCH_HOST_RATE", 1.0)
+    if rate <= 0 or not host:
+        return 0.0
+    burst = getattr(settings, "JOB_FETCH_HOST_BURST", 3)
+    try:
+        wait = get_host_limiter().acquire([(host, burst, rate, 1)])
+    except Exception as exc:
+        # Politeness is best effort: an unreachable limiter store must not fail the fetch.
+        logger.warning("Host rate limiter unavailable, fetching %s unthrottled: %s", host, exc)
+        metrics.record("fetch_host_limiter_errors")
+        return 0.0
+    if wait > 0:
+        metrics.record("fetch_host_throttled")
+        metrics.record("fetch_host_wait_seconds", wait)
+    return wait
+
+
+def _max_host_wait() -> float:
+    return getattr(settings, "JOB_FETCH_HOST_MAX_WAIT", 60)
+
+
+def _gave_up_waiting(host: str, waited: float) -> HostBusy:
+    metrics.record("fetch_host_wait_abandoned")
+    return HostBusy(f"Gave up after waiting {waited:.0f}s for {host}'s rate limit.")
+
+
+def wait_for_host(host: str) -> None:
+    """Block until the host's bucket grants a request; raises ``HostBusy`` past JOB_FETCH_HOST_MAX_WAIT."""
+    waited = 0.0
+    while True:
+        wait = _rate_wait(host)
+        if wait <= 0:
+            return
+        if waited + wait > _max_host_wait():
+            raise _gave_up_waiting(host, waited)
+        time.sleep(wait)
+        waited += wait
+
+
+async def wait_for_host_async(host: str) -> None:
+    waited = 0.0
+    while True:
+        # The Redis limiter is a blocking client.
+        wait = await asyncio.to_thread(_rate_wait, host)
+        if wait <= 0:
+            return
+        if waited + wait > _max_host_wait():
+            raise _gave_up_waiting(host, waited)
+        await asyncio.sleep(wait)
+        waited += wait
+
+
+def parse_retry_after(value) -> float:
+    """Seconds from a Retry-After header, given either as delta-seconds or an HTTP date."""
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def retry_delay(attempt: int, retry_after: float = 0) -> float:
+    """Exponential backoff with full jitter, never shorter than Retry-After and capped."""
+    base = getattr(settings, "JOB_FETCH_BACKOFF_BASE", 1.0)
+    cap = getattr(settings, "JOB_FETCH_BACKOFF_MAX", 30)
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    return min(cap, max(retry_after, delay))
+
+
+def _should_retry(status_code: int, attempt: int) -> bool:
+    return status_code in RETRY_STATUSES and attempt < getattr(settings, "JOB_FETCH_MAX_RETRIES", 2)
+
+
+def _remaining(deadline: float | None):
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def polite_get(
+    session,
+    url: str,
+    timeout: float,
+    headers=None,
+    content_types=HTML_CONTENT_TYPES,
+    deadline: float | None = None,
+) -> FetchedPage:
+    """
+    ``bounded_get`` behind the per-host concurrency and rate limits, retrying 429 and
+    503 responses with jittered backoff. Raises like ``bounded_get`` once retries run out.
+
+    With a ``deadline`` (a ``time.monotonic()`` value) the whole fetch has to finish by
+    then and nothing is waited out: an empty host bucket, a 429 / 503 or a host slot that
+    does not free up in time raise ``HostBusy`` instead.
+    """
+    host = host_of(url)
+    attempt = 0
+    while True:
+        if deadline is None:
+            wait_for_host(host)
+        elif _rate_wait(host) > 0:
+            raise HostBusy(f"{host} is rate limited.")
+
+        semaphore = _host_semaphore(host)
+        if not semaphore.acquire(timeout=_remaining(deadline)):
+            raise HostBusy(f"No free connection slot for {host}.")
+        try:
+            remaining = _remaining(deadline)
+            if remaining is not None:
+                if remaining <= 0:
+                    raise HostBusy(f"No time left to fetch from {host}.")
+                timeout = min(timeout, remaining)
+            return bounded_get(
+                session,
+                url,
+                timeout=timeout,
+                headers=headers,
+                content_types=content_types,
+                deadline=deadline,
+            )
+        except requests.HTTPError as exc:
+            response = exc.response
+            if response is None or not _should_retry(response.status_code, attempt):
+                raise
+            if deadline is not None:
+                raise HostBusy(f"{host} answered {response.status_code}.")
+            delay = retry_delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+        finally:
+            semaphore.release()
+
+        metrics.record("fetch_retries")
+        time.sleep(delay)
+        attempt += 1
+
+
+def open_async_client():
+    """httpx client for the concurrent bulk path; per-host limits come from ``HostGate``."""
+    import httpx
+
+    return httpx.AsyncClient(
+        headers=BROWSER_HEADERS,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=getattr(settings, "JOB_FETCH_BULK_CONCURRENCY", 16),
+            max_keepalive_connections=getattr(settings, "JOB_FETCH_POOL_HOSTS", 32),
+        ),
+    )
+
+
+class HostGate:
+    """Per-host and overall concurrency limits for the fetches of one event loop."""
+
+    def __init__(self, total: int = 0):
+        self._total = asyncio.Semaphore(total or getattr(settings, "JOB_FETCH_BULK_CONCURRENCY", 16))
+        self._hosts = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        semaphore = self._hosts.get(host)
+        if semaphore is None:
+            semaphore = self._hosts[host] = asyncio.Semaphore(_host_concurrency())
+        # Host first, so requests queued behind a busy host do not hold overall slots.
+        async with semaphore, self._total:
+            yield
+
+
+async def polite_get_async(
+    client,
+    gate: HostGate,
+    url: str,
+    timeout: float,
+    headers=None,
+    content_types=HTML_CONTENT_TYPES,
+) -> FetchedPage:
+    """
+    Async counterpart of ``polite_get`` over httpx. Raises ``FetchRejected`` or
+    ``httpx.HTTPError``.
+    """
+    host = host_of(url)
+    attempt = 0
+    while True:
+        await wait_for_host_async(host)
+        async with gate.slot(host):
+            started = time.monotonic()
+            async with client.stream("GET", url, headers=headers, timeout=timeout) as response:
+                if response.status_code == 304:
+                    return FetchedPage(304, response.headers)
+                if _should_retry(response.status_code, attempt):
+                    delay = retry_delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+                else:
+                    response.raise_for_status()
+                    check_headers(response.headers, content_types)
+                    body = BodyDecoder(response.headers, started)
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        body.feed(chunk)
+                    return FetchedPage(response.status_code, response.headers, body.finish())
+
+        metrics.record("fetch_retries")
+        await asyncio.sleep(delay)
+        attempt += 1
@@ -1,50 +1,129 @@
+import asyncio
+import html as html_lib
 import json
+import time
 from urllib.parse import urlparse
 
+import lxml.html
 import requests
+from lxml import etree
 from readability import Document
 import trafilatura
-from bs4 import BeautifulSoup
+from django.conf import settings
+
+from .bounded_fetch import HTML_CONTENT_TYPES, JSON_CONTENT_TYPES, FetchRejected
+from .extraction_quality import evaluate_extraction
+from .fetch_cache import fetch_with_cache, fetch_with_cache_async, get_fetch_cache
+from .host_fetcher import HostGate, get_session, open_async_client
 
 
 class JobExtractionError(Exception):
-    pass
+    def __init__(self, message: str = "", attempts=None):
+        super().__init__(message)
+        # Strategy attempts made before giving up, so failures feed the per-domain stats too.
+        self.attempts = attempts or []
 
 
-session = requests.Session()
+def fetch_html(url: str, timeout: float = 10, deadline: float | None = None) -> str:
+    try:
+        return fetch_with_cache(get_session(), url, timeout=timeout, deadline=deadline)
 
-session.headers.update({
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/120.0 Safari/537.36"
-    ),
-    "Accept-Language": "en-US,en;q=0.9",
-    "Accept-Encoding": "gzip, deflate",
-    "Connection": "keep-alive",
-})
+    except FetchRejected as exc:
+        raise JobExtractionError(f"Extraction stopped: {exc}")
+    except requests.RequestException:
+        raise JobExtractionError("Extraction blocked by website.")
 
 
-def fetch_html(url: str) -> str:
+def fetch_json(url: str, timeout: float = 10, deadline: float | None = None):
     try:
-        response = session.get(
-            url,
-            timeout=10,
-            allow_redirects=True,
+        return json.loads(
+            fetch_with_cache(get_session(), url, timeout=timeout, content_types=JSON_CONTENT_TYPES, deadline=deadline)
         )
-        response.raise_for_status()
-        return response.text
-
+    except FetchRejected as exc:
+        raise JobExtractionError(f"Extraction stopped: {exc}")
     except requests.RequestException:
         raise JobExtractionError("Extraction blocked by website.")
+    except ValueError:
+        raise JobExtractionError("Posting API returned invalid JSON.")
+
+
+async def _prefetch(targets, timeout: float) -> int:
+    gate = HostGate()
+    async with open_async_client() as client:
+        results = await asyncio.gather(
+            *(
+                fetch_with_cache_async(client, gate, url, timeout=timeout, content_types=content_types)
+                for url, content_types in targets
+            ),
+            return_exceptions=True,
+        )
+    return sum(1 for result in results if not isinstance(result, BaseException))
+
+
+def prefetch_job_pages(urls, timeout: float = 10) -> int:
+    """
+    Download the pages behind ``urls`` (or their ATS posting APIs) concurrently into the
+    fetch cache, so the extractions that follow read them from disk.
+
+    Failures are ignored here; the extraction refetches and reports them. Returns the
+    number of URLs fetched, or 0 when the fetch cache is disabled.
+    """
+    from .ats_adapters import find_adapter
+
+    if get_fetch_cache() is None:
+        return 0
+
+    targets = []
+    for url in dict.fromkeys(url for url in urls if url):
+        adapter, match = find_adapter(url)
+        api_url = adapter.api_url(match) if adapter else None
+        if api_url:
+            targets.append((api_url, JSON_CONTENT_TYPES))
+        else:
+            targets.append((url, HTML_CONTENT_TYPES))
+    if not targets:
+        return 0
+    return asyncio.run(_prefetch(targets, timeout))
+
+
+NON_TEXT_XPATH = "//text()[not(ancestor::script or ancestor::style or ancestor::template)]"
+
+
+def parse_html(html: str):
+    """Parse a page once into an lxml tree; every extraction step below reads from it."""
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration.
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+
+def tree_to_text(tree) -> str:
+    if tree is None:
+        return ""
+    parts = (text.strip() for text in tree.xpath("." + NON_TEXT_XPATH))
+    return "\n".join(part for part in parts if part)
 
 
 def html_to_text(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
-    return soup.get_text(separator="\n", strip=True)
+    return tree_to_text(parse_html(html))
+
 
+def description_to_text(value) -> str:
+    # Posting APIs and JSON-LD carry the description as HTML, often entity-escaped a
+    # second time, which would otherwise survive flattening as literal tags.
+    text = str(value or "")
+    if "&lt;" in text:
+        text = html_lib.unescape(text)
+    return clean_text(html_to_text(text))
 
-def extract_with_readability(html: str) -> str:
+
+def extract_with_readability(html) -> str:
+    # Readability works on its own cleaned copy, so the shared tree is left intact.
     try:
         doc = Document(html)
         return doc.summary()
@@ -52,7 +131,7 @@ def extract_with_readability(html: str) -> str:
         return ""
 
 
-def extract_with_trafilatura(html: str) -> str:
+def extract_with_trafilatura(html) -> str:
     try:
         return trafilatura.extract(html) or ""
     except Exception:
@@ -83,9 +162,9 @@ def _walk_json(value):
             yield from _walk_json(item)
 
 
-def _extract_jobposting_json_ld(soup: BeautifulSoup):
-    for script in soup.find_all("script", attrs={"type": "application/ld+json"}):
-        payload = script.string or script.get_text(strip=True)
+def _extract_jobposting_json_ld(tree):
+    for script in tree.xpath('//script[@type="application/ld+json"]'):
+        payload = (script.text or "").strip()
         if not payload:
             continue
         try:
@@ -108,37 +187,35 @@ def _normalize_company_from_domain(url: str) -> str:
     return host.split(".")[0].replace("-", " ").title()
 
 
-def extract_job_metadata(html: str, url: str) -> dict:
-    soup = BeautifulSoup(html, "html.parser")
+def _meta_content(tree, prop: str) -> str:
+    values = tree.xpath("//meta[@property=$prop]/@content", prop=prop)
+    return values[0] if values else ""
+
+
+def _metadata_from_tree(tree, url: str) -> dict:
     job_title = ""
     company_name = ""
+    if tree is None:
+        return {"job_title": job_title, "company_name": _normalize_company_from_domain(url)}
 
-    for item in _extract_jobposting_json_ld(soup):
+    for item in _extract_jobposting_json_ld(tree):
         if not job_title:
             job_title = clean_text(str(item.get("title", "")))
 
         if not company_name:
-            org = item.get("hiringOrganization") or item.get("hiringorganisation")
-            if isinstance(org, dict):
-                company_name = clean_text(str(org.get("name", "")))
-            elif isinstance(org, str):
-                company_name = clean_text(org)
+            company_name = _organization_name(item.get("hiringOrganization") or item.get("hiringorganisation"))
 
         if job_title and company_name:
             break
 
     if not job_title:
-        og_title = soup.find("meta", attrs={"property": "og:title"})
-        if og_title and og_title.get("content"):
-            job_title = clean_text(og_title["content"])
+        job_title = clean_text(_meta_content(tree, "og:title"))
 
-    if not job_title and soup.title and soup.title.string:
-        job_title = clean_text(soup.title.string)
+    if not job_title:
+        job_title = clean_text(tree.findtext(".//title") or "")
 
     if not company_name:
-        og_site = soup.find("meta", attrs={"property": "og:site_name"})
-        if og_site and og_site.get("content"):
-            company_name = clean_text(og_site["content"])
+        company_name = clean_text(_meta_content(tree, "og:site_name"))
 
     if not company_name:
         company_name = _normalize_company_from_domain(url)
@@ -149,30 +226,204 @@ def extract_job_metadata(html: str, url: str) -> dict:
     }
 
 
-def extract_job_description_from_html(html: str) -> str:
-    content = extract_with_readability(html)
-    if not content or len(content) < 200:
-        content = extract_with_trafilatura(html)
+def extract_job_metadata(html: str, url: str) -> dict:
+    return _metadata_from_tree(parse_html(html), url)
+
 
-    content = html_to_text(content)
-    content = clean_text(content)
+def _organization_name(org) -> str:
+    if isinstance(org, dict):
+        return clean_text(str(org.get("name", "")))
+    if isinstance(org, str):
+        return clean_text(org)
+    return ""
 
-    if not content or len(content) < 200:
-        raise JobExtractionError("Could not extract sufficient content from the job posting.")
 
-    return content
+def _posting_from_json_ld(tree, url: str):
+    if tree is None:
+        return None
+
+    for item in _extract_jobposting_json_ld(tree):
+        description = description_to_text(item.get("description"))
+        if len(description) < 200:
+            continue
 
+        job_title = clean_text(str(item.get("title", "")))
+        company_name = _organization_name(item.get("hiringOrganization") or item.get("hiringorganisation"))
+        if not job_title or not company_name:
+            metadata = _metadata_from_tree(tree, url)
+            job_title = job_title or metadata.get("job_title", "")
+            company_name = company_name or metadata.get("company_name", "")
+
+        return {
+            "job_description": description,
+            "job_title": job_title,
+            "company_name": company_name,
+        }
+    return None
+
+
+def extract_job_posting_from_json_ld(html: str, url: str):
+    """Build a posting from a JSON-LD JobPosting with a full description, or return None."""
+    if "application/ld+json" not in html:
+        return None
+    return _posting_from_json_ld(parse_html(html), url)
+
+
+def extract_job_posting_fast(url: str, timeout: float, json_fetcher=None, html_fetcher=None):
+    """
+    Cheap attempt for the request thread: ATS adapters, then one short fetch and
+    the JSON-LD path only.
+
+    All fetches share one ``timeout``-second deadline and never wait out a host's rate
+    limit or retry a 429 / 503. Returns None when that is not enough or the page has no
+    usable JobPosting, so the caller can hand the URL to the full extractor in the
+    background.
+    """
+    from .ats_adapters import extract_with_adapter
+
+    json_fetcher = json_fetcher or fetch_json
+    html_fetcher = html_fetcher or fetch_html
+    deadline = time.monotonic() + timeout
+    posting = extract_with_adapter(
+        url,
+        fetch_json=lambda api_url: json_fetcher(api_url, timeout=timeout, deadline=deadline),
+        fetch_html=lambda page_url: html_fetcher(page_url, timeout=timeout, deadline=deadline),
+    )
+    if posting:
+        return posting
 
-def extract_job_posting(url: str) -> dict:
-    html = fetch_html(url)
-    job_description = extract_job_description_from_html(html)
-    metadata = extract_job_metadata(html=html, url=url)
+    try:
+        html = html_fetcher(url, timeout=timeout, deadline=deadline)
+    except JobExtractionError:
+        return None
+    return extract_job_posting_from_json_ld(html, url)
+
+
+def _json_ld_description(tree) -> str:
+    for item in _extract_jobposting_json_ld(tree):
+        description = description_to_text(item.get("description"))
+        if description:
+            return description
+    return ""
+
+
+def _readability_description(tree) -> str:
+    # The summary is a small fragment; flattening it is cheap next to the page parse.
+    summary = extract_with_readability(tree)
+    return html_to_text(summary) if summary else ""
+
+
+# Ways to get the description out of a parsed page, in the default order: the JSON-LD
+# field is nearly free when present, readability is the usual winner, trafilatura the fallback.
+DESCRIPTION_STRATEGIES = {
+    "json_ld": _json_ld_description,
+    "readability": _readability_description,
+    "trafilatura": extract_with_trafilatura,
+}
+DEFAULT_STRATEGY_ORDER = tuple(DESCRIPTION_STRATEGIES)
+MIN_STRATEGY_LENGTH = 200
+
+
+def _usable(content: str, report) -> bool:
+    """Long enough, passes the quality check and is not mostly login-wall text."""
+    features = report.features
+    return (
+        len(content) >= MIN_STRATEGY_LENGTH
+        and report.rejection_reason is None
+        and len(features["auth_wall_markers"]) <= len(features["job_markers"])
+    )
+
+
+def _description_from_tree(tree, strategies=None):
+    """
+    Try the description strategies in order and stop at the first usable text that
+    scores at least JOB_STRATEGY_MIN_QUALITY. If none does, the best-scoring usable
+    text wins. Returns ``(content, attempts)``; each attempt records the strategy, its
+    time, whether it was accepted and the quality score of its text.
+    """
+    min_quality = getattr(settings, "JOB_STRATEGY_MIN_QUALITY", 0.3)
+    attempts = []
+    best = None
+    reason = None
+    if tree is not None:
+        for name in strategies or DEFAULT_STRATEGY_ORDER:
+            started = time.perf_counter()
+            content = clean_text(DESCRIPTION_STRATEGIES[name](tree) or "")
+            report = evaluate_extraction(content)
+            usable = _usable(content, report)
+            attempts.append({
+                "strategy": name,
+                "ms": round((time.perf_counter() - started) * 1000, 2),
+                "accepted": usable and report.score >= min_quality,
+                "quality": report.score,
+            })
+            if attempts[-1]["accepted"]:
+                return content, attempts
+            if usable and (best is None or report.score > best[1]):
+                best = (content, report.score, attempts[-1])
+            reason = reason or report.rejection_reason
+
+    if best is not None:
+        content, _, attempt = best
+        attempt["accepted"] = True
+        return content, attempts
+
+    raise JobExtractionError(
+        reason or "Could not extract sufficient content from the job posting.", attempts=attempts
+    )
+
+
+def extract_job_description_from_html(html: str) -> str:
+    return _description_from_tree(parse_html(html))[0]
+
+
+def extract_job_posting_from_html(html: str, url: str, strategies=None) -> dict:
+    tree = parse_html(html)
+    job_description, attempts = _description_from_tree(tree, strategies)
+    metadata = _metadata_from_tree(tree, url)
     return {
         "job_description": job_description,
         "job_title": metadata.get("job_title", ""),
         "company_name": metadata.get("company_name", ""),
+        "strategy": next(attempt["strategy"] for attempt in attempts if attempt["accepted"]),
+        "attempts": attempts,
     }
 
 
+def extract_job_posting(url: str, json_fetcher=None, html_fetcher=None, strategies=None, record_stats=True) -> dict:
+    """
+    Extract a posting from ``url``. ``json_fetcher`` and ``html_fetcher`` default to
+    ``fetch_json`` and ``fetch_html``; snapshot recording and offline replay pass their own.
+
+    ``strategies`` fixes the description strategy order instead of the learned per-domain
+    one, and ``record_stats=False`` keeps the attempts out of the per-domain stats; offline
+    replay uses both so its results are repeatable and do not skew live extractions.
+    """
+    # Imported here because the adapters, the worker pool and the strategy stats build
+    # on the helpers in this module.
+    from .ats_adapters import extract_with_adapter
+    from .extraction_pool import extract_job_posting_isolated
+    from .strategy_stats import choose_strategies, record_attempts
+
+    json_fetcher = json_fetcher or fetch_json
+    html_fetcher = html_fetcher or fetch_html
+    posting = extract_with_adapter(url, fetch_json=json_fetcher, fetch_html=html_fetcher)
+    if posting:
+        return posting
+
+    html = html_fetcher(url)
+    # readability and trafilatura can stall on pathological pages, so they run in a
+    # separate process with a hard timeout.
+    try:
+        posting = extract_job_posting_isolated(html, url, strategies or choose_strategies(url))
+    except JobExtractionError as exc:
+        if record_stats:
+            record_attempts(url, exc.attempts)
+        raise
+    if record_stats:
+        record_attempts(url, posting["attempts"])
+    return posting
+
+
 def extract_job_description(url: str) -> str:
     return extract_job_posting(url)["job_description"]
@@ -0,0 +1,155 @@
+"""
+Child process of ``manage.py benchmark_pipeline``.
+
+Run as ``python <path to this file>`` with the working directory and PYTHONPATH set to a
+backend tree (this one, or a git worktree of another branch). It reads
+``{"base_url", "cases", "repeat"}`` as JSON on stdin, runs every case through that tree's
+``fetch_html`` -> ``extract_job_description_from_html`` -> ``extract_job_metadata`` ->
+``get_extraction_rejection_reason`` and prints one JSON result line on stdout. Only the
+standard library is imported before ``django.setup()``, so the file works against trees
+that do not contain it.
+"""
+import gc
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+STAGES = ("fetch", "description", "metadata", "quality")
+
+
+def _run_case(case: dict, base_url: str, job_extractor, rejection_reason):
+    """Returns ``(stage timings in seconds, outcome)`` for one pass over one case."""
+    timings = {}
+    started = time.perf_counter()
+    try:
+        html = job_extractor.fetch_html(f"{base_url}/{case['name']}")
+    except job_extractor.JobExtractionError as exc:
+        timings["fetch"] = time.perf_counter() - started
+        return timings, {"error": f"fetch: {exc}", "rejected": True}
+    timings["fetch"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    error = ""
+    try:
+        description = job_extractor.extract_job_description_from_html(html)
+    except job_extractor.JobExtractionError as exc:
+        description, error = "", str(exc)
+    timings["description"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    metadata = job_extractor.extract_job_metadata(html, case["url"])
+    timings["metadata"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    reason = error or rejection_reason(
+        job_description=description,
+        job_title=metadata.get("job_title", ""),
+        company_name=metadata.get("company_name", ""),
+    )
+    timings["quality"] = time.perf_counter() - started
+
+    return timings, {
+        "job_title": metadata.get("job_title", ""),
+        "company_name": metadata.get("company_name", ""),
+        "job_description": description,
+        "rejected": bool(reason),
+        "error": reason or "",
+    }
+
+
+def check_outcome(expected: dict, outcome: dict) -> list:
+    """Problems with ``outcome`` against a case's ``expected`` block; empty when it matches."""
+    problems = []
+    if "rejected" in expected and outcome["rejected"] != expected["rejected"]:
+        verdict = f"rejected ({outcome['error']})" if outcome["rejected"] else "accepted"
+        problems.append(f"{verdict}, expected {'rejected' if expected['rejected'] else 'accepted'}")
+    if outcome.get("error", "").startswith("fetch:"):
+        return problems or [outcome["error"]]
+    for field in ("job_title", "company_name"):
+        if field in expected and outcome[field] != expected[field]:
+            problems.append(f"{field}={outcome[field]!r} (expected {expected[field]!r})")
+    description = outcome.get("job_description", "")
+    for snippet in expected.get("description_contains", ()):
+        if snippet not in description:
+            problems.append(f"description is missing {snippet!r}")
+    for snippet in expected.get("description_excludes", ()):
+        if snippet in description:
+            problems.append(f"description contains {snippet!r}")
+    return problems
+
+
+def _summary(values) -> dict:
+    ordered = sorted(values)
+    return {
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+    }
+
+
+def run(job: dict) -> dict:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+    from apps.jobs.services import job_extractor
+    from apps.jobs.services.extraction_quality import get_extraction_rejection_reason
+
+    cases, base_url = job["cases"], job["base_url"]
+    # One untimed pass pays for lazy imports, regex compilation and connection setup.
+    for case in cases:
+        _run_case(case, base_url, job_extractor, get_extraction_rejection_reason)
+    timings = {stage: [] for stage in STAGES}
+    totals = []
+    outcomes = {}
+    for _ in range(job["repeat"]):
+        for case in cases:
+            # Like timeit: collect between cases so a collection triggered by one page's
+            # garbage is not billed to whichever stage happens to run next.
+            gc.collect()
+            gc.disable()
+            try:
+                case_timings, outcomes[case["name"]] = _run_case(
+                    case, base_url, job_extractor, get_extraction_rejection_reason
+                )
+            finally:
+                gc.enable()
+            for stage, seconds in case_timings.items():
+                timings[stage].append(seconds)
+            totals.append(sum(case_timings.values()))
+
+    # Separate pass: tracemalloc slows allocation-heavy code too much to time under it.
+    tracemalloc.start()
+    for case in cases:
+        _run_case(case, base_url, job_extractor, get_extraction_rejection_reason)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results = {}
+    for case in cases:
+        problems = check_outcome(case.get("expected", {}), outcomes[case["name"]])
+        results[case["name"]] = {"kind": case.get("kind", ""), "problems": problems}
+    passed = sum(1 for result in results.values() if not result["problems"])
+
+    return {
+        "pages": len(totals),
+        "stages": {stage: _summary(values) for stage, values in timings.items() if values},
+        "total": _summary(totals),
+        # From the per-page totals: the forced collections between cases are not pipeline time.
+        "pages_per_second": len(totals) / sum(totals) if sum(totals) else 0.0,
+        "python_peak_kb": python_peak / 1024,
+        # High-water mark of the whole child, interpreter and Django included.
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "accuracy": passed / len(cases) if cases else 0.0,
+        "cases": results,
+    }
+
+
+if __name__ == "__main__":
+    # Started by file path, so Python put this file's directory first on sys.path; the
+    # tree under test is the working directory.
+    sys.path[0] = os.getcwd()
+    print(json.dumps(run(json.load(sys.stdin))))
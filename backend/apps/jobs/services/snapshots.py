@@ -0,0 +1,79 @@
+import json
+import logging
+import zlib
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.jobs.models import JobPageSnapshot
+from . import job_extractor
+from .job_extractor import JobExtractionError
+
+logger = logging.getLogger(__name__)
+
+
+def snapshots_enabled() -> bool:
+    return getattr(settings, "JOB_SNAPSHOTS_ENABLED", True)
+
+
+def compress_pages(pages: dict) -> bytes:
+    return zlib.compress(json.dumps(pages).encode("utf-8"), 6)
+
+
+def decompress_pages(blob) -> dict:
+    return json.loads(zlib.decompress(bytes(blob)).decode("utf-8"))
+
+
+class PageRecorder:
+    """
+    Fetchers that go to the network and keep every body they return, to be stored as
+    the job's snapshot. Pass ``recorder.fetch_json`` / ``recorder.fetch_html`` to the
+    extractor in place of the module-level fetchers.
+    """
+
+    def __init__(self):
+        self.pages = {}
+
+    def fetch_html(self, url: str, timeout: float = 10, deadline: float | None = None) -> str:
+        body = job_extractor.fetch_html(url, timeout=timeout, deadline=deadline)
+        self.pages[url] = body
+        return body
+
+    def fetch_json(self, url: str, timeout: float = 10, deadline: float | None = None):
+        data = job_extractor.fetch_json(url, timeout=timeout, deadline=deadline)
+        self.pages[url] = json.dumps(data)
+        return data
+
+
+class SnapshotReplay:
+    """Fetchers that serve a stored snapshot and refuse any URL it does not contain."""
+
+    def __init__(self, pages: dict):
+        self.pages = pages
+
+    def _read(self, url: str) -> str:
+        body = self.pages.get(url)
+        if body is None:
+            raise JobExtractionError(f"Page not in snapshot: {url}")
+        return body
+
+    def fetch_html(self, url: str, timeout: float = 10, deadline: float | None = None) -> str:
+        return self._read(url)
+
+    def fetch_json(self, url: str, timeout: float = 10, deadline: float | None = None):
+        return json.loads(self._read(url))
+
+
+def save_snapshot(job, url: str, recorder: PageRecorder) -> None:
+    """Store what ``recorder`` fetched for ``job``, replacing any previous snapshot."""
+    if not recorder.pages or not snapshots_enabled():
+        return
+    try:
+        with transaction.atomic():
+            JobPageSnapshot.objects.update_or_create(
+                job=job,
+                defaults={"url": url, "pages": compress_pages(recorder.pages)},
+            )
+    except Exception:
+        # Snapshots only serve later re-extraction; they must not fail the current one.
+        logger.exception("Could not store page snapshot for job_id=%s", job.pk)
@@ -0,0 +1,108 @@
+import logging
+import random
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+
+from apps.ai_engine import metrics
+from apps.jobs.models import ExtractionStrategyStats
+from .host_fetcher import host_of
+from .job_extractor import DEFAULT_STRATEGY_ORDER
+
+logger = logging.getLogger(__name__)
+
+
+def adaptive_enabled() -> bool:
+    return getattr(settings, "JOB_ADAPTIVE_EXTRACTION_ENABLED", True)
+
+
+def domain_of(url: str) -> str:
+    host = host_of(url)
+    return host[4:] if host.startswith("www.") else host
+
+
+def rank_strategies(stats) -> list:
+    """
+    Order the strategies for a domain from its stats rows.
+
+    Strategies with at least JOB_STRATEGY_MIN_SAMPLES attempts and a win rate of at least
+    JOB_STRATEGY_MIN_WIN_RATE come first, best average quality (then fastest) first.
+    Strategies without enough samples follow in the default order. Known losers go
+    last: they still run as a fallback, but only when everything else failed.
+    """
+    min_samples = getattr(settings, "JOB_STRATEGY_MIN_SAMPLES", 5)
+    min_win_rate = getattr(settings, "JOB_STRATEGY_MIN_WIN_RATE", 0.2)
+    by_name = {row.strategy: row for row in stats}
+
+    winners, untested, losers = [], [], []
+    for name in DEFAULT_STRATEGY_ORDER:
+        row = by_name.get(name)
+        if row is None or row.attempts < min_samples:
+            untested.append(name)
+        elif row.win_rate < min_win_rate:
+            losers.append(name)
+        else:
+            winners.append(row)
+
+    winners.sort(key=lambda row: (-row.avg_quality, row.avg_ms))
+    return [row.strategy for row in winners] + untested + losers
+
+
+def choose_strategies(url: str) -> list:
+    if not adaptive_enabled():
+        return list(DEFAULT_STRATEGY_ORDER)
+    # A small share of extractions keeps the default order so the stats of strategies
+    # ranked behind a winner do not go stale.
+    if random.random() < getattr(settings, "JOB_STRATEGY_EXPLORE_RATE", 0.05):
+        metrics.record("extraction_strategy_explored")
+        return list(DEFAULT_STRATEGY_ORDER)
+
+    try:
+        stats = list(ExtractionStrategyStats.objects.filter(domain=domain_of(url)))
+    except DatabaseError as exc:
+        logger.warning("Could not read extraction strategy stats for %s: %s", url, exc)
+        return list(DEFAULT_STRATEGY_ORDER)
+    order = rank_strategies(stats)
+    if order[0] != DEFAULT_STRATEGY_ORDER[0]:
+        metrics.record("extraction_strategy_reordered")
+    return order
+
+
+def _add(domain: str, attempt: dict) -> None:
+    accepted = 1 if attempt["accepted"] else 0
+    updated = ExtractionStrategyStats.objects.filter(domain=domain, strategy=attempt["strategy"]).update(
+        attempts=F("attempts") + 1,
+        accepted=F("accepted") + accepted,
+        total_ms=F("total_ms") + attempt["ms"],
+        total_quality=F("total_quality") + attempt["quality"],
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            ExtractionStrategyStats.objects.create(
+                domain=domain,
+                strategy=attempt["strategy"],
+                attempts=1,
+                accepted=accepted,
+                total_ms=attempt["ms"],
+                total_quality=attempt["quality"],
+            )
+    except IntegrityError:
+        # Another worker created the row first.
+        _add(domain, attempt)
+
+
+def record_attempts(url: str, attempts) -> None:
+    """Add the outcome of each strategy attempt to the domain's stats."""
+    domain = domain_of(url)
+    if not attempts or not domain or not adaptive_enabled():
+        return
+    try:
+        with transaction.atomic():
+            for attempt in attempts:
+                _add(domain, attempt)
+    except DatabaseError as exc:
+        # The stats only steer later extractions; they must not fail this one.
+        logger.warning("Could not record extraction strategy stats for %s: %s", domain, exc)
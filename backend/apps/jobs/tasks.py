@@ -1,27 +1,65 @@
+import logging
+
 from celery import shared_task
+from celery.signals import worker_process_init
 from apps.jobs.models import JobApplication
 from apps.jobs.services.job_extractor import (
     extract_job_posting,
     JobExtractionError,
+    prefetch_job_pages,
 )
 from apps.jobs.services.extraction_quality import get_extraction_rejection_reason
+from apps.jobs.services.extraction_pool import prewarm_pool
+from apps.jobs.services.snapshots import PageRecorder, save_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+@worker_process_init.connect
+def _prewarm_extraction_pool(**kwargs):
+    # Each prefork child starts its extraction workers before it takes a task.
+    prewarm_pool()
+
+
+def _has_manual_fields(job):
+    return all(
+        bool((value or "").strip())
+        for value in (job.company_name, job.job_title, job.job_description)
+    )
+
+
+def _needs_manual(job, message, manual_fallback, status="needs_manual"):
+    # Jobs created with complete manual fields keep them when extraction does not work out.
+    if manual_fallback and _has_manual_fields(job):
+        job.description_source = "manual"
+        job.extraction_status = "success"
+        job.extraction_error = ""
+        job.save(update_fields=["description_source", "extraction_status", "extraction_error"])
+        return
+
+    job.extraction_status = status
+    job.extraction_error = message
+    job.save(update_fields=["extraction_status", "extraction_error"])
 
 
 @shared_task
-def extract_job_description_task(job_id):
+def extract_job_description_task(job_id, manual_fallback=False):
     try:
         job = JobApplication.objects.get(id=job_id)
     except JobApplication.DoesNotExist:
         return
 
     if not job.job_url:
-        job.extraction_status = "needs_manual"
-        job.extraction_error = "No job URL provided."
-        job.save(update_fields=["extraction_status", "extraction_error"])
+        _needs_manual(job, "No job URL provided.", manual_fallback)
         return
 
+    recorder = PageRecorder()
     try:
-        extracted = extract_job_posting(job.job_url)
+        extracted = extract_job_posting(
+            job.job_url,
+            json_fetcher=recorder.fetch_json,
+            html_fetcher=recorder.fetch_html,
+        )
         text = extracted.get("job_description", "")
         title = extracted.get("job_title", "")
         company = extracted.get("company_name", "")
@@ -32,9 +70,7 @@ def extract_job_description_task(job_id):
         )
 
         if extraction_issue:
-            job.extraction_status = "needs_manual"
-            job.extraction_error = f"{extraction_issue} Please fill details manually."
-            job.save(update_fields=["extraction_status", "extraction_error"])
+            _needs_manual(job, f"{extraction_issue} Please fill details manually.", manual_fallback)
             return
 
         job.job_description = text
@@ -71,10 +107,20 @@ def extract_job_description_task(job_id):
         ])
 
     except JobExtractionError as exc:
-        job.extraction_status = "needs_manual"
-        job.extraction_error = str(exc)
-        job.save(update_fields=["extraction_status", "extraction_error"])
+        _needs_manual(job, str(exc), manual_fallback)
     except Exception as exc:
-        job.extraction_status = "failed"
-        job.extraction_error = f"Unexpected extraction error: {exc}"
-        job.save(update_fields=["extraction_status", "extraction_error"])
+        logger.exception("Unexpected error extracting job_id=%s", job.id)
+        _needs_manual(job, f"Unexpected extraction error: {exc}", manual_fallback, status="failed")
+    finally:
+        # Kept whatever the outcome, so a better extractor can be replayed over it later.
+        save_snapshot(job, job.job_url, recorder)
+
+
+@shared_task
+def extract_job_descriptions_task(job_ids, manual_fallback=False):
+    # Pages are downloaded concurrently (within the per-host limits) before the
+    # extractions run one by one against the fetch cache.
+    urls = JobApplication.objects.filter(id__in=job_ids).values_list("job_url", flat=True)
+    prefetch_job_pages(list(urls))
+    for job_id in job_ids:
+        extract_job_description_task(job_id, manual_fallback=manual_fallback)
@@ -1,3 +1,641 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import redis
+import requests
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.ai_engine import metrics
+from apps.jobs import tasks
+from apps.jobs.services import extraction_pool, extraction_quality, fetch_cache, host_fetcher, strategy_stats
+from apps.jobs.services.ats_adapters import extract_with_adapter
+from apps.jobs.services.bounded_fetch import JSON_CONTENT_TYPES, FetchedPage, FetchRejected, bounded_get
+from apps.jobs.management.commands.benchmark_pipeline import load_pages
+from apps.jobs.management.commands.reextract_jobs import _reextract
+from apps.jobs.models import JobApplication, JobImportBatch
+from apps.jobs.services.extraction_quality import get_extraction_rejection_reason
+from apps.jobs.services.job_extractor import (
+    JobExtractionError,
+    _description_from_tree,
+    extract_job_description_from_html,
+    extract_job_metadata,
+    extract_job_posting_fast,
+    extract_job_posting_from_html,
+    fetch_html,
+    parse_html,
+)
+from apps.jobs.services.pipeline_benchmark import check_outcome
+from apps.jobs.services.snapshots import compress_pages
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "extraction_fixtures"
+
+
+def fixture_fetchers(case: dict, directory: Path):
+    """Fetchers that serve a case's stored responses and refuse any other URL."""
+    responses = case.get("responses", {})
+
+    def read(url):
+        name = responses.get(url)
+        if name is None:
+            raise JobExtractionError(f"No fixture for {url}")
+        return (directory / name).read_text(encoding="utf-8")
+
+    return (lambda url: json.loads(read(url))), read
+
+
+class ATSAdapterFixtureTests(SimpleTestCase):
+    """The ATS adapters against stored API responses and pages (no network)."""
+
+    manifest = FIXTURES_DIR / "ats" / "manifest.json"
+
+    def test_fixtures(self):
+        cases = json.loads(self.manifest.read_text(encoding="utf-8"))
+        self.assertTrue(cases)
+        for case in cases:
+            with self.subTest(case["name"]):
+                fetch_json, fetch_html = fixture_fetchers(case, self.manifest.parent)
+                posting = extract_with_adapter(case["url"], fetch_json=fetch_json, fetch_html=fetch_html)
+                self.assertIsNotNone(posting)
+                expected = case["expected"]
+                for field in ("adapter", "job_title", "company_name"):
+                    if field in expected:
+                        self.assertEqual(posting.get(field), expected[field], field)
+                self.assertIn(expected["description_contains"], posting["job_description"])
+
+    def test_unknown_url_is_not_claimed(self):
+        self.assertIsNone(extract_with_adapter("https://example.com/careers/123", fetch_json=None, fetch_html=None))
+
+
+class PageCorpusTests(SimpleTestCase):
+    """The benchmark_pipeline corpus: description, metadata and quality checks, minus the fetch."""
+
+    manifest = FIXTURES_DIR / "pages" / "manifest.json"
+
+    def test_corpus(self):
+        cases = json.loads(self.manifest.read_text(encoding="utf-8"))
+        pages = load_pages(self.manifest, cases)
+        for case in cases:
+            with self.subTest(case["name"]):
+                html = pages[case["name"]].decode("utf-8")
+                try:
+                    description, error = extract_job_description_from_html(html), ""
+                except JobExtractionError as exc:
+                    description, error = "", str(exc)
+                metadata = extract_job_metadata(html, case["url"])
+                reason = error or get_extraction_rejection_reason(
+                    job_description=description,
+                    job_title=metadata["job_title"],
+                    company_name=metadata["company_name"],
+                )
+                outcome = {**metadata, "job_description": description, "rejected": bool(reason), "error": reason or ""}
+                self.assertEqual(check_outcome(case.get("expected", {}), outcome), [])
+
+    def test_low_quality_text_falls_through_to_the_next_strategy(self):
+        tree = parse_html((self.manifest.parent / "lever_posting.html").read_text(encoding="utf-8"))
+        _, attempts = _description_from_tree(tree, ["readability", "trafilatura"])
+        self.assertEqual([attempt["accepted"] for attempt in attempts], [False, True])
+
+    def test_reported_strategy_is_the_accepted_one_not_the_last_tried(self):
+        html = (self.manifest.parent / "lever_posting.html").read_text(encoding="utf-8")
+        with override_settings(JOB_STRATEGY_MIN_QUALITY=1.01):
+            posting = extract_job_posting_from_html(
+                html, "https://jobs.lever.co/acme/42", ["trafilatura", "readability"]
+            )
+        accepted = [attempt["strategy"] for attempt in posting["attempts"] if attempt["accepted"]]
+        self.assertEqual(accepted, [posting["strategy"]])
+        self.assertNotEqual(posting["strategy"], posting["attempts"][-1]["strategy"])
+
+    def test_login_wall_is_not_taken_as_the_description(self):
+        tree = parse_html((self.manifest.parent / "linkedin_guest_gate.html").read_text(encoding="utf-8"))
+        with self.assertRaises(JobExtractionError) as raised:
+            _description_from_tree(tree)
+        self.assertFalse(any(attempt["accepted"] for attempt in raised.exception.attempts))
+
+
+def json_ld_page(description: str) -> str:
+    posting = {
+        "@context": "https://schema.org",
+        "@type": "JobPosting",
+        "title": "Data Engineer",
+        "hiringOrganization": {"@type": "Organization", "name": "Acme"},
+        "description": description,
+    }
+    return f'<html><head><script type="application/ld+json">{json.dumps(posting)}</script></head><body></body></html>'
+
+
+ESCAPED_DESCRIPTION = (
+    "&lt;p&gt;Acme is hiring a Data Engineer to build and run our batch and streaming pipelines.&lt;/p&gt;"
+    "&lt;ul&gt;&lt;li&gt;Own ingestion from product databases into the warehouse&lt;/li&gt;"
+    "&lt;li&gt;Model warehouse tables in dbt and keep them tested&lt;/li&gt;"
+    "&lt;li&gt;4+ years of experience with Python and SQL&lt;/li&gt;&lt;/ul&gt;"
+)
+
+
+class ExtractionTaskTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="alice", password="pw")
+        for patcher in (
+            mock.patch.object(tasks, "extract_job_posting", side_effect=RuntimeError("parser crashed")),
+            mock.patch.object(tasks, "save_snapshot"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_task(self, **fields):
+        job = JobApplication.objects.create(user=self.user, job_url="https://careers.example.com/jobs/42", **fields)
+        with self.assertLogs("apps.jobs.tasks", "ERROR"):
+            tasks.extract_job_description_task(job.id, manual_fallback=True)
+        job.refresh_from_db()
+        return job
+
+    def test_unexpected_error_keeps_complete_manual_fields(self):
+        job = self.run_task(company_name="Acme", job_title="Data Engineer", job_description="Build pipelines.")
+        self.assertEqual((job.extraction_status, job.description_source), ("success", "manual"))
+
+    def test_unexpected_error_without_manual_fields_fails(self):
+        job = self.run_task(job_title="Data Engineer")
+        self.assertEqual(job.extraction_status, "failed")
+        self.assertIn("parser crashed", job.extraction_error)
+
+
+class FastPathTests(SimpleTestCase):
+    """The create-time fast path: one deadline, no waiting on host limits, no retries."""
+
+    url = "https://careers.example.com/jobs/42"
+
+    def setUp(self):
+        self.limiter = mock.Mock()
+        self.limiter.acquire.return_value = 0
+        patchers = [
+            mock.patch.object(host_fetcher, "get_host_limiter", return_value=self.limiter),
+            mock.patch.object(host_fetcher, "bounded_get"),
+            mock.patch.object(host_fetcher.time, "sleep", side_effect=AssertionError("the fast path slept")),
+            mock.patch.object(fetch_cache, "get_fetch_cache", return_value=None),
+            mock.patch.object(metrics, "record"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.bounded_get = host_fetcher.bounded_get
+
+    def test_reads_an_escaped_json_ld_description_as_text(self):
+        self.bounded_get.return_value = FetchedPage(200, {}, json_ld_page(ESCAPED_DESCRIPTION))
+        posting = extract_job_posting_fast(self.url, timeout=2)
+        self.assertEqual((posting["job_title"], posting["company_name"]), ("Data Engineer", "Acme"))
+        self.assertIn("Model warehouse tables in dbt", posting["job_description"])
+        self.assertNotIn("<li>", posting["job_description"])
+        self.assertNotIn("&lt;", posting["job_description"])
+
+    def test_fetch_is_bounded_by_the_remaining_time(self):
+        self.bounded_get.return_value = FetchedPage(200, {}, json_ld_page(ESCAPED_DESCRIPTION))
+        extract_job_posting_fast(self.url, timeout=2)
+        kwargs = self.bounded_get.call_args.kwargs
+        self.assertLessEqual(kwargs["timeout"], 2)
+        self.assertLessEqual(kwargs["deadline"], time.monotonic() + 2)
+
+    def test_throttled_host_is_left_to_the_background_path(self):
+        self.limiter.acquire.return_value = 5.0
+        self.assertIsNone(extract_job_posting_fast(self.url, timeout=2))
+        self.bounded_get.assert_not_called()
+
+    def test_rate_limited_response_is_not_retried(self):
+        response = mock.Mock(status_code=429, headers={"Retry-After": "30"})
+        self.bounded_get.side_effect = requests.HTTPError(response=response)
+        self.assertIsNone(extract_job_posting_fast(self.url, timeout=2))
+        self.assertEqual(self.bounded_get.call_count, 1)
+
+    def test_background_fetch_still_retries(self):
+        response = mock.Mock(status_code=503, headers={"Retry-After": "1"})
+        page = FetchedPage(200, {}, "<html></html>")
+        self.bounded_get.side_effect = [requests.HTTPError(response=response), page]
+        with mock.patch.object(host_fetcher.time, "sleep") as sleep:
+            self.assertEqual(host_fetcher.polite_get(None, self.url, timeout=10), page)
+        sleep.assert_called_once()
+
+
+class HostLimiterTests(SimpleTestCase):
+    url = "https://careers.example.com/jobs/42"
+
+    def setUp(self):
+        self.limiter = mock.Mock()
+        patchers = [
+            mock.patch.object(host_fetcher, "get_host_limiter", return_value=self.limiter),
+            mock.patch.object(metrics, "record"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_unavailable_limiter_fails_open(self):
+        self.limiter.acquire.side_effect = redis.exceptions.ConnectionError("Connection refused")
+        page = FetchedPage(200, {}, "<html><body>posting</body></html>")
+        with mock.patch.object(host_fetcher, "bounded_get", return_value=page), \
+                mock.patch.object(fetch_cache, "get_fetch_cache", return_value=None):
+            self.assertEqual(fetch_html(self.url), page.text)
+        metrics.record.assert_any_call("fetch_host_limiter_errors")
+
+    @override_settings(JOB_FETCH_HOST_MAX_WAIT=25)
+    def test_waiting_for_a_host_is_capped(self):
+        self.limiter.acquire.return_value = 10.0
+        with mock.patch.object(host_fetcher.time, "sleep") as sleep:
+            with self.assertRaises(host_fetcher.HostBusy):
+                host_fetcher.wait_for_host("careers.example.com")
+        self.assertEqual(sleep.call_count, 2)
+
+        async def wait():
+            with mock.patch.object(host_fetcher.asyncio, "sleep", mock.AsyncMock()) as async_sleep:
+                with self.assertRaises(host_fetcher.HostBusy):
+                    await host_fetcher.wait_for_host_async("careers.example.com")
+            return async_sleep.await_count
+
+        self.assertEqual(asyncio.run(wait()), 2)
+
+
+class HostLimiterKeyTests(SimpleTestCase):
+    @override_settings(JOB_FETCH_RATE_LIMIT_BACKEND="redis")
+    def test_host_buckets_do_not_share_the_ai_limiter_keys(self):
+        with mock.patch("apps.ai_engine.rate_limit.redis.Redis.from_url") as from_url, \
+                mock.patch.object(host_fetcher, "_limiter", None):
+            script = from_url.return_value.register_script.return_value
+            script.return_value = "0"
+            host_fetcher.get_host_limiter().acquire([("careers.example.com", 3, 1.0, 1)])
+        self.assertEqual(script.call_args.kwargs["keys"], ["job-fetch-host:careers.example.com"])
+
+
+class SnapshotReplayTests(SimpleTestCase):
+    url = "https://careers.example.com/jobs/42"
+
+    def test_replay_uses_a_fixed_order_and_records_no_stats(self):
+        html = (FIXTURES_DIR / "pages" / "lever_posting.html").read_text(encoding="utf-8")
+        blob = compress_pages({self.url: html})
+        with mock.patch.object(strategy_stats, "choose_strategies") as choose, \
+                mock.patch.object(strategy_stats, "record_attempts") as record, \
+                override_settings(JOB_EXTRACTION_ISOLATION_ENABLED=False):
+            results = [_reextract((1, self.url, blob), strategies=("trafilatura",)) for _ in range(2)]
+        choose.assert_not_called()
+        record.assert_not_called()
+        self.assertEqual(results[0], results[1])
+        job_id, posting, error = results[0]
+        self.assertEqual(error, "")
+        self.assertIn("Model warehouse tables in dbt", posting["job_description"])
+
+
+class FetchCachePruneTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = fetch_cache.FetchCache(directory.name, ttl=60, stale_ttl=60)
+
+    def store(self, key, age, size=2000):
+        self.cache.store(key, os.urandom(size).hex())
+        path = self.cache._path(key)
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def test_expired_entries_and_abandoned_temp_files_are_removed(self):
+        fresh = self.store("https://a.example.com/1", age=10)
+        expired = self.store("https://a.example.com/2", age=200)
+        temp = os.path.join(os.path.dirname(fresh), "x.tmp")
+        open(temp, "w").close()
+        os.utime(temp, (time.time() - 7200, time.time() - 7200))
+
+        removed, _ = self.cache.prune()
+        self.assertEqual(removed, 2)
+        self.assertTrue(os.path.exists(fresh))
+        self.assertFalse(os.path.exists(expired) or os.path.exists(temp))
+
+    def test_oldest_entries_go_first_above_the_size_limit(self):
+        paths = [self.store(f"https://a.example.com/{age}", age=age) for age in (30, 20, 10)]
+        size = os.path.getsize(paths[0])
+        removed, remaining = self.cache.prune(max_bytes=2 * size + size // 2)
+        self.assertEqual(removed, 1)
+        self.assertLessEqual(remaining, 2 * size + size // 2)
+        self.assertEqual([os.path.exists(path) for path in paths], [False, True, True])
+
+    @override_settings(JOB_FETCH_CACHE_PRUNE_INTERVAL=3600)
+    def test_writes_sweep_at_most_once_per_interval(self):
+        with mock.patch.object(fetch_cache, "_last_prune", 0.0), \
+                mock.patch.object(fetch_cache, "prune_fetch_cache") as prune:
+            fetch_cache._maybe_prune(self.cache)
+            fetch_cache._maybe_prune(self.cache)
+        prune.assert_called_once_with(self.cache)
+
+
+class ExtractionPoolStartupTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(extraction_pool, "_use_pool", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_processes_that_did_not_start_the_pool_extract_in_process(self):
+        with mock.patch.object(extraction_pool, "get_pool") as get_pool, \
+                mock.patch.object(extraction_pool, "extract_job_posting_from_html", return_value={}) as extract:
+            extraction_pool.extract_job_posting_isolated("<html></html>", "https://a.example.com/1")
+        get_pool.assert_not_called()
+        extract.assert_called_once()
+
+    @override_settings(JOB_EXTRACTION_ISOLATION_ENABLED=True)
+    def test_celery_worker_processes_prewarm_the_pool_at_startup(self):
+        with mock.patch.object(extraction_pool, "get_pool") as get_pool, \
+                mock.patch.object(extraction_pool.os, "name", "posix"):
+            tasks.worker_process_init.send(sender=None)
+            self.assertTrue(extraction_pool.isolation_enabled())
+        get_pool.return_value.prewarm.assert_called_once_with()
+
+    @override_settings(JOB_EXTRACTION_ISOLATION_ENABLED=False)
+    def test_prewarm_starts_nothing_when_isolation_is_off(self):
+        with mock.patch.object(extraction_pool, "get_pool") as get_pool:
+            extraction_pool.prewarm_pool()
+        get_pool.assert_not_called()
+
+    def test_prewarm_fills_the_idle_list_up_to_the_pool_size(self):
+        pool = extraction_pool.ExtractionPool(
+            size=2, timeout=1, memory_limit_mb=64, max_rss_mb=64, max_tasks=1, startup_timeout=1
+        )
+        with mock.patch.object(extraction_pool, "_Worker") as worker, \
+                mock.patch.object(extraction_pool.threading, "Thread") as thread:
+            thread.side_effect = lambda target, **kwargs: mock.Mock(start=target)
+            pool.prewarm()
+        self.assertEqual(worker.call_count, 2)
+        self.assertEqual(len(pool._idle), 2)
+
+    def test_worker_started_after_close_is_killed(self):
+        pool = extraction_pool.ExtractionPool(
+            size=2, timeout=1, memory_limit_mb=64, max_rss_mb=64, max_tasks=1, startup_timeout=1
+        )
+        pool.close()
+        with mock.patch.object(extraction_pool, "_Worker") as worker:
+            pool._spawn_idle()
+        worker.return_value.kill.assert_called_once_with()
+        self.assertEqual(pool._idle, [])
+
+    def test_worker_starts_even_if_the_warmup_page_is_rejected(self):
+        if os.name != "posix":
+            self.skipTest("The extraction pool is POSIX-only.")
+        # The child reads its settings from the environment; this length rejects every page.
+        with mock.patch.dict(os.environ, {"JOB_QUALITY_MIN_DESCRIPTION_LENGTH": "100000"}):
+            worker = extraction_pool._Worker(memory_limit_mb=0, startup_timeout=60)
+        self.addCleanup(worker.kill)
+        status, payload, _ = worker.run("<html><body><p>Short</p></body></html>", "https://a.example.com/1", None, 30)
+        self.assertEqual(status, "extraction_error")
+
+
+class FakeStreamedResponse:
+    def __init__(self, chunks, status_code=200, **headers):
+        self.chunks = chunks
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict({"Content-Type": "text/html", **headers})
+        self.read = 0
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+    def iter_content(self, chunk_size):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class BoundedFetchTests(SimpleTestCase):
+    url = "https://careers.example.com/jobs/42"
+
+    def get(self, response, **kwargs):
+        session = mock.Mock()
+        session.get.return_value = response
+        return bounded_get(session, self.url, timeout=5, **kwargs)
+
+    def assertRejected(self, response, message, **kwargs):
+        with self.assertRaisesMessage(FetchRejected, message):
+            self.get(response, **kwargs)
+        self.assertTrue(response.closed)
+
+    def test_other_content_types_are_rejected_before_the_body_is_read(self):
+        response = FakeStreamedResponse([b"%PDF-1.7"], **{"Content-Type": "application/pdf"})
+        self.assertRejected(response, "Unsupported content type 'application/pdf'")
+        self.assertEqual(response.read, 0)
+
+        json_response = FakeStreamedResponse([b'{"id": 42}'], **{"Content-Type": "application/json; charset=utf-8"})
+        self.assertEqual(self.get(json_response, content_types=JSON_CONTENT_TYPES).text, '{"id": 42}')
+
+    @override_settings(JOB_FETCH_MAX_CHARS=100)
+    def test_size_cap_applies_to_the_declared_length_and_the_streamed_body(self):
+        response = FakeStreamedResponse([b"x" * 50], **{"Content-Length": "5000"})
+        self.assertRejected(response, "Page is too large")
+        self.assertEqual(response.read, 0)
+
+        response = FakeStreamedResponse([b"x" * 60] * 5)
+        self.assertRejected(response, "over 0 KB of text")
+        self.assertEqual(response.read, 2)
+
+    def test_download_stops_at_the_deadline_and_the_time_budget(self):
+        self.assertRejected(
+            FakeStreamedResponse([b"<html>"]), "did not finish downloading in time", deadline=time.monotonic() - 1
+        )
+        with override_settings(JOB_FETCH_TIME_BUDGET=-1):
+            self.assertRejected(FakeStreamedResponse([b"<html>"]), "longer than -1s to download")
+
+    def test_body_is_decoded_with_the_declared_charset(self):
+        body = '<html><head><meta charset="windows-1252"></head><body>Caf\u00e9 \u2013 Barista</body></html>'
+        response = FakeStreamedResponse([body.encode("cp1252")[:40], body.encode("cp1252")[40:]])
+        self.assertIn("Caf\u00e9 \u2013 Barista", self.get(response).text)
+
+        not_modified = self.get(FakeStreamedResponse([], status_code=304))
+        self.assertEqual((not_modified.status_code, not_modified.text), (304, ""))
+
+
+@mock.patch("apps.jobs.tasks.extract_job_descriptions_task")
+class JobImportApiTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="alice", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, data, format="json"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/jobs/import/", data, format=format)
+
+    def test_duplicate_urls_are_skipped_after_normalization(self, task):
+        JobApplication.objects.create(user=self.user, job_url="https://careers.example.com/jobs/1")
+        response = self.post({"jobs": [
+            "https://careers.example.com/jobs/1/?utm_source=newsletter#apply",
+            "https://careers.example.com/jobs/2",
+            {"job_url": "https://Careers.example.com/jobs/2/"},
+        ]})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual([job["job_url"] for job in response.data["jobs"]], ["https://careers.example.com/jobs/2"])
+        self.assertEqual(
+            [(row["row"], row["reason"]) for row in response.data["skipped"]], [(0, "duplicate"), (2, "duplicate")]
+        )
+        task.delay.assert_called_once_with([response.data["jobs"][0]["id"]], manual_fallback=True)
+
+    def test_csv_with_a_header_uses_the_named_columns(self, task):
+        text = (
+            "Job_URL,company_name,job_title,job_description,notes\n"
+            "https://careers.example.com/jobs/1,Acme,Data Engineer,Build pipelines.,ignored\n"
+            "https://careers.example.com/jobs/2,,,,\n"
+        )
+        response = self.post({"csv": text})
+        first, second = JobApplication.objects.order_by("id")
+        self.assertEqual(
+            (first.company_name, first.job_title, first.description_source), ("Acme", "Data Engineer", "manual")
+        )
+        self.assertEqual((second.company_name, second.description_source), ("", "extracted"))
+        self.assertEqual(response.data["status_counts"], {"pending": 2})
+
+    @override_settings(JOB_IMPORT_CHUNK_SIZE=2)
+    def test_csv_without_a_header_takes_the_first_column(self, task):
+        text = "\n".join([
+            "https://careers.example.com/jobs/1,Acme",
+            "",
+            "https://careers.example.com/jobs/2",
+            "https://careers.example.com/jobs/3",
+        ])
+        upload = SimpleUploadedFile("jobs.csv", text.encode("utf-8-sig"), content_type="text/csv")
+        response = self.post({"file": upload}, format="multipart")
+        self.assertEqual(len(response.data["jobs"]), 3)
+        self.assertEqual(JobApplication.objects.get(job_url__endswith="/1").company_name, "")
+        self.assertEqual([len(call.args[0]) for call in task.delay.call_args_list], [2, 1])
+
+    def test_invalid_url_rejects_the_whole_request(self, task):
+        response = self.post({"jobs": ["https://careers.example.com/jobs/1", "not a url"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(JobApplication.objects.exists())
+
+    def test_batch_status_counts_and_completion(self, task):
+        response = self.post({"jobs": [f"https://careers.example.com/jobs/{index}" for index in range(3)]})
+        batch_url = f"/api/jobs/import/{response.data['id']}/"
+        first, second, third = JobApplication.objects.order_by("id")
+        JobApplication.objects.filter(pk=first.pk).update(extraction_status="success")
+        JobApplication.objects.filter(pk=second.pk).update(extraction_status="needs_manual")
+
+        data = self.client.get(batch_url).data
+        self.assertEqual(data["status_counts"], {"success": 1, "needs_manual": 1, "pending": 1})
+        self.assertFalse(data["is_complete"])
+
+        JobApplication.objects.filter(pk=third.pk).update(extraction_status="success")
+        data = self.client.get(batch_url).data
+        self.assertEqual((data["status_counts"], data["is_complete"]), ({"success": 2, "needs_manual": 1}, True))
+
+        other = get_user_model().objects.create_user(username="mallory", email="mallory@example.com", password="pw")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(batch_url).status_code, 404)
+        self.assertEqual(JobImportBatch.objects.count(), 1)
+
+
+def list_rule_reason(description, title="", company=""):
+    """The rejection rule as it was before the compiled matcher: plain substring checks over the marker lists."""
+    description = " ".join(description.split())
+    title = " ".join(title.split())
+    if not description:
+        return "Extracted page did not contain job description text."
+    if len(description) < extraction_quality.MIN_DESCRIPTION_LENGTH:
+        return "Extracted content is too short to be a valid job description."
+    if title.lower() in extraction_quality.GENERIC_NON_JOB_TITLES:
+        return "Extracted page appears to be a login/auth page, not a job posting."
+    combined = " ".join([title, company, description]).lower()
+    has_auth_wall = any(marker in combined for marker in extraction_quality.AUTH_WALL_MARKERS)
+    has_job_markers = any(marker in description.lower() for marker in extraction_quality.JOB_HINT_MARKERS)
+    if has_auth_wall and not has_job_markers:
+        return "Extracted page appears blocked or login-gated, not a real job description."
+    return None
+
+
+def list_rule_score(description):
+    description = " ".join(description.split()).lower()
+    if not description:
+        return 0.0
+    length_score = min(1.0, len(description) / extraction_quality.FULL_SCORE_DESCRIPTION_LENGTH)
+    hits = sum(1 for marker in extraction_quality.JOB_HINT_MARKERS if marker in description)
+    score = (length_score + min(1.0, hits / extraction_quality.FULL_SCORE_JOB_MARKERS)) / 2
+    if any(marker in description for marker in extraction_quality.AUTH_WALL_MARKERS):
+        score /= 2
+    return round(score, 3)
+
+
+FILLER = "The team builds scheduling software for clinics across the region. " * 4
+POSTING = (
+    FILLER + "Responsibilities: own the booking service. Requirements: five years of Python. "
+    "Preferred qualifications: Django and Celery. About the role: you will pair with the product team."
+)
+
+
+class ExtractionQualityTests(SimpleTestCase):
+    examples = [
+        (POSTING, "Backend Engineer", "Acme"),
+        ("", "Backend Engineer", "Acme"),
+        ("Responsibilities: ship code.", "Backend Engineer", "Acme"),
+        (POSTING, "Sign in | LinkedIn", ""),
+        (FILLER + "Please sign in to view this page. Access denied.", "Careers", "Acme"),
+        (FILLER + "Please sign in to apply. " + POSTING, "Backend Engineer", "Acme"),
+        (FILLER, "Join LinkedIn", "Acme"),
+        (FILLER, "Backend Engineer", "Acme"),
+    ]
+
+    def test_matches_the_old_rule_list(self):
+        for description, title, company in self.examples:
+            with self.subTest(description=description[-40:], title=title):
+                report = extraction_quality.evaluate_extraction(description, title, company)
+                self.assertEqual(report.rejection_reason, list_rule_reason(description, title, company))
+                score = extraction_quality.get_extraction_quality_score(description)
+                self.assertEqual(score, list_rule_score(description))
+
+    def test_expected_verdicts(self):
+        reasons = [extraction_quality.evaluate_extraction(*example).rejection_reason for example in self.examples]
+        self.assertIsNone(reasons[0])
+        self.assertIn("did not contain", reasons[1])
+        self.assertIn("too short", reasons[2])
+        self.assertIn("login/auth page", reasons[3])
+        self.assertIn("login-gated", reasons[4])
+        self.assertIsNone(reasons[5])
+        self.assertIn("login-gated", reasons[6])
+        self.assertIsNone(reasons[7])
+
+    def test_markers_match_at_word_starts_across_punctuation(self):
+        text = FILLER + "Upskills welcome. Skillset: SQL."
+        report = extraction_quality.evaluate_extraction(text, "Sign in · LinkedIn")
+        self.assertEqual(report.features["job_markers"], ["skills"])
+        self.assertEqual(report.features["auth_wall_markers"], ["sign in | linkedin"])
+        report = extraction_quality.evaluate_extraction(POSTING)
+        self.assertIn("qualifications", report.features["job_markers"])
+        self.assertIn("preferred qualifications", report.features["job_markers"])
+
+    def test_length_thresholds_come_from_settings(self):
+        short = "Responsibilities: ship code. Requirements: Python."
+        self.assertIn("too short", extraction_quality.get_extraction_rejection_reason(job_description=short))
+        with override_settings(JOB_QUALITY_MIN_DESCRIPTION_LENGTH=20, JOB_QUALITY_FULL_SCORE_LENGTH=len(short)):
+            report = extraction_quality.evaluate_extraction(short)
+            self.assertIsNone(report.rejection_reason)
+            self.assertEqual(report.features["length_score"], 1.0)
+
+    def test_marker_threshold_comes_from_settings(self):
+        self.assertEqual(extraction_quality.evaluate_extraction(POSTING).features["marker_score"], 1.0)
+        with override_settings(JOB_QUALITY_FULL_SCORE_MARKERS=10):
+            self.assertEqual(extraction_quality.evaluate_extraction(POSTING).features["marker_score"], 0.5)
+
+    def test_rules_file_replaces_the_marker_lists(self):
+        rules = {"auth_wall_markers": ["members only"], "job_hint_markers": ["tech stack"]}
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as handle:
+            json.dump(rules, handle)
+        self.addCleanup(os.remove, handle.name)
+
+        gated = FILLER + "Members only content."
+        self.assertIsNone(extraction_quality.evaluate_extraction(gated).rejection_reason)
+        with override_settings(JOB_QUALITY_RULES_FILE=handle.name):
+            self.assertIn("login-gated", extraction_quality.evaluate_extraction(gated).rejection_reason)
+            report = extraction_quality.evaluate_extraction(gated + " Tech stack: Go.")
+            self.assertIsNone(report.rejection_reason)
+            self.assertEqual(report.features["job_markers"], ["tech stack"])
@@ -4,6 +4,8 @@ from .views import (
     JobApplicationListView,
     JobApplicationDetailView,
     JobApplicationUpdateView,
+    JobImportBatchView,
+    JobImportView,
 )
 
 
@@ -12,4 +14,6 @@ urlpatterns = [
     path('list/', JobApplicationListView.as_view(), name='job-application-list'),
     path('<int:pk>/', JobApplicationDetailView.as_view(), name='job-application-detail'),
     path('<int:pk>/update/', JobApplicationUpdateView.as_view(), name='job-application-update'),
+    path('import/', JobImportView.as_view(), name='job-import'),
+    path('import/<int:pk>/', JobImportBatchView.as_view(), name='job-import-detail'),
 ]
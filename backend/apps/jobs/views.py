@@ -1,9 +1,14 @@
-from rest_framework import generics, permissions
+from django.conf import settings
+from django.db import transaction
+from rest_framework import generics, permissions, status
 from rest_framework.exceptions import ValidationError
-from .models import JobApplication
-from .serializers import JobApplicationSerializer
+from rest_framework.response import Response
+from .models import JobApplication, JobImportBatch
+from .serializers import JobApplicationSerializer, JobImportBatchSerializer, JobImportSerializer
+from .services.bulk_import import import_jobs
 from .services.extraction_quality import get_extraction_rejection_reason
-from .services.job_extractor import JobExtractionError, extract_job_posting
+from .services.job_extractor import JobExtractionError, extract_job_posting, extract_job_posting_fast
+from .services.snapshots import PageRecorder, save_snapshot
 from .tasks import extract_job_description_task
 
 
@@ -11,7 +16,56 @@ class JobApplicationCreateView(generics.CreateAPIView):
     serializer_class = JobApplicationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        if response.data.get("extraction_status") == "pending":
+            response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    def _perform_async_create(self, serializer, job_url, manual_title, manual_complete, recorder):
+        extracted = extract_job_posting_fast(
+            job_url,
+            timeout=getattr(settings, "JOB_CREATE_SYNC_TIMEOUT", 2),
+            json_fetcher=recorder.fetch_json,
+            html_fetcher=recorder.fetch_html,
+        )
+        if extracted:
+            extracted_description = extracted["job_description"]
+            extracted_company = extracted["company_name"]
+            extraction_issue = get_extraction_rejection_reason(
+                job_description=extracted_description,
+                job_title=extracted["job_title"],
+                company_name=extracted_company,
+            )
+            if not extraction_issue and extracted_company:
+                serializer.save(
+                    user=self.request.user,
+                    company_name=extracted_company,
+                    job_title=extracted["job_title"] or manual_title,
+                    job_description=extracted_description,
+                    description_source="extracted",
+                    extraction_status="success",
+                    extraction_error="",
+                )
+                return
+
+        job = serializer.save(
+            user=self.request.user,
+            description_source="manual" if manual_complete else "extracted",
+            extraction_status="pending",
+            extraction_error="",
+        )
+        transaction.on_commit(
+            lambda: extract_job_description_task.delay(job.id, manual_fallback=manual_complete)
+        )
+
     def perform_create(self, serializer):
+        recorder = PageRecorder()
+        self._create(serializer, recorder)
+        if serializer.instance is not None and serializer.instance.job_url:
+            save_snapshot(serializer.instance, serializer.instance.job_url, recorder)
+
+    def _create(self, serializer, recorder):
         validated = serializer.validated_data
         job_url = (validated.get("job_url") or "").strip()
         manual_company = (validated.get("company_name") or "").strip()
@@ -28,8 +82,16 @@ class JobApplicationCreateView(generics.CreateAPIView):
             )
             return
 
+        if getattr(settings, "JOB_ASYNC_CREATE_ENABLED", False):
+            self._perform_async_create(serializer, job_url, manual_title, manual_complete, recorder)
+            return
+
         try:
-            extracted = extract_job_posting(job_url)
+            extracted = extract_job_posting(
+                job_url,
+                json_fetcher=recorder.fetch_json,
+                html_fetcher=recorder.fetch_html,
+            )
         except JobExtractionError as exc:
             if manual_complete:
                 serializer.save(
@@ -107,6 +169,28 @@ class JobApplicationCreateView(generics.CreateAPIView):
         )
 
 
+class JobImportView(generics.GenericAPIView):
+    serializer_class = JobImportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        batch, skipped = import_jobs(request.user, serializer.validated_data["rows"])
+
+        data = dict(JobImportBatchSerializer(batch).data)
+        data["skipped"] = skipped
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+class JobImportBatchView(generics.RetrieveAPIView):
+    serializer_class = JobImportBatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return JobImportBatch.objects.filter(user=self.request.user)
+
+
 class JobApplicationListView(generics.ListAPIView):
     serializer_class = JobApplicationSerializer
     permission_classes = [permissions.IsAuthenticated]
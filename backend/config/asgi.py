@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.JOB_EXTRACTION_POOL_IN_WEB:
+    from apps.jobs.services.extraction_pool import prewarm_pool  # noqa: E402
+
+    prewarm_pool()
@@ -41,6 +41,189 @@ CELERY_BROKER_URL= 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
+# LLM backend: 'groq', 'simulated', 'replay' or a dotted path to an LLMProvider subclass.
+AI_PROVIDER = os.getenv('AI_PROVIDER', 'groq')
+# JSONL file of recorded responses; written when AI_PROVIDER_RECORD=True, read by 'replay'.
+AI_PROVIDER_RECORDINGS_PATH = os.getenv('AI_PROVIDER_RECORDINGS_PATH', '')
+AI_PROVIDER_RECORD = os.getenv('AI_PROVIDER_RECORD') == 'True'
+AI_PROVIDER_REPLAY_STRICT = os.getenv('AI_PROVIDER_REPLAY_STRICT') == 'True'
+AI_SIMULATED_PROVIDER = {
+    'latency': {
+        'distribution': os.getenv('AI_SIMULATED_LATENCY_DISTRIBUTION', 'lognormal'),
+        'median': float(os.getenv('AI_SIMULATED_LATENCY_MEDIAN', 1.5)),
+        'sigma': float(os.getenv('AI_SIMULATED_LATENCY_SIGMA', 0.4)),
+    },
+    'failure_rate': float(os.getenv('AI_SIMULATED_FAILURE_RATE', 0)),
+    'rate_limit_rate': float(os.getenv('AI_SIMULATED_RATE_LIMIT_RATE', 0)),
+    'responses_path': os.getenv('AI_SIMULATED_RESPONSES_PATH', ''),
+}
+# Shared HTTP pool for the Groq SDK (one per worker process, rebuilt after fork).
+AI_HTTP_MAX_CONNECTIONS = int(os.getenv('AI_HTTP_MAX_CONNECTIONS', 20))
+AI_HTTP_MAX_KEEPALIVE = int(os.getenv('AI_HTTP_MAX_KEEPALIVE', 10))
+AI_HTTP_KEEPALIVE_EXPIRY = float(os.getenv('AI_HTTP_KEEPALIVE_EXPIRY', 30))
+AI_HTTP_CONNECT_TIMEOUT = float(os.getenv('AI_HTTP_CONNECT_TIMEOUT', 5))
+AI_HTTP_READ_TIMEOUT = float(os.getenv('AI_HTTP_READ_TIMEOUT', 60))
+AI_HTTP_POOL_TIMEOUT = float(os.getenv('AI_HTTP_POOL_TIMEOUT', 10))
+AI_HTTP2_ENABLED = os.getenv('AI_HTTP2_ENABLED', 'True') == 'True'
+
+# Analysis progress events (Server-Sent Events) are relayed over Redis pub/sub.
+AI_EVENTS_REDIS_URL = os.getenv('AI_EVENTS_REDIS_URL', CELERY_BROKER_URL)
+AI_STREAM_TOKENS = os.getenv('AI_STREAM_TOKENS') == 'True'
+AI_STREAM_TIMEOUT = int(os.getenv('AI_STREAM_TIMEOUT', 120))
+# Each open stream holds a server thread for up to AI_STREAM_TIMEOUT; past this many per process, clients are told to poll.
+AI_STREAM_MAX_OPEN = int(os.getenv('AI_STREAM_MAX_OPEN', 8))
+# Lifetime (seconds) of the ?token= that EventSource clients use instead of the JWT header.
+AI_STREAM_AUTH_TOKEN_TTL = int(os.getenv('AI_STREAM_AUTH_TOKEN_TTL', 60))
+
+# Completed Groq analyses are reused for identical inputs (seconds / max rows).
+AI_ANALYSIS_CACHE_TTL = int(os.getenv('AI_ANALYSIS_CACHE_TTL', 7 * 24 * 60 * 60))
+AI_ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('AI_ANALYSIS_CACHE_MAX_ENTRIES', 5000))
+# Identical requests join a running analysis only if it started less than this many seconds ago.
+AI_COALESCE_STALE_AFTER = int(os.getenv('AI_COALESCE_STALE_AFTER', 300))
+
+# Batch analysis: max jobs per request and max analyses running at once per batch.
+AI_BATCH_MAX_JOBS = int(os.getenv('AI_BATCH_MAX_JOBS', 100))
+AI_BATCH_MAX_CONCURRENCY = int(os.getenv('AI_BATCH_MAX_CONCURRENCY', 4))
+
+# Run batch analyses on AsyncGroq inside one worker slot instead of one slot per call.
+AI_ASYNC_CLIENT_ENABLED = os.getenv('AI_ASYNC_CLIENT_ENABLED') == 'True'
+AI_ASYNC_MAX_IN_FLIGHT = int(os.getenv('AI_ASYNC_MAX_IN_FLIGHT', 8))
+
+# Cluster-wide Groq limiter (token buckets in Redis, or 'memory' for tests) and 429 retries.
+AI_RATE_LIMIT_BACKEND = os.getenv('AI_RATE_LIMIT_BACKEND', 'redis')
+AI_RATE_LIMIT_RPM = int(os.getenv('AI_RATE_LIMIT_RPM', 30))
+AI_RATE_LIMIT_TPM = int(os.getenv('AI_RATE_LIMIT_TPM', 12000))
+AI_RATE_LIMIT_COMPLETION_TOKENS = int(os.getenv('AI_RATE_LIMIT_COMPLETION_TOKENS', 1000))
+AI_RATE_LIMIT_MAX_INLINE_WAIT = int(os.getenv('AI_RATE_LIMIT_MAX_INLINE_WAIT', 30))
+AI_RETRY_MAX_ATTEMPTS = int(os.getenv('AI_RETRY_MAX_ATTEMPTS', 5))
+AI_RETRY_BACKOFF_BASE = int(os.getenv('AI_RETRY_BACKOFF_BASE', 2))
+AI_RETRY_BACKOFF_MAX = int(os.getenv('AI_RETRY_BACKOFF_MAX', 120))
+
+# Score batches with one prompt per AI_PACKED_MAX_JOBS jobs that shares the resume text;
+# jobs a packed response misses are re-run individually.
+AI_PACKED_PROMPTS_ENABLED = os.getenv('AI_PACKED_PROMPTS_ENABLED') == 'True'
+AI_PACKED_MAX_JOBS = int(os.getenv('AI_PACKED_MAX_JOBS', 4))
+AI_PACKED_PROMPT_TOKEN_BUDGET = int(os.getenv('AI_PACKED_PROMPT_TOKEN_BUDGET', 8000))
+
+# Model tiers, smallest first: the first tier whose max_input_tokens fits is preferred,
+# the others are failover targets. Per-model circuit breakers trip on errors / slow calls.
+AI_MODEL_TIERING_ENABLED = os.getenv('AI_MODEL_TIERING_ENABLED') == 'True'
+AI_MODEL_TIERS = [
+    {
+        'name': 'fast',
+        'model': os.getenv('AI_FAST_MODEL', 'llama-3.1-8b-instant'),
+        'max_input_tokens': int(os.getenv('AI_FAST_MODEL_MAX_INPUT_TOKENS', 1500)),
+    },
+    {
+        'name': 'large',
+        'model': os.getenv('AI_LARGE_MODEL', 'llama-3.3-70b-versatile'),
+        'max_input_tokens': None,
+    },
+]
+AI_BREAKER_FAILURE_THRESHOLD = int(os.getenv('AI_BREAKER_FAILURE_THRESHOLD', 5))
+AI_BREAKER_WINDOW = int(os.getenv('AI_BREAKER_WINDOW', 60))
+AI_BREAKER_COOLDOWN = int(os.getenv('AI_BREAKER_COOLDOWN', 30))
+AI_BREAKER_LATENCY_THRESHOLD = float(os.getenv('AI_BREAKER_LATENCY_THRESHOLD', 20))
+
+# Hedged requests: when a call outlives the AI_HEDGE_PERCENTILE latency of its model, a second
+# request (to AI_HEDGE_MODEL, or the same model) races it. Hedges are capped at
+# AI_HEDGE_BUDGET_RATIO of requests per worker process.
+AI_HEDGING_ENABLED = os.getenv('AI_HEDGING_ENABLED') == 'True'
+AI_HEDGE_PERCENTILE = float(os.getenv('AI_HEDGE_PERCENTILE', 95))
+AI_HEDGE_MIN_SAMPLES = int(os.getenv('AI_HEDGE_MIN_SAMPLES', 20))
+AI_HEDGE_DEFAULT_DELAY = float(os.getenv('AI_HEDGE_DEFAULT_DELAY', 8))
+AI_HEDGE_MIN_DELAY = float(os.getenv('AI_HEDGE_MIN_DELAY', 1))
+AI_HEDGE_BUDGET_RATIO = float(os.getenv('AI_HEDGE_BUDGET_RATIO', 0.05))
+AI_HEDGE_BUDGET_BURST = float(os.getenv('AI_HEDGE_BUDGET_BURST', 5))
+AI_HEDGE_MODEL = os.getenv('AI_HEDGE_MODEL', '')
+AI_HEDGE_MAX_THREADS = int(os.getenv('AI_HEDGE_MAX_THREADS', 8))
+
+# Serve the local TF-IDF estimate as the result when the Groq call ultimately fails.
+AI_LOCAL_FALLBACK_ENABLED = os.getenv('AI_LOCAL_FALLBACK_ENABLED', 'True') == 'True'
+
+# Estimated prompt token budget per Groq model (instructions + resume + job description).
+AI_PROMPT_DEFAULT_TOKEN_BUDGET = int(os.getenv('AI_PROMPT_DEFAULT_TOKEN_BUDGET', 6000))
+AI_PROMPT_TOKEN_BUDGETS = {
+    'llama-3.3-70b-versatile': int(os.getenv('AI_PROMPT_TOKEN_BUDGET_LLAMA_70B', 6000)),
+    'llama-3.1-8b-instant': int(os.getenv('AI_PROMPT_TOKEN_BUDGET_LLAMA_8B', 3000)),
+}
+
+# Create URL-based jobs as 'pending' (202) and extract in Celery, after a short synchronous
+# attempt (fetch within JOB_CREATE_SYNC_TIMEOUT seconds, JSON-LD JobPosting only).
+JOB_ASYNC_CREATE_ENABLED = os.getenv('JOB_ASYNC_CREATE_ENABLED') == 'True'
+JOB_CREATE_SYNC_TIMEOUT = float(os.getenv('JOB_CREATE_SYNC_TIMEOUT', 2))
+
+# Fetched job pages are cached on disk (gzip) per normalized URL for JOB_FETCH_CACHE_TTL seconds,
+# then revalidated with ETag / Last-Modified while within JOB_FETCH_CACHE_STALE_TTL.
+JOB_FETCH_CACHE_ENABLED = os.getenv('JOB_FETCH_CACHE_ENABLED', 'True') == 'True'
+JOB_FETCH_CACHE_DIR = os.getenv('JOB_FETCH_CACHE_DIR', str(BASE_DIR / 'cache' / 'job_pages'))
+JOB_FETCH_CACHE_TTL = int(os.getenv('JOB_FETCH_CACHE_TTL', 3600))
+JOB_FETCH_CACHE_STALE_TTL = int(os.getenv('JOB_FETCH_CACHE_STALE_TTL', 7 * 24 * 3600))
+# Each process sweeps the cache at most every JOB_FETCH_CACHE_PRUNE_INTERVAL seconds (0 disables; see also
+# manage.py prune_fetch_cache): expired entries go, then the oldest until it fits in JOB_FETCH_CACHE_MAX_MB.
+JOB_FETCH_CACHE_MAX_MB = int(os.getenv('JOB_FETCH_CACHE_MAX_MB', 500))
+JOB_FETCH_CACHE_PRUNE_INTERVAL = int(os.getenv('JOB_FETCH_CACHE_PRUNE_INTERVAL', 3600))
+
+# Job page downloads are streamed and abandoned past these limits (decoded characters / seconds).
+JOB_FETCH_MAX_CHARS = int(os.getenv('JOB_FETCH_MAX_CHARS', 5_000_000))
+JOB_FETCH_TIME_BUDGET = float(os.getenv('JOB_FETCH_TIME_BUDGET', 20))
+
+# Job page fetches are limited per host: concurrent connections, requests per second (with a burst),
+# and retries of 429 / 503 responses with jittered backoff that honours Retry-After up to JOB_FETCH_BACKOFF_MAX.
+JOB_FETCH_HOST_CONCURRENCY = int(os.getenv('JOB_FETCH_HOST_CONCURRENCY', 2))
+JOB_FETCH_HOST_RATE = float(os.getenv('JOB_FETCH_HOST_RATE', 1.0))
+JOB_FETCH_HOST_BURST = int(os.getenv('JOB_FETCH_HOST_BURST', 3))
+JOB_FETCH_MAX_RETRIES = int(os.getenv('JOB_FETCH_MAX_RETRIES', 2))
+JOB_FETCH_BACKOFF_BASE = float(os.getenv('JOB_FETCH_BACKOFF_BASE', 1.0))
+JOB_FETCH_BACKOFF_MAX = float(os.getenv('JOB_FETCH_BACKOFF_MAX', 30))
+JOB_FETCH_POOL_HOSTS = int(os.getenv('JOB_FETCH_POOL_HOSTS', 32))
+JOB_FETCH_BULK_CONCURRENCY = int(os.getenv('JOB_FETCH_BULK_CONCURRENCY', 16))
+# The per-host buckets live in Redis ('memory' for tests) under their own keys. A fetch gives up after waiting
+# JOB_FETCH_HOST_MAX_WAIT seconds for its host; if the limiter store is down, fetches go ahead unthrottled.
+JOB_FETCH_RATE_LIMIT_BACKEND = os.getenv('JOB_FETCH_RATE_LIMIT_BACKEND', 'redis')
+JOB_FETCH_RATE_LIMIT_REDIS_URL = os.getenv('JOB_FETCH_RATE_LIMIT_REDIS_URL', CELERY_BROKER_URL)
+JOB_FETCH_HOST_MAX_WAIT = float(os.getenv('JOB_FETCH_HOST_MAX_WAIT', 60))
+
+# Bulk import: rows accepted per request, and jobs per extraction task (each task prefetches its pages concurrently).
+JOB_IMPORT_MAX_ROWS = int(os.getenv('JOB_IMPORT_MAX_ROWS', 200))
+JOB_IMPORT_CHUNK_SIZE = int(os.getenv('JOB_IMPORT_CHUNK_SIZE', 10))
+
+# Every response read during extraction is stored compressed per job, for offline re-extraction (manage.py reextract_jobs).
+JOB_SNAPSHOTS_ENABLED = os.getenv('JOB_SNAPSHOTS_ENABLED', 'True') == 'True'
+
+# HTML-to-text extraction runs in prewarmed child processes (POSIX only). A page that takes longer than
+# JOB_EXTRACTION_TIMEOUT seconds gets its worker killed; workers are capped at JOB_EXTRACTION_MEMORY_LIMIT_MB of
+# address space and recycled after JOB_EXTRACTION_MAX_TASKS pages or once their peak RSS passes JOB_EXTRACTION_MAX_RSS_MB.
+# Celery worker processes start the pool when they boot; web processes only with JOB_EXTRACTION_POOL_IN_WEB,
+# and management commands extract in-process.
+JOB_EXTRACTION_ISOLATION_ENABLED = os.getenv('JOB_EXTRACTION_ISOLATION_ENABLED', 'True') == 'True'
+JOB_EXTRACTION_POOL_IN_WEB = os.getenv('JOB_EXTRACTION_POOL_IN_WEB', 'False') == 'True'
+JOB_EXTRACTION_WORKERS = int(os.getenv('JOB_EXTRACTION_WORKERS', 2))
+JOB_EXTRACTION_TIMEOUT = float(os.getenv('JOB_EXTRACTION_TIMEOUT', 15))
+JOB_EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv('JOB_EXTRACTION_MEMORY_LIMIT_MB', 1024))
+JOB_EXTRACTION_MAX_RSS_MB = int(os.getenv('JOB_EXTRACTION_MAX_RSS_MB', 400))
+JOB_EXTRACTION_MAX_TASKS = int(os.getenv('JOB_EXTRACTION_MAX_TASKS', 200))
+JOB_EXTRACTION_STARTUP_TIMEOUT = float(os.getenv('JOB_EXTRACTION_STARTUP_TIMEOUT', 30))
+
+# Per-domain description strategy stats (json_ld / readability / trafilatura) reorder later extractions once a
+# strategy has JOB_STRATEGY_MIN_SAMPLES attempts; below JOB_STRATEGY_MIN_WIN_RATE it only runs as a last resort.
+JOB_ADAPTIVE_EXTRACTION_ENABLED = os.getenv('JOB_ADAPTIVE_EXTRACTION_ENABLED', 'True') == 'True'
+JOB_STRATEGY_MIN_SAMPLES = int(os.getenv('JOB_STRATEGY_MIN_SAMPLES', 5))
+JOB_STRATEGY_MIN_WIN_RATE = float(os.getenv('JOB_STRATEGY_MIN_WIN_RATE', 0.2))
+JOB_STRATEGY_EXPLORE_RATE = float(os.getenv('JOB_STRATEGY_EXPLORE_RATE', 0.05))
+# A strategy's text is taken right away once it passes the quality checks with at least this 0..1 score;
+# otherwise the remaining strategies run and the best-scoring text that passed is used.
+JOB_STRATEGY_MIN_QUALITY = float(os.getenv('JOB_STRATEGY_MIN_QUALITY', 0.3))
+
+# Extraction quality checks: descriptions under JOB_QUALITY_MIN_DESCRIPTION_LENGTH characters are rejected; the
+# 0..1 score reaches full marks at JOB_QUALITY_FULL_SCORE_LENGTH characters and JOB_QUALITY_FULL_SCORE_MARKERS
+# job-section markers. JOB_QUALITY_RULES_FILE is an optional JSON file whose auth_wall_markers / job_hint_markers /
+# generic_titles lists replace the built-in ones.
+JOB_QUALITY_RULES_FILE = os.getenv('JOB_QUALITY_RULES_FILE', '')
+JOB_QUALITY_MIN_DESCRIPTION_LENGTH = int(os.getenv('JOB_QUALITY_MIN_DESCRIPTION_LENGTH', 180))
+JOB_QUALITY_FULL_SCORE_LENGTH = int(os.getenv('JOB_QUALITY_FULL_SCORE_LENGTH', 1500))
+JOB_QUALITY_FULL_SCORE_MARKERS = int(os.getenv('JOB_QUALITY_FULL_SCORE_MARKERS', 4))
+
 # Application definition
 
 INSTALLED_APPS = [